@@ -86,3 +86,13 @@ if __name__ == "__main__":
 DATA_URL = "https://zenodo.org/records/5043645/files/Indicateurs_QualiteAir_France_Commune_2000-2015_Ineris_v.Sep2020.zip?download=1"
 
 RAW_DATA_PATH = "data/raw/Indicateurs_QualiteAir_France_Commune_2000-2015_Ineris_v.Sep2020.csv"
+
+# ZIP archive kept next to the raw CSVs while downloading (resumable ".part" file)
+RAW_ARCHIVE_PATH = "data/raw/Indicateurs_QualiteAir_France_Commune_2000-2015_Ineris_v.Sep2020.zip"
+
+# Checksum manifest of the raw files (written after each verified download)
+RAW_MANIFEST_PATH = "data/raw/manifest.json"
+
+# Expected checksum of the archive as published by Zenodo ("md5:<hex>").
+# Leave to None to skip the verification of the downloaded archive.
+DATA_CHECKSUM = None
@@ -304,13 +304,21 @@ def generate_dashboard():
     # 1. Récupération de la carte
     map_src_path = "/static/interactive_pollution_map.html"
     # On cherche la carte physique pour la copier
+    # La carte écrite par map.py (assets/, avec son dossier map_data) passe avant les anciennes copies
     possible_maps = [
+        os.path.join(ASSETS_DIR, 'interactive_pollution_map.html'),
         os.path.join(ASSETS_DIR, 'output_csv', 'FINAL_superposed_graphs_map', 'interactive_pollution_map.html'),
         os.path.join(ASSETS_DIR, 'maps', 'interactive_pollution_map.html')
     ]
     for p in possible_maps:
         if os.path.exists(p):
             shutil.copy(p, os.path.join(STATIC_DIR, 'interactive_pollution_map.html'))
+            # La carte charge ses données (une année à la fois) depuis le dossier map_data voisin
+            map_data = os.path.join(os.path.dirname(p), 'map_data')
+            if os.path.isdir(map_data):
+                # Remplacé en entier : pas de fichiers d'une génération précédente
+                shutil.rmtree(os.path.join(STATIC_DIR, 'map_data'), ignore_errors=True)
+                shutil.copytree(map_data, os.path.join(STATIC_DIR, 'map_data'))
             break
 
     # 2. Liens vers les viewers qu'on vient de créer/vérifier
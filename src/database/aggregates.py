@@ -0,0 +1,145 @@
+# aggregates.py
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.histogram_bins import POLLUTANT_BINS, bin_counts, bin_edges
+
+# Quantiles calculés pour chaque (polluant, année) : colonne -> quantile
+QUANTILES = {"q05": 0.05, "q25": 0.25, "q50": 0.5, "q75": 0.75, "q95": 0.95}
+
+# Tables d'agrégats, petites et lues à la place de la table de faits
+AGGREGATE_SCHEMA = [
+    f"""
+    CREATE TABLE IF NOT EXISTS pollutant_stats (
+        pollutant TEXT NOT NULL,
+        annee INTEGER NOT NULL,
+        count INTEGER,
+        min REAL,
+        max REAL,
+        mean REAL,
+        mean_pop REAL,
+        {", ".join(f"{col} REAL" for col in QUANTILES)},
+        PRIMARY KEY (pollutant, annee)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS pollutant_histograms (
+        pollutant TEXT NOT NULL,
+        annee INTEGER NOT NULL,
+        bin INTEGER NOT NULL,
+        bin_start REAL,
+        bin_end REAL,
+        count INTEGER,
+        PRIMARY KEY (pollutant, annee, bin)
+    ) WITHOUT ROWID
+    """,
+]
+
+STATS_COLUMNS = ["pollutant", "annee", "count", "min", "max", "mean", "mean_pop"] + list(QUANTILES)
+
+
+def year_aggregates(df, annee):
+    """
+    Calcule les agrégats d'une année pour chaque polluant.
+
+    Args:
+        df (pd.DataFrame): Les mesures de l'année (table measurements)
+        annee (int): L'année
+
+    Returns:
+        tuple: (lignes de pollutant_stats, lignes de pollutant_histograms)
+    """
+    population = df["population"].to_numpy(dtype=float) if "population" in df.columns else None
+    stats, histograms = [], []
+
+    for pollutant in POLLUTANT_BINS:
+        if pollutant not in df.columns:
+            continue
+        values = df[pollutant].to_numpy(dtype=float)
+        present = ~np.isnan(values)
+        if not present.any():
+            continue
+        kept = values[present]
+
+        # Moyenne pondérée par la population (communes de population connue et non nulle)
+        mean_pop = None
+        if population is not None:
+            weights = np.nan_to_num(population[present])
+            if weights.sum() > 0:
+                mean_pop = float(np.average(kept, weights=weights))
+
+        quantiles = np.quantile(kept, list(QUANTILES.values()))
+        stats.append((pollutant, annee, int(len(kept)), float(kept.min()), float(kept.max()),
+                      float(kept.mean()), mean_pop, *[float(q) for q in quantiles]))
+
+        edges = bin_edges(pollutant)
+        for i, count in enumerate(bin_counts(kept, pollutant)):
+            histograms.append((pollutant, annee, i, float(edges[i]), float(edges[i + 1]), int(count)))
+
+    return stats, histograms
+
+
+def refresh_aggregates(conn, years=None):
+    """
+    Recalcule les agrégats des années données à partir de la table measurements,
+    en une transaction. Les agrégats des années absentes de measurements sont supprimés.
+
+    Args:
+        conn (sqlite3.Connection): Connexion ouverte avec isolation_level=None
+        years (list[int]): Années à recalculer (par défaut : toutes)
+
+    Returns:
+        list[int]: Les années recalculées
+    """
+    for statement in AGGREGATE_SCHEMA:
+        conn.execute(statement)
+
+    loaded = [row[0] for row in conn.execute("SELECT DISTINCT annee FROM measurements ORDER BY annee")]
+    years = loaded if years is None else sorted(set(years) & set(loaded))
+
+    try:
+        conn.execute("BEGIN")
+        for table in ("pollutant_stats", "pollutant_histograms"):
+            placeholders = ", ".join("?" * len(loaded))
+            conn.execute(f"DELETE FROM {table} WHERE annee NOT IN ({placeholders})", loaded)
+
+        for annee in years:
+            # Lecture d'une seule année : plage de la clé primaire de measurements
+            df = pd.read_sql_query("SELECT * FROM measurements WHERE annee = ?", conn, params=[annee])
+            stats, histograms = year_aggregates(df, annee)
+
+            conn.execute("DELETE FROM pollutant_stats WHERE annee = ?", [annee])
+            conn.execute("DELETE FROM pollutant_histograms WHERE annee = ?", [annee])
+            conn.executemany(f"INSERT INTO pollutant_stats ({', '.join(STATS_COLUMNS)}) "
+                             f"VALUES ({', '.join('?' * len(STATS_COLUMNS))})", stats)
+            conn.executemany("INSERT INTO pollutant_histograms (pollutant, annee, bin, bin_start, bin_end, count) "
+                             "VALUES (?, ?, ?, ?, ?, ?)", histograms)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+    return years
+
+
+def load_pollutant_stats(conn, pollutant=None):
+    """
+    Charge les statistiques par année (d'un polluant, ou de tous).
+    """
+    if pollutant is None:
+        return pd.read_sql_query("SELECT * FROM pollutant_stats ORDER BY pollutant, annee", conn)
+    return pd.read_sql_query("SELECT * FROM pollutant_stats WHERE pollutant = ? ORDER BY annee",
+                             conn, params=[pollutant])
+
+
+def load_histogram(conn, pollutant, annee):
+    """
+    Charge l'histogramme pré-calculé d'un polluant pour une année
+    (colonnes bin, bin_start, bin_end, count).
+    """
+    return pd.read_sql_query("SELECT bin, bin_start, bin_end, count FROM pollutant_histograms "
+                             "WHERE pollutant = ? AND annee = ? ORDER BY bin",
+                             conn, params=[pollutant, annee])
@@ -0,0 +1,108 @@
+# benchmark_load.py
+import sqlite3
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.cleaned_store import STORE_PATH
+from database.create_db import bulk_load, create_schema, drop_duplicate_rows, load_cleaned_table, split_star_schema
+
+# Ancienne table à plat, remplie par df.to_sql
+LEGACY_CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS air_quality (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    com_insee TEXT,
+    commune TEXT,
+    population REAL,
+    annee INTEGER,
+    pm25 REAL,
+    pm25_pop REAL,
+    pm10 REAL,
+    pm10_pop REAL,
+    no2 REAL,
+    no2_pop REAL,
+    o3 REAL,
+    o3_pop REAL,
+    aot40 REAL,
+    somo35 REAL,
+    somo35_pop REAL
+)
+"""
+
+
+def load_with_to_sql(db_path, df):
+    """
+    Ancien chargement : DELETE validé séparément puis df.to_sql sur une connexion par défaut.
+    """
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute(LEGACY_CREATE_TABLE)
+    conn.commit()
+    cursor.execute("DELETE FROM air_quality")
+    conn.commit()
+    df.to_sql("air_quality", conn, if_exists="append", index=False)
+    conn.commit()
+    conn.close()
+
+
+def load_with_bulk(db_path, df):
+    """
+    Chargement en masse de create_database (schéma en étoile, une transaction, executemany, WAL).
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    create_schema(conn)
+    communes, measurements = split_star_schema(df)
+    bulk_load(conn, [("communes", communes), ("measurements", measurements)])
+    conn.close()
+
+
+def benchmark(data_path=STORE_PATH, repeat=3):
+    """
+    Mesure le débit (lignes/s) des deux méthodes de chargement sur le jeu de
+    données nettoyé complet, chacune dans une base temporaire neuve.
+
+    Args:
+        data_path (str): Store Parquet des données nettoyées
+        repeat (int): Nombre de mesures par méthode (la meilleure est gardée)
+
+    Returns:
+        dict: Débit en lignes/s de chaque méthode
+    """
+    # Les deux méthodes insèrent les mêmes lignes : une par commune et par
+    # année, comme la clé primaire de measurements
+    df = drop_duplicate_rows(load_cleaned_table(data_path))
+    print(f"Lignes à insérer : {len(df)} ({df['annee'].min()}-{df['annee'].max()})")
+
+    results = {}
+    for name, load in (("to_sql", load_with_to_sql), ("bulk", load_with_bulk)):
+        timings = []
+        for _ in range(repeat):
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                db_path = os.path.join(tmp_dir, "benchmark.db")
+                start = time.perf_counter()
+                load(db_path, df)
+                timings.append(time.perf_counter() - start)
+                size = os.path.getsize(db_path)
+
+                conn = sqlite3.connect(db_path)
+                count = conn.execute("SELECT COUNT(*) FROM air_quality").fetchone()[0]
+                conn.close()
+                if count != len(df):
+                    raise RuntimeError(f"{name} : {count} lignes insérées au lieu de {len(df)}")
+
+        best = min(timings)
+        results[name] = len(df) / best
+        print(f"{name:>8} : {best:.2f} s, {results[name]:,.0f} lignes/s, base de {size / 1e6:.1f} Mo")
+
+    print(f"Accélération : x{results['bulk'] / results['to_sql']:.1f}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare le chargement to_sql et le chargement en masse")
+    parser.add_argument("--repeat", type=int, default=3, help="nombre de mesures par méthode")
+    args = parser.parse_args()
+    benchmark(repeat=args.repeat)
@@ -1,40 +1,59 @@
 # create_database.py
 import sqlite3
+import hashlib
+import argparse
 import pandas as pd
 import os
+import sys
 
-def create_database():
-    """
-    Script de création et peuplement de la base de données SQLite
-    """
-    print("\n=== CRÉATION DE LA BASE DE DONNÉES ===")
-    
-    # Définir les chemins
-    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
-    data_path = os.path.join(base_dir, "data", "cleaned", "cleaned_air_quality_with_year.csv")
-    db_path = os.path.join(base_dir, "data", "air_quality.db")
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.cleaned_store import STORE_PATH, available_columns, available_years, load_cleaned_data
+from database.aggregates import AGGREGATE_SCHEMA, refresh_aggregates
 
-    # Charger le CSV nettoyé
-    print(f"Chargement du fichier nettoyé : {data_path}")
-    
-    if not os.path.exists(data_path):
-        print(f"Fichier CSV introuvable : {data_path}")
-        return False
-        
-    df = pd.read_csv(data_path)
+# Harmonisation des noms de colonnes avant insertion
+COLUMN_MAPPING = {
+    'COM Insee': 'com_insee',
+    'Commune': 'commune',
+    'Population': 'population',
+    'Année': 'annee',
+    'Moyenne annuelle de concentration de PM25 (ug/m3)': 'pm25',
+    'Moyenne annuelle de concentration de PM25 ponderee par la population (ug/m3)': 'pm25_pop',
+    'Moyenne annuelle de concentration de PM10 (ug/m3)': 'pm10',
+    'Moyenne annuelle de concentration de PM10 ponderee par la population (ug/m3)': 'pm10_pop',
+    'Moyenne annuelle de concentration de NO2 (ug/m3)': 'no2',
+    'Moyenne annuelle de concentration de NO2 ponderee par la population (ug/m3)': 'no2_pop',
+    'Moyenne annuelle de concentration de O3 (ug/m3)': 'o3',
+    'Moyenne annuelle de concentration de O3 ponderee par la population (ug/m3)': 'o3_pop',
+    "Moyenne annuelle d'AOT 40 (ug/m3.heure)": 'aot40',
+    'Moyenne annuelle de somo 35 (ug/m3.jour)': 'somo35',
+    'Moyenne annuelle de somo 35 pondere par la population (ug/m3.jour)': 'somo35_pop',
+}
 
-    # Connexion à la base (elle est créée si elle n'existe pas)
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
 
-    # Création de la table
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS air_quality (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        com_insee TEXT,
+# Colonnes de la table de faits (une ligne par commune et par année)
+MEASUREMENT_COLUMNS = [col for col in COLUMN_MAPPING.values() if col not in ("com_insee", "commune", "annee")]
+
+# Schéma en étoile : dimension des communes, table de faits des mesures
+# (table WITHOUT ROWID rangée dans l'ordre de sa clé (annee, commune_id) :
+# une année est une plage contiguë) et vue air_quality qui garde l'ancienne
+# table à plat pour les lecteurs existants. communes.com_insee est UNIQUE,
+# donc (com_insee, annee) est unique. load_state garde l'empreinte du
+# contenu de chaque année chargée.
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS communes (
+        commune_id INTEGER PRIMARY KEY,
+        com_insee TEXT NOT NULL UNIQUE,
         commune TEXT,
-        population REAL,
-        annee INTEGER,
+        latitude REAL,
+        longitude REAL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS measurements (
+        commune_id INTEGER NOT NULL REFERENCES communes(commune_id),
+        annee INTEGER NOT NULL,
+        population INTEGER,
         pm25 REAL,
         pm25_pop REAL,
         pm10 REAL,
@@ -45,59 +64,443 @@ def create_database():
         o3_pop REAL,
         aot40 REAL,
         somo35 REAL,
-        somo35_pop REAL
+        somo35_pop REAL,
+        PRIMARY KEY (annee, commune_id)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS load_state (
+        annee INTEGER PRIMARY KEY,
+        content_hash TEXT NOT NULL
     )
-    """)
-
-    conn.commit()
-
-    # Harmonisation des noms de colonnes avant insertion
-    mapping = {
-        'COM Insee': 'com_insee',
-        'Commune': 'commune',
-        'Population': 'population',
-        'Année': 'annee',
-        'Moyenne annuelle de concentration de PM25 (ug/m3)': 'pm25',
-        'Moyenne annuelle de concentration de PM25 ponderee par la population (ug/m3)': 'pm25_pop',
-        'Moyenne annuelle de concentration de PM10 (ug/m3)': 'pm10',
-        'Moyenne annuelle de concentration de PM10 ponderee par la population (ug/m3)': 'pm10_pop',
-        'Moyenne annuelle de concentration de NO2 (ug/m3)': 'no2',
-        'Moyenne annuelle de concentration de NO2 ponderee par la population (ug/m3)': 'no2_pop',
-        'Moyenne annuelle de concentration de O3 (ug/m3)': 'o3',
-        'Moyenne annuelle de concentration de O3 ponderee par la population (ug/m3)': 'o3_pop',
-        "Moyenne annuelle d'AOT 40 (ug/m3.heure)": 'aot40',
-        'Moyenne annuelle de somo 35 (ug/m3.jour)': 'somo35',
-        'Moyenne annuelle de somo 35 pondere par la population (ug/m3.jour)': 'somo35_pop',
-    }
-
-    df = df.rename(columns=mapping)
-
-    # Garder uniquement les colonnes utiles
-    cols = list(mapping.values())
-    df = df[cols]
-
-    # Vider la table avant insertion (optionnel)
-    cursor.execute("DELETE FROM air_quality")
-    conn.commit()
-
-    # Insérer les données dans SQLite
-    df.to_sql("air_quality", conn, if_exists="append", index=False)
-    conn.commit()
+    """,
+    f"""
+    CREATE VIEW IF NOT EXISTS air_quality AS
+    SELECT c.com_insee, c.commune, m.population, m.annee,
+           {", ".join("m." + col for col in MEASUREMENT_COLUMNS[1:])},
+           m.commune_id
+    FROM measurements m
+    JOIN communes c ON c.commune_id = m.commune_id
+    """,
+]
+
+# Coordonnées des communes (base officielle des codes postaux)
+COMMUNES_CSV = os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")),
+                            "data", "cleaned", "base-officielle-codes-postaux.csv")
+
+# Colonnes lues par la carte (src/visualizations/map.py)
+MAP_COLUMNS = ["com_insee", "commune", "population", "annee",
+               "pm25", "pm10", "no2", "o3", "aot40", "somo35"]
+
+# Index (nom, définition) créés une fois les données insérées. Les communes
+# sont numérotées dans l'ordre des codes INSEE au chargement complet, donc
+# trier par commune_id revient à trier par com_insee (une commune apparue
+# lors d'un chargement incrémental prend le numéro suivant). La carte et les tranches par année lisent
+# directement la clé primaire de measurements, sans index couvrant.
+INDEXES = [
+    # Historique d'une commune (l'index contient aussi annee, déjà trié)
+    ("idx_measurements_commune", "measurements(commune_id)"),
+]
+
+# Requêtes connues des lecteurs de la base : aucune ne doit parcourir une
+# table sans index ni trier dans un B-tree temporaire, sauf les lectures
+# complètes de FULL_READ_QUERIES qui parcourent la table de faits dans
+# l'ordre de sa clé
+KNOWN_QUERIES = {
+    "carte": f"SELECT {', '.join(MAP_COLUMNS)} FROM air_quality ORDER BY annee, commune_id",
+    "contrôle par année": "SELECT annee, count as nb_communes, mean as moyenne_no2 "
+                          "FROM pollutant_stats WHERE pollutant = 'no2' ORDER BY annee",
+    "histogramme": "SELECT bin_start, bin_end, count FROM pollutant_histograms "
+                   "WHERE pollutant = ? AND annee = ? ORDER BY bin",
+    "tranche d'une année": "SELECT * FROM air_quality WHERE annee = ? ORDER BY commune_id",
+    "historique d'une commune": "SELECT * FROM air_quality WHERE com_insee = ? ORDER BY annee",
+    "histogrammes de toutes les années": "SELECT annee, no2 FROM measurements",
+}
+FULL_READ_QUERIES = {"carte", "histogrammes de toutes les années"}
+
+
+def create_schema(conn):
+    """
+    Crée les tables et la vue si elles n'existent pas. Une base à l'ancien
+    format (table air_quality à plat) est convertie : la table est supprimée.
+
+    Returns:
+        bool: True si une ancienne table a été supprimée (la base est à compacter)
+    """
+    old_table = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'air_quality'"
+    ).fetchone()
+    if old_table:
+        print(" Ancienne table air_quality remplacée par les tables communes/measurements")
+        conn.execute("DROP TABLE air_quality")
+
+    for statement in SCHEMA + AGGREGATE_SCHEMA:
+        conn.execute(statement)
+    return old_table is not None
+
+
+def load_coordinates(coordinates_path=COMMUNES_CSV):
+    """
+    Charge les coordonnées des communes (une ligne par code INSEE), ou None si le fichier n'existe pas.
+    """
+    if not os.path.exists(coordinates_path):
+        print(f" Coordonnées des communes introuvables : {coordinates_path}")
+        return None
+    coordinates = pd.read_csv(coordinates_path, usecols=["code_commune_insee", "latitude", "longitude"],
+                              dtype={"code_commune_insee": str})
+    return coordinates.drop_duplicates(subset=["code_commune_insee"], keep="first")
+
+
+def add_coordinates(communes, coordinates):
+    """
+    Ajoute les colonnes latitude et longitude à un DataFrame de communes.
+    """
+    if coordinates is None:
+        communes["latitude"] = None
+        communes["longitude"] = None
+        return communes
+    return communes.merge(coordinates, how="left", left_on="com_insee",
+                          right_on="code_commune_insee").drop(columns=["code_commune_insee"])
+
+
+def drop_duplicate_rows(df):
+    """
+    Garde une seule ligne par commune et par année (la dernière), comme une suite d'upserts.
+    """
+    deduplicated = df.drop_duplicates(subset=["com_insee", "annee"], keep="last")
+    if len(deduplicated) < len(df):
+        print(f" Doublons (com_insee, annee) ignorés : {len(df) - len(deduplicated)}")
+    return deduplicated
+
+
+def year_hash(df_year):
+    """
+    Empreinte du contenu nettoyé d'une année (noms de colonnes et valeurs).
+    """
+    digest = hashlib.md5(",".join(df_year.columns).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df_year.reset_index(drop=True), index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def split_star_schema(df, coordinates_path=COMMUNES_CSV):
+    """
+    Sépare les données à plat en une dimension des communes et une table de faits.
+
+    Args:
+        df (pd.DataFrame): Les données, colonnes renommées (voir load_cleaned_table)
+        coordinates_path (str): CSV des coordonnées des communes (ignoré s'il n'existe pas)
+
+    Returns:
+        tuple: (communes, measurements), DataFrames dans l'ordre des colonnes des tables
+    """
+    # Une seule ligne par commune et par année (clé primaire de measurements)
+    df = drop_duplicate_rows(df)
+
+    # Dimension : nom le plus récent de chaque commune, identifiants dans l'ordre des codes INSEE
+    communes = (df.sort_values("annee", kind="stable")
+                  .drop_duplicates(subset=["com_insee"], keep="last")[["com_insee", "commune"]]
+                  .sort_values("com_insee")
+                  .reset_index(drop=True))
+    communes.insert(0, "commune_id", range(1, len(communes) + 1))
+    communes = add_coordinates(communes, load_coordinates(coordinates_path))
+
+    # Faits : la commune est remplacée par son identifiant, lignes dans
+    # l'ordre de la clé primaire (insertions en fin de B-tree)
+    commune_ids = communes.set_index("com_insee")["commune_id"]
+    columns = ["annee"] + [col for col in MEASUREMENT_COLUMNS if col in df.columns]
+    measurements = df[columns].copy()
+    measurements.insert(0, "commune_id", df["com_insee"].map(commune_ids).to_numpy())
+    measurements = measurements.sort_values(["annee", "commune_id"]).reset_index(drop=True)
+
+    return communes, measurements
+
+
+def iter_rows(df, chunk_size=50_000):
+    """
+    Itère sur les lignes du DataFrame sous forme de tuples de types Python
+    (str, int, float, None pour les valeurs manquantes), par blocs de chunk_size lignes.
+
+    Args:
+        df (pd.DataFrame): Les données à insérer
+        chunk_size (int): Nombre de lignes converties à la fois
+
+    Yields:
+        tuple: Une ligne prête pour sqlite3
+    """
+    for start in range(0, len(df), chunk_size):
+        chunk = df.iloc[start:start + chunk_size]
+        columns = []
+        for col in chunk.columns:
+            values = chunk[col]
+            if values.isna().any():
+                values = values.astype(object).where(values.notna(), None)
+            # tolist() convertit les types numpy en types Python natifs
+            columns.append(values.tolist())
+        yield from zip(*columns)
+
+
+def bulk_load(conn, tables):
+    """
+    Remplace le contenu des tables en une seule transaction : index supprimés,
+    executemany sur une requête préparée par table, puis index recréés.
+    Le journal WAL est activé et la synchronisation relâchée pendant le chargement.
+
+    Args:
+        conn (sqlite3.Connection): Connexion à la base
+        tables (list[tuple]): (table, DataFrame) dans l'ordre d'insertion
+            (une table avant celles qui la référencent)
+
+    Returns:
+        int: Nombre de lignes insérées
+    """
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA temp_store=MEMORY")
+
+    try:
+        conn.execute("BEGIN")
+        for name, _ in INDEXES:
+            conn.execute(f"DROP INDEX IF EXISTS {name}")
+        for table, _ in reversed(tables):
+            conn.execute(f"DELETE FROM {table}")
+        for table, df in tables:
+            columns = ", ".join(df.columns)
+            placeholders = ", ".join("?" * len(df.columns))
+            conn.executemany(f"INSERT INTO {table} ({columns}) VALUES ({placeholders})", iter_rows(df))
+        for name, definition in INDEXES:
+            conn.execute(f"CREATE INDEX {name} ON {definition}")
+        # Statistiques pour le planificateur de requêtes
+        conn.execute("ANALYZE")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.execute("PRAGMA synchronous=NORMAL")
+
+    return sum(len(df) for _, df in tables)
+
+
+def upsert_year(conn, df_year, annee, content_hash, coordinates):
+    """
+    Charge une année par upserts, en une transaction : les communes nouvelles
+    sont ajoutées, les mesures de l'année sont insérées ou mises à jour sur
+    leur clé (annee, commune_id) et celles des communes absentes sont supprimées.
+    Relancer le chargement avec les mêmes données ne change rien.
+
+    Args:
+        conn (sqlite3.Connection): Connexion ouverte avec isolation_level=None
+        df_year (pd.DataFrame): Les données de l'année (voir load_cleaned_table)
+        annee (int): L'année
+        content_hash (str): Empreinte du contenu de l'année (voir year_hash)
+        coordinates (pd.DataFrame): Coordonnées des communes (voir load_coordinates)
+
+    Returns:
+        int: Nombre de lignes de mesures écrites
+    """
+    df_year = drop_duplicate_rows(df_year)
+    communes = add_coordinates(df_year[["com_insee", "commune"]].copy(), coordinates)
+    communes["annee"] = annee
+    columns = [col for col in MEASUREMENT_COLUMNS if col in df_year.columns]
+
+    try:
+        conn.execute("BEGIN")
+        # Le nom d'une commune est celui de l'année la plus récente chargée
+        conn.executemany("""
+            INSERT INTO communes (com_insee, commune, latitude, longitude) VALUES (?, ?, ?, ?)
+            ON CONFLICT (com_insee) DO UPDATE SET commune = excluded.commune
+            WHERE ? >= COALESCE((SELECT MAX(annee) FROM measurements m
+                                 WHERE m.commune_id = communes.commune_id), 0)
+        """, iter_rows(communes[["com_insee", "commune", "latitude", "longitude", "annee"]]))
+
+        commune_ids = pd.Series(dict(conn.execute("SELECT com_insee, commune_id FROM communes")))
+        measurements = df_year[["annee"] + columns].copy()
+        measurements.insert(0, "commune_id", df_year["com_insee"].map(commune_ids).to_numpy())
+        measurements = measurements.sort_values("commune_id")
+
+        all_columns = ", ".join(measurements.columns)
+        placeholders = ", ".join("?" * len(measurements.columns))
+        updates = ", ".join(f"{col} = excluded.{col}" for col in columns)
+        conn.executemany(f"""
+            INSERT INTO measurements ({all_columns}) VALUES ({placeholders})
+            ON CONFLICT (annee, commune_id) DO UPDATE SET {updates}
+        """, iter_rows(measurements))
+
+        # Mesures des communes qui ne sont plus dans les données de l'année
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS year_communes (commune_id INTEGER PRIMARY KEY)")
+        conn.execute("DELETE FROM year_communes")
+        conn.executemany("INSERT INTO year_communes VALUES (?)",
+                         ((int(commune_id),) for commune_id in measurements["commune_id"]))
+        conn.execute("DELETE FROM measurements WHERE annee = ? "
+                     "AND commune_id NOT IN (SELECT commune_id FROM year_communes)", [annee])
+
+        conn.execute("INSERT INTO load_state (annee, content_hash) VALUES (?, ?) "
+                     "ON CONFLICT (annee) DO UPDATE SET content_hash = excluded.content_hash",
+                     [annee, content_hash])
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+    return len(measurements)
+
+
+def delete_years(conn, years):
+    """
+    Supprime les mesures des années qui ne sont plus dans les données nettoyées,
+    puis les communes qui n'ont plus de mesures.
+    """
+    try:
+        conn.execute("BEGIN")
+        for annee in years:
+            conn.execute("DELETE FROM measurements WHERE annee = ?", [annee])
+            conn.execute("DELETE FROM load_state WHERE annee = ?", [annee])
+        conn.execute("DELETE FROM communes WHERE commune_id NOT IN (SELECT commune_id FROM measurements)")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def check_query_plans(conn, queries=KNOWN_QUERIES, full_reads=FULL_READ_QUERIES):
+    """
+    Vérifie avec EXPLAIN QUERY PLAN que chaque requête connue utilise un index :
+    un parcours de table sans index (SCAN <table>) ou un tri dans un B-tree
+    temporaire est signalé comme une erreur.
+
+    Args:
+        conn (sqlite3.Connection): Connexion à la base
+        queries (dict): Requêtes à vérifier (nom -> SQL, paramètres '?' acceptés)
+        full_reads (set): Requêtes qui lisent toute la table de faits : le
+            parcours de sa clé primaire est accepté, pas un tri temporaire
+
+    Returns:
+        list[str]: Les problèmes trouvés (liste vide si tous les plans sont bons)
+    """
+    problems = []
+    for name, query in queries.items():
+        params = [None] * query.count("?")
+        for _, _, _, detail in conn.execute("EXPLAIN QUERY PLAN " + query, params):
+            table_scan = detail.startswith("SCAN") and "INDEX" not in detail and name not in full_reads
+            if table_scan or "TEMP B-TREE" in detail:
+                problems.append(f"{name} : {detail}")
+    return problems
+
+
+def load_cleaned_table(data_path=STORE_PATH, years=None):
+    """
+    Charge les données nettoyées (de toutes les années, ou des années données)
+    avec les noms de colonnes de la table air_quality.
+    """
+    # Lire uniquement les colonnes utiles, déjà typées
+    columns = [col for col in COLUMN_MAPPING if col in available_columns(data_path)]
+    df = load_cleaned_data(columns=columns, years=years, store_path=data_path)
+    df = df.rename(columns=COLUMN_MAPPING)
+
+    # Garder uniquement les colonnes utiles (dans l'ordre de la table)
+    cols = [col for col in COLUMN_MAPPING.values() if col in df.columns]
+    return df[cols]
+
+
+def create_database(full=False):
+    """
+    Script de création et peuplement de la base de données SQLite.
+    Seules les années dont le contenu nettoyé a changé depuis le dernier
+    chargement sont réécrites (upserts), sauf au premier chargement ou avec
+    full=True où toute la base est rechargée en masse.
+    """
+    print("\n=== CRÉATION DE LA BASE DE DONNÉES ===")
+    
+    # Définir les chemins
+    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+    data_path = STORE_PATH
+    db_path = os.path.join(base_dir, "data", "air_quality.db")
+
+    # Charger les données nettoyées (store Parquet)
+    print(f"Chargement des données nettoyées : {data_path}")
+    
+    if not os.path.exists(data_path):
+        print(f"Données nettoyées introuvables : {data_path}")
+        return False
+
+    # Connexion à la base (elle est créée si elle n'existe pas).
+    # Les transactions sont gérées explicitement par bulk_load.
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    cursor = conn.cursor()
+
+    # Création des tables (conversion d'une base à l'ancien format)
+    migrated = create_schema(conn)
+    empty = cursor.execute("SELECT 1 FROM measurements LIMIT 1").fetchone() is None
+
+    if full or empty:
+        df = load_cleaned_table(data_path)
+        communes, measurements = split_star_schema(df)
+        load_state = pd.DataFrame(
+            [(int(annee), year_hash(df_year)) for annee, df_year in df.groupby("annee", sort=True)],
+            columns=["annee", "content_hash"]
+        )
+
+        # Remplacer le contenu des tables en une seule transaction
+        bulk_load(conn, [("communes", communes), ("measurements", measurements), ("load_state", load_state)])
+        changed_years = None
+        print(f" Chargement complet : {len(load_state)} années")
+    else:
+        # Comparer l'empreinte de chaque année avec celle du dernier chargement
+        loaded = dict(cursor.execute("SELECT annee, content_hash FROM load_state"))
+        years = available_years(data_path)
+        coordinates = load_coordinates()
+        changed_years = []
+        for annee in years:
+            df_year = load_cleaned_table(data_path, years=[annee])
+            content_hash = year_hash(df_year)
+            if loaded.get(annee) == content_hash:
+                continue
+            written = upsert_year(conn, df_year, annee, content_hash, coordinates)
+            changed_years.append(annee)
+            print(f" Année {annee} chargée : {written} lignes")
+
+        removed = sorted(set(loaded) - set(years))
+        if removed:
+            delete_years(conn, removed)
+            print(f" Années supprimées : {removed}")
+        print(f" Années modifiées : {changed_years if changed_years else 'aucune'}")
+
+    # Agrégats par (polluant, année) lus à la place de la table de faits
+    refresh_aggregates(conn, changed_years)
+
+    # Récupérer la place de l'ancienne table
+    if migrated:
+        conn.execute("VACUUM")
 
     # Vérification
-    count = cursor.execute("SELECT COUNT(*) FROM air_quality").fetchone()[0]
+    count = cursor.execute("SELECT COUNT(*) FROM measurements").fetchone()[0]
+    nb_communes = cursor.execute("SELECT COUNT(*) FROM communes").fetchone()[0]
     
     print(f" Base de données créée avec succès : {db_path}")
-    print(f"Nombre de lignes insérées : {count}")
+    print(f"Nombre de lignes insérées : {count} ({nb_communes} communes)")
 
     # Test query
-    query = "SELECT annee, COUNT(*) as nb_communes, AVG(no2) as moyenne_no2 FROM air_quality GROUP BY annee;"
+    query = KNOWN_QUERIES["contrôle par année"]
     df_test = pd.read_sql_query(query, conn)
     print("\ Données par année :")
     print(df_test)
 
+    # Contrôle des plans d'exécution des requêtes connues
+    problems = check_query_plans(conn)
     conn.close()
+
+    if problems:
+        print(" Requêtes sans index adapté :")
+        for problem in problems:
+            print(f"  - {problem}")
+        return False
+
+    print(" Plans d'exécution vérifiés : toutes les requêtes connues utilisent un index")
     return True
 
 if __name__ == "__main__":
-    create_database()
+    parser = argparse.ArgumentParser(description="Création de la base SQLite à partir des données nettoyées")
+    parser.add_argument("--full", action="store_true",
+                        help="tout recharger au lieu des seules années modifiées")
+    args = parser.parse_args()
+    sys.exit(0 if create_database(full=args.full) else 1)
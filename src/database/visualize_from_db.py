@@ -1,20 +1,84 @@
 # visualize_from_database.py
 import os
 import sqlite3
+import argparse
+import itertools
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
 from plotly.io import write_html
-from src.utils.common_functions import load_commune_mappings
-from src.visualizations.scatter_plots import create_pollution_scatter
-from src.visualizations.histograms import create_pollution_histogram
+from src.utils.common_functions import commune_mappings_version, load_commune_mappings
+from src.visualizations.scatter_plots import (create_large_scatter, create_pollution_scatter, downsample_scatter,
+                                              scatter_column, scatter_fields, scatter_yaxis)
+from src.visualizations.histograms import (binned_histogram_fields, comparison_histogram_fields,
+                                           create_binned_histogram, create_comparison_histogram,
+                                           create_evolution_histogram, histogram_layout, HOVER_TEMPLATE)
+from src.visualizations.figure_templates import FigureTemplates, write_figure
+from src.visualizations.animated_figures import (create_animated_histogram, create_animated_scatter, play_buttons,
+                                                 year_slider)
+from src.database.aggregates import load_histogram
+from src.utils.histogram_bins import POLLUTANT_BINS, bin_edges, year_bin_counts
+from src.visualizations.render_cache import RenderCache, function_version
+
+base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+db_path = os.path.join(base_dir, "data", "air_quality.db")
+
+# CORRECTION : Mapping vers les noms attendus par les fonctions de visualisation
+RENAME_MAPPING = {
+    "com_insee": "COM Insee",
+    "commune": "Commune", 
+    "population": "Population",
+    "annee": "Année",
+    "pm25": "Moyenne annuelle de concentration de PM25 (ug/m3)",
+    "pm25_pop": "Moyenne annuelle de concentration de PM25 ponderee (ug/m3)",  # SUPPRIMÉ "par la population"
+    "pm10": "Moyenne annuelle de concentration de PM10 (ug/m3)", 
+    "pm10_pop": "Moyenne annuelle de concentration de PM10 ponderee (ug/m3)",  # SUPPRIMÉ "par la population"
+    "no2": "Moyenne annuelle de concentration de NO2 (ug/m3)",
+    "no2_pop": "Moyenne annuelle de concentration de NO2 ponderee (ug/m3)",    # SUPPRIMÉ "par la population"
+    "o3": "Moyenne annuelle de concentration de O3 (ug/m3)",
+    "o3_pop": "Moyenne annuelle de concentration de O3 ponderee (ug/m3)",      # SUPPRIMÉ "par la population"
+    "aot40": "Moyenne annuelle de concentration de AOT40 (ug/m3)",             # CORRIGÉ
+    "somo35": "Moyenne annuelle de concentration de SOMO35 (ug/m3)",           # CORRIGÉ
+    "somo35_pop": "Moyenne annuelle de concentration de SOMO35 ponderee (ug/m3)" # SUPPRIMÉ "par la population"
+}
+
+# Polluants tracés : nom passé aux fonctions de visualisation -> colonne de la base
+POLLUTANTS = {
+    'NO2': 'no2',
+    'NO2 ponderee': 'no2_pop',
+    'PM10': 'pm10',
+    'PM10 ponderee': 'pm10_pop',
+    'PM25': 'pm25',
+    'PM25 ponderee': 'pm25_pop',
+    'O3': 'o3',
+    'O3 ponderee': 'o3_pop',
+    'AOT40': 'aot40',
+    'SOMO35': 'somo35',
+    'SOMO35 ponderee': 'somo35_pop',
+}
+
+# Colonnes lues en plus des polluants (scatter : code INSEE et population)
+BASE_COLUMNS = ["com_insee", "population", "annee"]
+
+# Dossier de sortie par défaut des graphiques, lu par les visionneuses
+# superpose_histograms.py et superpose_scatter_plots.py (voir --output-dir)
+OUTPUT_DIR = os.path.join(base_dir, "src", "database", "output")
+
+# Types de graphiques générés pour chaque (année, polluant)
+KINDS = ("scatter", "histogram")
+
+# Options des nuages de points (voir create_pollution_scatter) : axe de
+# population logarithmique, au plus 5000 points par graphique ; le rendu
+# WebGL ("large") n'est activé que par --large
+SCATTER_OPTIONS = {"large": False, "max_points": 5000, "log_x": True}
+
+# État d'un processus de rendu (voir init_render_worker)
+_worker = {}
 
 
 def load_data_from_database():
     """
     Charge les données depuis la base SQLite
     """
-    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
-    db_path = os.path.join(base_dir, "data", "air_quality.db")
-
     if not os.path.exists(db_path):
         print(f" Base de données introuvable : {db_path}")
         return None
@@ -32,121 +96,559 @@ def prepare_data(df):
     Prépare les données en harmonisant les noms de colonnes
     pour la compatibilité avec les fonctions de visualisation
     """
-    # CORRECTION : Mapping vers les noms attendus par les fonctions de visualisation
-    rename_mapping = {
-        "com_insee": "COM Insee",
-        "commune": "Commune", 
-        "population": "Population",
-        "annee": "Année",
-        "pm25": "Moyenne annuelle de concentration de PM25 (ug/m3)",
-        "pm25_pop": "Moyenne annuelle de concentration de PM25 ponderee (ug/m3)",  # SUPPRIMÉ "par la population"
-        "pm10": "Moyenne annuelle de concentration de PM10 (ug/m3)", 
-        "pm10_pop": "Moyenne annuelle de concentration de PM10 ponderee (ug/m3)",  # SUPPRIMÉ "par la population"
-        "no2": "Moyenne annuelle de concentration de NO2 (ug/m3)",
-        "no2_pop": "Moyenne annuelle de concentration de NO2 ponderee (ug/m3)",    # SUPPRIMÉ "par la population"
-        "o3": "Moyenne annuelle de concentration de O3 (ug/m3)",
-        "o3_pop": "Moyenne annuelle de concentration de O3 ponderee (ug/m3)",      # SUPPRIMÉ "par la population"
-        "aot40": "Moyenne annuelle de concentration de AOT40 (ug/m3)",             # CORRIGÉ
-        "somo35": "Moyenne annuelle de concentration de SOMO35 (ug/m3)",           # CORRIGÉ
-        "somo35_pop": "Moyenne annuelle de concentration de SOMO35 ponderee (ug/m3)" # SUPPRIMÉ "par la population"
-    }
-
-    df.rename(columns=rename_mapping, inplace=True)
+    df.rename(columns=RENAME_MAPPING, inplace=True)
     return df
 
 
-def generate_visualizations():
+def load_years(conn):
+    """
+    Renvoie la liste des années chargées dans la base (table load_state).
+    """
+    return [row[0] for row in conn.execute("SELECT annee FROM load_state ORDER BY annee")]
+
+
+def load_year_hashes(conn):
+    """
+    Renvoie l'empreinte du contenu de chaque année chargée (table load_state).
+    """
+    return dict(conn.execute("SELECT annee, content_hash FROM load_state ORDER BY annee"))
+
+
+def figure_name(année, polluant, kind):
+    """
+    Nom du fichier HTML d'un graphique.
+    """
+    return f"{polluant.replace(' ', '_')}_{année}_{kind}.html"
+
+
+def animation_name(polluant, kind):
+    """
+    Nom du fichier HTML d'un graphique animé (toutes les années).
+    """
+    return f"{polluant.replace(' ', '_')}_{kind}_animation.html"
+
+
+def comparison_name(polluant, année1, année2):
+    """
+    Nom du fichier HTML de la comparaison des histogrammes de deux années (année1 < année2).
+    """
+    return f"{polluant.replace(' ', '_')}_histogram_comparison_{année1}_{année2}.html"
+
+
+def evolution_name(polluant):
+    """
+    Nom du fichier HTML de l'évolution des histogrammes d'un polluant.
+    """
+    return f"{polluant.replace(' ', '_')}_histogram_evolution.html"
+
+
+def is_comparison_name(name):
+    """
+    Indique si un fichier a été écrit par generate_histogram_comparisons.
+    """
+    return "_histogram_comparison_" in name or name.endswith("_histogram_evolution.html")
+
+
+def read_year(conn, année, pollutants):
+    """
+    Lit une année par une requête sur la clé primaire de la table measurements,
+    avec les seules colonnes des polluants demandés.
+    """
+    columns = BASE_COLUMNS + [POLLUTANTS[polluant] for polluant in pollutants]
+    query = f"SELECT {', '.join(columns)} FROM air_quality WHERE annee = ? ORDER BY commune_id"
+    return prepare_data(pd.read_sql_query(query, conn, params=[année]))
+
+
+def iter_years_from_database(conn, années, pollutants):
+    """
+    Lit la base une année à la fois (voir read_year) : une seule année est en mémoire à la fois.
+
+    Args:
+        conn (sqlite3.Connection): Connexion à la base
+        années (list[int]): Années à lire
+        pollutants (list[str]): Polluants tracés (clés de POLLUTANTS)
+
+    Yields:
+        tuple: (année, DataFrame préparé par prepare_data)
+    """
+    for année in années:
+        yield année, read_year(conn, année, pollutants)
+
+
+def init_render_worker(db_path, pollutants, insee_to_commune, output_dir, scatter_options=None):
+    """
+    Initialise un processus de rendu : il ouvre sa propre connexion en lecture
+    seule et reçoit une seule fois les correspondances des communes (au lieu
+    d'une fois par tâche). Chaque processus garde ses gabarits de figures.
+    """
+    _worker.clear()
+    _worker.update(
+        conn=sqlite3.connect(f"file:{db_path}?mode=ro", uri=True),
+        pollutants=pollutants,
+        insee_to_commune=insee_to_commune,
+        output_dir=output_dir,
+        scatter_options=scatter_options or {},
+        templates=FigureTemplates(),
+        année=None,
+        data=None,
+    )
+
+
+def worker_year(année):
+    """
+    Renvoie les données d'une année : elles ne sont relues que lorsque
+    le processus passe à une autre année.
+    """
+    if _worker["année"] != année:
+        _worker["data"] = None
+        _worker["data"] = read_year(_worker["conn"], année, _worker["pollutants"])
+        _worker["année"] = année
+    return _worker["data"]
+
+
+def render_task(task):
+    """
+    Génère et écrit un graphique.
+
+    Args:
+        task (tuple): (année, polluant, type de graphique parmi KINDS)
+
+    Returns:
+        tuple: (task, statut, message), statut 'ok' (message : fichier écrit),
+        'ignoré' ou 'erreur' (message : la raison)
+    """
+    année, polluant, kind = task
+    try:
+        data_année = worker_year(année)
+        colonne = RENAME_MAPPING[POLLUTANTS[polluant]]
+
+        # Vérification plus détaillée
+        if colonne not in data_année.columns:
+            return task, "ignoré", f"Colonne '{colonne}' non trouvée"
+
+        # Vérifier s'il y a des données non nulles
+        if data_année[colonne].isna().all():
+            return task, "ignoré", "Données manquantes"
+
+        # Figures construites à partir d'un gabarit par (type, polluant) : seules
+        # les données changent d'une année à l'autre (voir FigureTemplates)
+        templates = _worker["templates"]
+        if kind == "scatter":
+            options = _worker["scatter_options"]
+            trace_fields, layout_fields = scatter_fields(data_année, _worker["insee_to_commune"], polluant,
+                                                         **options)
+            fig = templates.figure((kind, polluant), lambda: create_pollution_scatter(
+                data_année, _worker["insee_to_commune"], polluant, **options), trace_fields, layout_fields)
+        else:
+            # Histogramme pré-calculé par create_db (table pollutant_histograms) :
+            # le fichier ne contient que les effectifs des classes
+            bins = load_histogram(_worker["conn"], POLLUTANTS[polluant], année)
+            edges = list(bins["bin_start"]) + list(bins["bin_end"].tail(1))
+            fig = templates.figure((kind, polluant), lambda: create_binned_histogram(edges, bins["count"], polluant),
+                                   binned_histogram_fields(edges, bins["count"]))
+        output_file = os.path.join(_worker["output_dir"], figure_name(année, polluant, kind))
+        write_figure(fig, output_file, auto_open=False, include_plotlyjs='cdn')
+        return task, "ok", output_file
+    except Exception as e:
+        return task, "erreur", f"{type(e).__name__}: {e}"
+
+
+def generate_visualizations(pollutants=None, workers=None, scatter_options=None, output_dir=None):
     """
     Script de visualisation des données de pollution à partir de la base SQLite.
     Génère des graphiques (scatter + histogrammes) pour chaque polluant et chaque année.
+    Les graphiques sont générés en parallèle, une tâche par (année, polluant, type).
+
+    Args:
+        pollutants (list[str]): Polluants à tracer (clés de POLLUTANTS, par défaut tous)
+        workers (int): Nombre de processus de rendu (défaut : nombre de CPU, 1 pour tout faire dans ce processus)
+        scatter_options (dict): Options des nuages de points (défaut : SCATTER_OPTIONS)
+        output_dir (str): Dossier des fichiers HTML (défaut : OUTPUT_DIR)
     """
     print("\n=== VISUALISATION À PARTIR DE LA BASE DE DONNÉES ===")
 
+    if not os.path.exists(db_path):
+        print(f" Base de données introuvable : {db_path}")
+        return
+
+    if pollutants is None:
+        pollutants = list(POLLUTANTS)
+    if scatter_options is None:
+        scatter_options = SCATTER_OPTIONS
+
+    # Debug : afficher les colonnes lues
+    print("Colonnes lues après renommage :")
+    for col in BASE_COLUMNS + [POLLUTANTS[polluant] for polluant in pollutants]:
+        print(f"  - {RENAME_MAPPING[col]}")
+    print()
+
+    # Vérification des années disponibles (et empreinte de leur contenu)
+    conn = sqlite3.connect(db_path)
+    year_hashes = load_year_hashes(conn)
+    conn.close()
+    années = list(year_hashes)
+    print(f"Années trouvées dans la base : {années}\n")
+
+    # Créer le dossier de sortie
+    if output_dir is None:
+        output_dir = OUTPUT_DIR
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Cache de rendu : la clé d'un graphique combine l'empreinte de son année,
+    # le polluant, le type et la version de la fonction qui le dessine (et
+    # celle des correspondances des communes pour les nuages de points)
+    cache = RenderCache(output_dir)
+    versions = {
+        "scatter": (function_version(create_pollution_scatter, create_large_scatter, downsample_scatter,
+                                     scatter_fields, scatter_column, scatter_yaxis),
+                    commune_mappings_version(), repr(sorted(scatter_options.items()))),
+        "histogram": (function_version(create_binned_histogram, histogram_layout, binned_histogram_fields),
+                      HOVER_TEMPLATE, repr(sorted(POLLUTANT_BINS.items()))),
+    }
+
+    # Une tâche par graphique à regénérer, groupées par année
+    keys = {}
+    for année in années:
+        for polluant in pollutants:
+            for kind in KINDS:
+                key = cache.key(year_hashes[année], polluant, kind, *versions[kind])
+                if not cache.is_fresh(figure_name(année, polluant, kind), key):
+                    keys[(année, polluant, kind)] = key
+    tasks = list(keys)
+
+    # Les graphiques des années ou polluants disparus sont supprimés
+    cache.evict((figure_name(année, polluant, kind)
+                 for année in années for polluant in POLLUTANTS for kind in KINDS),
+                owns=lambda name: not is_comparison_name(name))
+
+    if not tasks:
+        cache.save()
+        cache.report()
+        print("Aucun graphique à regénérer.")
+        return
+
+    # Charger les correspondances des communes
+    commune_to_insee, insee_to_commune = load_commune_mappings()
+    if commune_to_insee is None or insee_to_commune is None:
+        print(" Impossible de charger les correspondances des communes.")
+        cache.save()
+        return
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(tasks))
+    initargs = (db_path, pollutants, insee_to_commune, output_dir, scatter_options)
+    print(f"Génération de {len(tasks)} graphiques avec {workers} processus...")
+
+    counts = {"ok": 0, "ignoré": 0, "erreur": 0}
+    errors = []
+    executor = None
     try:
-        # Charger les données
-        result = load_data_from_database()
-        if result is None:
-            return
-        df, base_dir = result
-
-        print(f" {len(df)} lignes chargées depuis la base de données\n")
-
-        # Préparer les données
-        df = prepare_data(df)
-
-        # Debug : afficher les colonnes disponibles
-        print("Colonnes disponibles après renommage :")
-        for col in df.columns:
-            print(f"  - {col}")
-        print()
-
-        # Charger les correspondances des communes
-        commune_to_insee, insee_to_commune = load_commune_mappings()
-        if commune_to_insee is None or insee_to_commune is None:
-            print(" Impossible de charger les correspondances des communes.")
-            return
-
-        # Vérification des années disponibles
-        années = sorted(df["Année"].unique())
-        print(f"Années trouvées dans la base : {années}\n")
-
-        # Créer le dossier de sortie
-        output_dir = os.path.join(base_dir, "src", "database", "output")
-        os.makedirs(output_dir, exist_ok=True)
-
-        # CORRECTION : Définir les polluants avec les noms exacts attendus par les fonctions
-        noms_colonnes = {
-            'NO2': "Moyenne annuelle de concentration de NO2 (ug/m3)",
-            'NO2 ponderee': "Moyenne annuelle de concentration de NO2 ponderee (ug/m3)",
-            'PM10': "Moyenne annuelle de concentration de PM10 (ug/m3)",
-            'PM10 ponderee': "Moyenne annuelle de concentration de PM10 ponderee (ug/m3)",
-            'PM25': "Moyenne annuelle de concentration de PM25 (ug/m3)",
-            'PM25 ponderee': "Moyenne annuelle de concentration de PM25 ponderee (ug/m3)",
-            'O3': "Moyenne annuelle de concentration de O3 (ug/m3)",
-            'O3 ponderee': "Moyenne annuelle de concentration de O3 ponderee (ug/m3)",
-            'AOT40': "Moyenne annuelle de concentration de AOT40 (ug/m3)",
-            'SOMO35': "Moyenne annuelle de concentration de SOMO35 (ug/m3)",
-            'SOMO35 ponderee': "Moyenne annuelle de concentration de SOMO35 ponderee (ug/m3)"
-        }
-
-        # Génération des graphiques
-        for année in années:
-            print(f" Traitement de l'année {année}...")
-            data_année = df[df["Année"] == année]
-
-            for polluant, colonne in noms_colonnes.items():
-                # Vérification plus détaillée
-                if colonne not in data_année.columns:
-                    print(f"Colonne '{colonne}' non trouvée pour {polluant} en {année}")
-                    continue
-                
-                # Vérifier s'il y a des données non nulles
-                if data_année[colonne].isna().all():
-                    print(f"Données manquantes pour {polluant} en {année}")
-                    continue
+        if workers <= 1:
+            init_render_worker(*initargs)
+            results = map(render_task, tasks)
+        else:
+            executor = ProcessPoolExecutor(max_workers=workers, initializer=init_render_worker,
+                                           initargs=initargs)
+            # Les tâches d'une même année sont envoyées ensemble au même
+            # processus : chaque année n'y est lue qu'une fois
+            results = executor.map(render_task, tasks, chunksize=len(pollutants) * len(KINDS))
 
-                print(f"Génération des graphiques pour {polluant}...")
+        for task, status, message in results:
+            année, polluant, kind = task
+            counts[status] += 1
+            if status == "ok":
+                cache.store(figure_name(année, polluant, kind), keys[task])
+                print(f"Graphique {kind} généré pour {polluant} ({année})")
+            elif status == "ignoré":
+                cache.discard(figure_name(année, polluant, kind))
+                print(f"{message} pour {polluant} en {année}")
+            else:
+                # Pas de clé enregistrée : le graphique sera regénéré au prochain lancement
+                cache.discard(figure_name(année, polluant, kind))
+                errors.append(f"{polluant} ({année}, {kind}) : {message}")
+                print(f"Erreur sur {polluant} ({année}, {kind}) : {message}")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        cache.save()
 
-                try:
-                    # Créer et sauvegarder le graphique de dispersion
-                    fig_scatter = create_pollution_scatter(data_année, insee_to_commune, polluant)
-                    scatter_file = os.path.join(output_dir, f"{polluant.replace(' ', '_')}_{année}_scatter.html")
-                    write_html(fig_scatter, scatter_file, auto_open=False, include_plotlyjs='cdn')
+    print(f"\n{counts['ok']} graphiques générés, {counts['ignoré']} ignorés, {counts['erreur']} erreurs.")
+    cache.report()
+    for error in errors:
+        print(f"  - {error}")
+    print(f"Toutes les visualisations ont été générées dans le dossier '{output_dir}'.")
+
+
+def generate_animated_visualizations(pollutants=None, scatter_options=None, output_dir=None):
+    """
+    Variante de generate_visualizations qui écrit un seul fichier par polluant
+    et par type de graphique : toutes les années sont les images d'une
+    animation (curseur des années). La mise en page n'est écrite qu'une fois
+    et chaque image ne contient que les données d'une année.
+
+    Args:
+        pollutants (list[str]): Polluants à tracer (clés de POLLUTANTS, par défaut tous)
+        scatter_options (dict): Options des nuages de points (défaut : SCATTER_OPTIONS,
+            toujours en mode large : axe numérique de population)
+        output_dir (str): Dossier des fichiers HTML (défaut : OUTPUT_DIR)
+    """
+    print("\n=== VISUALISATIONS ANIMÉES À PARTIR DE LA BASE DE DONNÉES ===")
 
-                    # Créer et sauvegarder l'histogramme
-                    fig_hist = create_pollution_histogram(data_année, polluant)
-                    hist_file = os.path.join(output_dir, f"{polluant.replace(' ', '_')}_{année}_histogram.html")
-                    write_html(fig_hist, hist_file, auto_open=False, include_plotlyjs='cdn')
+    if not os.path.exists(db_path):
+        print(f" Base de données introuvable : {db_path}")
+        return
+
+    if pollutants is None:
+        pollutants = list(POLLUTANTS)
+    options = dict(SCATTER_OPTIONS if scatter_options is None else scatter_options, large=True)
+
+    conn = sqlite3.connect(db_path)
+    year_hashes = load_year_hashes(conn)
+    années = list(year_hashes)
+    print(f"Années trouvées dans la base : {années}\n")
+
+    if output_dir is None:
+        output_dir = OUTPUT_DIR
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Un graphique animé dépend de toutes les années : sa clé combine leurs empreintes
+    cache = RenderCache(output_dir)
+    data_version = cache.key(*[f"{année}:{content_hash}" for année, content_hash in year_hashes.items()])
+    versions = {
+        "scatter": (function_version(create_animated_scatter, create_large_scatter, downsample_scatter,
+                                     scatter_fields, scatter_column, scatter_yaxis, year_slider, play_buttons),
+                    commune_mappings_version(), repr(sorted(options.items()))),
+        "histogram": (function_version(create_animated_histogram, create_binned_histogram, histogram_layout,
+                                       binned_histogram_fields, year_slider, play_buttons),
+                      HOVER_TEMPLATE, repr(sorted(POLLUTANT_BINS.items()))),
+    }
+    keys = {}
+    for polluant in pollutants:
+        for kind in KINDS:
+            key = cache.key(data_version, polluant, kind, *versions[kind])
+            if not cache.is_fresh(animation_name(polluant, kind), key):
+                keys[(polluant, kind)] = key
 
-                    print(f"Graphiques générés avec succès pour {polluant}")
+    # Les graphiques par année et ceux des polluants disparus sont supprimés
+    cache.evict((animation_name(polluant, kind) for polluant in POLLUTANTS for kind in KINDS),
+                owns=lambda name: not is_comparison_name(name))
+
+    if not keys:
+        conn.close()
+        cache.save()
+        cache.report()
+        print("Aucun graphique à regénérer.")
+        return
+
+    commune_to_insee, insee_to_commune = load_commune_mappings()
+    if commune_to_insee is None or insee_to_commune is None:
+        print(" Impossible de charger les correspondances des communes.")
+        conn.close()
+        cache.save()
+        return
+
+    # Lecture de la base une année à la fois : seules les données des images sont gardées.
+    # Une erreur sur une (année, polluant) compte comme une erreur : l'animation est
+    # écrite sans cette année mais pas enregistrée dans le cache (réessayée au prochain lancement)
+    scatters = {polluant: {} for polluant in pollutants}
+    histograms = {polluant: {} for polluant in pollutants}
+    edges = {}
+    failed = set()
+    counts = {"ok": 0, "ignoré": 0, "erreur": 0}
+    for année, data_année in iter_years_from_database(conn, années, pollutants):
+        for polluant in pollutants:
+            colonne = RENAME_MAPPING[POLLUTANTS[polluant]]
+            if colonne not in data_année.columns or data_année[colonne].isna().all():
+                continue
+            for kind in KINDS:
+                if (polluant, kind) not in keys:
+                    continue
+                try:
+                    if kind == "scatter":
+                        scatters[polluant][année] = scatter_fields(data_année, insee_to_commune, polluant, **options)
+                    else:
+                        bins = load_histogram(conn, POLLUTANTS[polluant], année)
+                        edges[polluant] = list(bins["bin_start"]) + list(bins["bin_end"].tail(1))
+                        histograms[polluant][année] = bins["count"].tolist()
                 except Exception as e:
-                    print(f"Erreur sur {polluant} ({année}) : {str(e)}")
+                    counts["erreur"] += 1
+                    failed.add((polluant, kind))
+                    print(f"Erreur sur {polluant} ({kind}) pour {année} : {type(e).__name__}: {e}")
+    conn.close()
+
+    try:
+        for (polluant, kind), key in keys.items():
+            name = animation_name(polluant, kind)
+            by_year = scatters[polluant] if kind == "scatter" else histograms[polluant]
+            if not by_year:
+                cache.discard(name)
+                # Toutes les années en erreur : déjà comptées
+                if (polluant, kind) not in failed:
+                    counts["ignoré"] += 1
+                    print(f"Données manquantes pour {polluant}")
+                continue
+            try:
+                if kind == "scatter":
+                    fig = create_animated_scatter(by_year, polluant, options["log_x"])
+                else:
+                    fig = create_animated_histogram(edges[polluant], by_year, polluant)
+                write_html(fig, os.path.join(output_dir, name), auto_open=False, include_plotlyjs='cdn')
+            except Exception as e:
+                counts["erreur"] += 1
+                cache.discard(name)
+                print(f"Erreur sur {polluant} ({kind}) : {type(e).__name__}: {e}")
+                continue
+            counts["ok"] += 1
+            if (polluant, kind) not in failed:
+                cache.store(name, key)
+            print(f"Graphique {kind} animé généré pour {polluant} ({len(by_year)} années)")
+    finally:
+        cache.save()
 
-        print("\nToutes les visualisations ont été générées dans le dossier 'output'.")
+    print(f"\n{counts['ok']} graphiques générés, {counts['ignoré']} ignorés, {counts['erreur']} erreurs.")
+    cache.report()
+    print(f"Toutes les visualisations ont été générées dans le dossier '{output_dir}'.")
 
-    except Exception as e:
-        print(f"\n Une erreur s'est produite : {str(e)}")
+
+def read_year_bins(conn, pollutants):
+    """
+    Calcule les histogrammes de toutes les années en un seul passage sur la
+    table measurements : une lecture des colonnes des polluants, puis un
+    comptage vectorisé par (année, classe) pour chaque polluant (year_bin_counts).
+
+    Returns:
+        dict: Polluant -> (années ayant des valeurs, effectifs de forme (années, classes))
+    """
+    columns = [POLLUTANTS[polluant] for polluant in pollutants]
+    df = pd.read_sql_query(f"SELECT annee, {', '.join(columns)} FROM measurements", conn)
+    return {polluant: year_bin_counts(df["annee"], df[POLLUTANTS[polluant]], POLLUTANTS[polluant])
+            for polluant in pollutants}
+
+
+def generate_histogram_comparisons(pollutants=None, output_dir=None):
+    """
+    Génère les histogrammes de comparaison de deux années et d'évolution
+    demandés par la visionneuse des histogrammes (superpose_histograms.py).
+    Les effectifs de toutes les années sont calculés une seule fois (voir
+    read_year_bins), puis chaque paire d'années est dessinée à partir de ces
+    effectifs, seulement si son fichier n'est pas à jour dans le cache de rendu.
+
+    Args:
+        pollutants (list[str]): Polluants à tracer (clés de POLLUTANTS, par défaut tous)
+        output_dir (str): Dossier des fichiers HTML (défaut : OUTPUT_DIR)
+    """
+    print("\n=== COMPARAISONS DES HISTOGRAMMES À PARTIR DE LA BASE DE DONNÉES ===")
+
+    if not os.path.exists(db_path):
+        print(f" Base de données introuvable : {db_path}")
+        return
+
+    if pollutants is None:
+        pollutants = list(POLLUTANTS)
+
+    conn = sqlite3.connect(db_path)
+    year_hashes = load_year_hashes(conn)
+    années = list(year_hashes)
+    print(f"Années trouvées dans la base : {années}\n")
+
+    if output_dir is None:
+        output_dir = OUTPUT_DIR
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Une comparaison ne dépend que de ses deux années, l'évolution de toutes
+    cache = RenderCache(output_dir)
+    data_version = cache.key(*[f"{année}:{content_hash}" for année, content_hash in year_hashes.items()])
+    versions = (function_version(create_comparison_histogram, comparison_histogram_fields,
+                                 create_evolution_histogram, histogram_layout, binned_histogram_fields),
+                HOVER_TEMPLATE, repr(sorted(POLLUTANT_BINS.items())))
+    keys = {}
+    for polluant in pollutants:
+        key = cache.key(data_version, polluant, "evolution", *versions)
+        if not cache.is_fresh(evolution_name(polluant), key):
+            keys[(polluant, None, None)] = key
+        for année1, année2 in itertools.combinations(années, 2):
+            key = cache.key(year_hashes[année1], year_hashes[année2], polluant, "comparison", *versions)
+            if not cache.is_fresh(comparison_name(polluant, année1, année2), key):
+                keys[(polluant, année1, année2)] = key
+
+    valid_names = [evolution_name(polluant) for polluant in POLLUTANTS]
+    valid_names += [comparison_name(polluant, année1, année2) for polluant in POLLUTANTS
+                    for année1, année2 in itertools.combinations(années, 2)]
+    cache.evict(valid_names, owns=is_comparison_name)
+
+    if not keys:
+        conn.close()
+        cache.save()
+        cache.report()
+        print("Aucun graphique à regénérer.")
+        return
+
+    bins = read_year_bins(conn, sorted({polluant for polluant, _, _ in keys}))
+    conn.close()
+
+    counts = {"ok": 0, "ignoré": 0, "erreur": 0}
+    templates = FigureTemplates()
+    try:
+        for (polluant, année1, année2), key in keys.items():
+            years, year_counts = bins[polluant]
+            edges = bin_edges(POLLUTANTS[polluant])
+            row = {int(year): i for i, year in enumerate(years)}
+            if année1 is None:
+                name = evolution_name(polluant)
+                missing = not row
+            else:
+                name = comparison_name(polluant, année1, année2)
+                missing = année1 not in row or année2 not in row
+            if missing:
+                counts["ignoré"] += 1
+                cache.discard(name)
+                continue
+            try:
+                if année1 is None:
+                    fig = create_evolution_histogram(edges, [int(year) for year in years], year_counts, polluant)
+                else:
+                    counts1, counts2 = year_counts[row[année1]], year_counts[row[année2]]
+                    fields = comparison_histogram_fields(edges, counts1, counts2, année1, année2, polluant)
+                    fig = templates.figure(
+                        ("comparison", polluant),
+                        lambda: create_comparison_histogram(edges, counts1, counts2, année1, année2, polluant),
+                        fields["traces"], {"title.text": fields["title.text"]})
+                write_figure(fig, os.path.join(output_dir, name), auto_open=False, include_plotlyjs='cdn')
+            except Exception as e:
+                counts["erreur"] += 1
+                cache.discard(name)
+                print(f"Erreur sur {name} : {type(e).__name__}: {e}")
+                continue
+            counts["ok"] += 1
+            cache.store(name, key)
+    finally:
+        cache.save()
+
+    print(f"{counts['ok']} graphiques générés, {counts['ignoré']} ignorés (années sans données), "
+          f"{counts['erreur']} erreurs.")
+    cache.report()
 
 
 if __name__ == "__main__":
-    generate_visualizations()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Graphiques par polluant et par année à partir de la base SQLite")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="nombre de processus de rendu (défaut : nombre de CPU)")
+    parser.add_argument("--max-points", type=int, default=SCATTER_OPTIONS["max_points"],
+                        help="nombre maximal de points par nuage avec --large ou --animated (0 : tous les points)")
+    parser.add_argument("--large", action="store_true",
+                        help="nuages de points WebGL sur un axe de population, sous-échantillonnés à --max-points")
+    parser.add_argument("--animated", action="store_true",
+                        help="un seul graphique animé par polluant et par type (toutes les années)")
+    parser.add_argument("--comparisons", action="store_true",
+                        help="génère aussi les comparaisons de deux années et l'évolution des histogrammes")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR,
+                        help="dossier des fichiers HTML, à passer aussi aux visionneuses (défaut : src/database/output)")
+    args = parser.parse_args()
+    options = dict(SCATTER_OPTIONS, large=args.large, max_points=args.max_points or None)
+    if args.animated:
+        generate_animated_visualizations(scatter_options=options, output_dir=args.output_dir)
+    else:
+        generate_visualizations(workers=args.workers, scatter_options=options, output_dir=args.output_dir)
+    if args.comparisons:
+        generate_histogram_comparisons(output_dir=args.output_dir)
@@ -1,8 +1,19 @@
 import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
 import os
-import glob
+import shutil
+import sys
+import json
+import argparse
 import warnings
-import re
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.raw_sources import list_raw_sources, open_raw_source, source_hash, source_name
+from utils.cleaned_store import STORE_PATH, CSV_PATH, CleanedStoreWriter, write_cleaned_store
+from utils.quantile_sketch import QuantileSketch
 
 
 warnings.simplefilter(action='ignore', category=FutureWarning)
@@ -12,45 +23,17 @@ base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
 # Folder containing raw CSV files (data/raw/)
 data_folder = os.path.join(base_dir, "data", "raw")
 
-# Folder to save the cleaned CSV (data/cleaned/)
+# Folder to save the cleaned data (data/cleaned/)
 output_folder = os.path.join(base_dir, "data", "cleaned")
-os.makedirs(output_folder, exist_ok=True)
-
-print(" Dossier source :", data_folder)
-print(" Dossier de sortie :", output_folder)
-
-# List all CSV files
-all_files = glob.glob(os.path.join(data_folder, "*.csv"))
-
-if not all_files:
-    print(" Aucun fichier CSV trouvé dans le dossier raw !")
-    exit()
-
-list_of_dfs = []
 
-# Reading files and adding the year
-for filepath in all_files:
-    match = re.search(r'(\d{4})', os.path.basename(filepath))
-    year = int(match.group(1)) if match else None
+# Parsed (not yet imputed) yearly files, reused while their raw file is unchanged
+parsed_folder = os.path.join(output_folder, "parsed")
 
-    df = pd.read_csv(filepath, encoding="latin1", skiprows=1)
-    df['Année'] = year
-    list_of_dfs.append(df)
+# Content hashes of the raw files and medians used by the previous run
+manifest_path = os.path.join(output_folder, "manifest.json")
 
-# Harmonize columns
-all_columns = set()
-for df in list_of_dfs:
-    all_columns.update(df.columns)
-all_columns = list(all_columns)
-
-for i, df in enumerate(list_of_dfs):
-    for col in all_columns:
-        if col not in df.columns:
-            df[col] = pd.NA
-    list_of_dfs[i] = df[all_columns]
-
-# Merge all files
-final_df = pd.concat(list_of_dfs, ignore_index=True)
+# Parsed chunks spilled to disk by the streaming mode between its two passes
+staging_folder = os.path.join(output_folder, "staging")
 
 # Pollutant columns for which NA is replaced by the median
 pollutants_cols = [
@@ -67,26 +50,426 @@ pollutants_cols = [
     'Moyenne annuelle de somo 35 pondere par la population (ug/m3.jour)'
 ]
 
-# Fill NA with the median if the column exists
-for col in pollutants_cols:
-    if col in final_df.columns:
-        final_df[col].fillna(final_df[col].median(skipna=True), inplace=True)
 
-# COM Insee: replace NA with "Unknown"
-if 'COM Insee' in final_df.columns:
-    final_df['COM Insee'].fillna('Unknown', inplace=True)
+def read_raw_chunks(source, chunk_size):
+    """
+    Reads a raw yearly file by chunks of chunk_size rows and adds the year column.
+    """
+    with open_raw_source(source, encoding="latin1") as f:
+        for chunk in pd.read_csv(f, skiprows=1, dtype={'COM Insee': str, 'Commune': str},
+                                 chunksize=chunk_size):
+            chunk['Année'] = source.year
+            yield chunk
+
+
+def read_raw_file(source):
+    """
+    Reads a raw yearly file (CSV on disk or member of the ZIP archive,
+    decoded on the fly) and adds the year column.
+    """
+    with open_raw_source(source, encoding="latin1") as f:
+        df = pd.read_csv(f, skiprows=1, dtype={'COM Insee': str, 'Commune': str})
+    df['Année'] = source.year
+    return df
+
+
+def read_raw_files(sources, workers=None):
+    """
+    Parses the raw yearly files, in a pool of worker processes when workers > 1.
+
+    Args:
+        sources (list[RawSource]): The raw files to parse
+        workers (int): Number of worker processes (default: number of CPUs)
+
+    Returns:
+        list[pandas.DataFrame]: One DataFrame per source, in the order of sources
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(sources))
+
+    if workers <= 1:
+        return [read_raw_file(source) for source in sources]
+
+    # executor.map returns the results in the order of the inputs, so the merge
+    # order (and the cleaned output) is the same as with the sequential path
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(read_raw_file, sources))
+
+
+def parsed_path(source):
+    """
+    Returns the path of the cached parsed version of a raw source.
+    """
+    return os.path.join(parsed_folder, os.path.splitext(source_name(source))[0] + ".parquet")
+
+
+def load_manifest():
+    """
+    Loads the manifest of the previous run, or an empty one.
+    """
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest):
+    """
+    Saves the manifest of the current run.
+    """
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+
+def clean_data(from_zip=None, workers=None, export_csv=False, incremental=True):
+    """
+    Merges the raw yearly files, fills the missing values and saves the
+    cleaned dataset in data/cleaned/.
+
+    Args:
+        from_zip (bool): True to stream the CSV members out of the ZIP archive
+            of data/raw/ without extracting them, False to read the extracted
+            CSV files, None to use the archive only if no CSV is extracted
+        workers (int): Number of processes parsing the yearly files
+            concurrently (default: number of CPUs, 1 for a sequential run)
+        export_csv (bool): Also export the cleaned dataset as a CSV file
+        incremental (bool): Only parse the raw files whose content hash changed
+            since the previous run (see data/cleaned/manifest.json) and only
+            rewrite the years whose cleaned values changed. False rebuilds everything.
+
+    Returns:
+        pandas.DataFrame: The cleaned dataset, or None if no raw file was found
+    """
+    os.makedirs(output_folder, exist_ok=True)
+
+    print(" Dossier source :", data_folder)
+    print(" Dossier de sortie :", output_folder)
+
+    # List all raw files (extracted CSVs or members of the archive)
+    all_files = list_raw_sources(data_folder, from_zip=from_zip)
+
+    if not all_files:
+        print(" Aucun fichier CSV trouvé dans le dossier raw !")
+        return None
+
+    # Compare the content hash of each raw file with the previous run
+    manifest = load_manifest() if incremental else {}
+    known_files = manifest.get("files", {})
+    hashes = {source: source_hash(source) for source in all_files}
+    to_parse = [
+        source for source in all_files
+        if known_files.get(source_name(source), {}).get("hash") != hashes[source]
+        or not os.path.exists(parsed_path(source))
+    ]
+    print(f" Fichiers à lire : {len(to_parse)} / {len(all_files)} (les autres sont repris de {parsed_folder})")
+
+    # Reading new or changed files and adding the year
+    parsed = dict(zip(to_parse, read_raw_files(to_parse, workers=workers)))
+
+    os.makedirs(parsed_folder, exist_ok=True)
+    for source, df in parsed.items():
+        df.to_parquet(parsed_path(source), index=False)
+
+    # Remove the cached files of the raw files which no longer exist
+    expected = {os.path.basename(parsed_path(source)) for source in all_files}
+    for name in os.listdir(parsed_folder):
+        if name not in expected:
+            os.remove(os.path.join(parsed_folder, name))
+
+    list_of_dfs = [
+        parsed[source] if source in parsed else pd.read_parquet(parsed_path(source))
+        for source in all_files
+    ]
+
+    # Harmonize columns (in order of first appearance, for a reproducible output)
+    all_columns = []
+    for df in list_of_dfs:
+        all_columns.extend(col for col in df.columns if col not in all_columns)
+
+    for i, df in enumerate(list_of_dfs):
+        for col in all_columns:
+            if col not in df.columns:
+                df[col] = pd.NA
+        list_of_dfs[i] = df[all_columns]
+
+    # Merge all files
+    final_df = pd.concat(list_of_dfs, ignore_index=True)
+
+    # Fill NA with the median if the column exists
+    # (the medians are always computed on all the years)
+    medians = {}
+    for col in pollutants_cols:
+        if col in final_df.columns:
+            median = final_df[col].median(skipna=True)
+            final_df[col].fillna(median, inplace=True)
+            medians[col] = None if pd.isna(median) else float(median)
+
+    # COM Insee: replace NA with "Unknown"
+    if 'COM Insee' in final_df.columns:
+        final_df['COM Insee'].fillna('Unknown', inplace=True)
+
+    # Population: replace NA with 0
+    if 'Population' in final_df.columns:
+        final_df['Population'].fillna(0, inplace=True)
+
+    # Check for duplicates by commune and year
+    duplicated_count = final_df.duplicated(subset=['COM Insee', 'Année']).sum()
+    print(f"🔹 Nombre de doublons par 'COM Insee' et 'Année' : {duplicated_count}")
+
+    # Save the cleaned dataset (Parquet partitioned by year). If the medians
+    # and the columns did not change, only the new or changed years are rewritten.
+    if (incremental and manifest.get("medians") == medians
+            and manifest.get("columns") == all_columns and os.path.exists(STORE_PATH)):
+        years = sorted({source.year for source in to_parse})
+        print(f" Années réécrites : {years}")
+    else:
+        years = None
+    write_cleaned_store(final_df, STORE_PATH, years=years)
+
+    save_manifest({
+        "files": {
+            source_name(source): {"year": source.year, "hash": hashes[source]}
+            for source in all_files
+        },
+        "columns": all_columns,
+        "medians": medians,
+    })
+
+    print(" Fusion et nettoyage terminés ! Dimension du DataFrame :", final_df.shape)
+    print(" Données sauvegardées dans :", STORE_PATH)
+
+    # Optional CSV export
+    if export_csv:
+        final_df.to_csv(CSV_PATH, index=False)
+        print(" Export CSV :", CSV_PATH)
+
+    return final_df
+
+
+def column_kind(series):
+    """
+    Returns the kind of a column once all the chunks are merged :
+    'string', 'float' or 'int' (the widest kind wins, as with pd.concat).
+    """
+    if pd.api.types.is_integer_dtype(series.dtype) or pd.api.types.is_bool_dtype(series.dtype):
+        return 'int'
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        return 'float'
+    return 'string'
+
+
+KIND_ORDER = {'int': 0, 'float': 1, 'string': 2}
+KIND_TYPES = {'int': pa.int64(), 'float': pa.float64(), 'string': pa.string()}
+
+
+def exact_medians(sketches, chunk_files):
+    """
+    Computes the exact medians with one more pass over the staged chunks :
+    the sketch gives the bucket holding each median rank, so only the values
+    falling in these buckets (a narrow range of values) are kept and sorted.
+
+    Args:
+        sketches (dict): QuantileSketch of each pollutant column
+        chunk_files (list[str]): Parquet files of the staged chunks
+
+    Returns:
+        dict: The exact median of each column (NaN for an empty column)
+    """
+    targets = {}
+    for col, sketch in sketches.items():
+        if sketch.count:
+            targets[col] = [sketch.locate(rank) for rank in sketch.median_ranks()]
+
+    candidates = {col: [] for col in targets}
+    for path in chunk_files:
+        columns = [col for col in targets if col in pq.read_schema(path).names]
+        chunk = pd.read_parquet(path, columns=columns)
+        for col in columns:
+            values = pd.to_numeric(chunk[col], errors='coerce').to_numpy(dtype=float)
+            values = values[~np.isnan(values)]
+            signs, keys = sketches[col].bucket_of(values)
+            keep = np.zeros(len(values), dtype=bool)
+            for (sign, key), _ in targets[col]:
+                keep |= (signs == sign) & (keys == key)
+            candidates[col].append(values[keep])
+
+    medians = {col: float('nan') for col in sketches}
+    for col, located in targets.items():
+        values = np.concatenate(candidates[col])
+        signs, keys = sketches[col].bucket_of(values)
+        medians[col] = float(np.mean([
+            np.sort(values[(signs == sign) & (keys == key)])[rank]
+            for (sign, key), rank in located
+        ]))
+    return medians
+
+
+def count_duplicated_keys(key_chunks):
+    """
+    Returns the number of repeated keys (all but the first occurrence) among
+    the arrays of hashed keys in key_chunks.
+    """
+    if not key_chunks:
+        return 0
+    keys = np.concatenate(key_chunks)
+    return len(keys) - len(np.unique(keys))
+
+
+def clean_data_streaming(from_zip=None, chunk_size=100_000, exact_median=False, export_csv=False,
+                         relative_accuracy=0.005):
+    """
+    Same cleaning as clean_data, with a memory usage bounded by the chunk size
+    (it does not grow with the number of years), except for the duplicate
+    check, which keeps the 8-byte hashed keys of one year : O(communes per year).
+
+    The raw files are read in two passes over chunks of chunk_size rows :
+    the first one spills the parsed chunks to data/cleaned/staging/ and feeds
+    a quantile sketch per pollutant column, the second one fills the missing
+    values and appends each chunk to the Parquet store (and the CSV export).
+
+    Args:
+        from_zip (bool): Same as in clean_data
+        chunk_size (int): Number of rows processed at once
+        exact_median (bool): Compute the exact medians (one more pass over the
+            staged chunks) instead of the sketch estimates
+        export_csv (bool): Also export the cleaned dataset as a CSV file
+        relative_accuracy (float): Relative error of the approximate medians
+
+    Returns:
+        tuple: Shape (rows, columns) of the cleaned dataset, or None if no raw file was found
+    """
+    os.makedirs(output_folder, exist_ok=True)
+
+    print(" Dossier source :", data_folder)
+    print(" Dossier de sortie :", output_folder)
+
+    all_files = list_raw_sources(data_folder, from_zip=from_zip)
+
+    if not all_files:
+        print(" Aucun fichier CSV trouvé dans le dossier raw !")
+        return None
+
+    shutil.rmtree(staging_folder, ignore_errors=True)
+    os.makedirs(staging_folder)
+
+    # Pass 1 : parse the chunks, keep the columns, their kinds and the sketches
+    all_columns = []
+    kinds = {}
+    years_columns = {}
+    sketches = {}
+    chunk_files = []
+    for source in all_files:
+        columns = years_columns.setdefault(source.year, set())
+        for chunk in read_raw_chunks(source, chunk_size):
+            all_columns.extend(col for col in chunk.columns if col not in all_columns)
+            columns.update(chunk.columns)
+            for col in chunk.columns:
+                kind = column_kind(chunk[col])
+                if KIND_ORDER[kind] > KIND_ORDER[kinds.get(col, 'int')]:
+                    kinds[col] = kind
+                else:
+                    kinds.setdefault(col, kind)
+                if col in pollutants_cols:
+                    sketch = sketches.setdefault(col, QuantileSketch(relative_accuracy))
+                    sketch.add(pd.to_numeric(chunk[col], errors='coerce').to_numpy(dtype=float))
+
+            path = os.path.join(staging_folder, f"chunk-{len(chunk_files):05d}.parquet")
+            chunk.to_parquet(path, index=False)
+            chunk_files.append(path)
+
+    # A column missing from a year is filled with NA, so its values become floats
+    for col in all_columns:
+        if kinds[col] == 'int' and any(col not in cols for cols in years_columns.values()):
+            kinds[col] = 'float'
+
+    if exact_median:
+        medians = exact_medians(sketches, chunk_files)
+    else:
+        medians = {col: sketch.median() for col, sketch in sketches.items()}
+    medians = {col: medians[col] for col in pollutants_cols if col in medians}
+    for col, median in medians.items():
+        print(f" Médiane {'exacte' if exact_median else 'approchée'} de {col} : {median}")
+
+    # Pass 2 : fill the missing values and write the chunks
+    schema = pa.schema([(col, KIND_TYPES[kinds[col]]) for col in all_columns if col != 'Année'])
+    writer = CleanedStoreWriter(schema, STORE_PATH)
+    if export_csv and os.path.exists(CSV_PATH):
+        os.remove(CSV_PATH)
+
+    rows = 0
+    duplicated_count = 0
+    seen_year, year_keys = None, []
+    for path in chunk_files:
+        chunk = pd.read_parquet(path)
+        for col in all_columns:
+            if col not in chunk.columns:
+                chunk[col] = pd.NA
+        chunk = chunk[all_columns]
+
+        for col, median in medians.items():
+            chunk[col] = pd.to_numeric(chunk[col], errors='coerce').astype('float64').fillna(median)
+        if 'COM Insee' in chunk.columns:
+            chunk['COM Insee'] = chunk['COM Insee'].fillna('Unknown')
+        if 'Population' in chunk.columns:
+            chunk['Population'] = chunk['Population'].fillna(0)
+        for col in all_columns:
+            if kinds[col] != 'string' and col not in medians:
+                chunk[col] = pd.to_numeric(chunk[col], errors='coerce').astype(
+                    'int64' if kinds[col] == 'int' else 'float64')
+
+        # Duplicates by commune and year : a year is read from a single file,
+        # so its keys are collected and counted once, when the year is complete
+        year = int(chunk['Année'].iloc[0])
+        if year != seen_year:
+            duplicated_count += count_duplicated_keys(year_keys)
+            seen_year, year_keys = year, []
+        year_keys.append(pd.util.hash_array(chunk['COM Insee'].astype(str).to_numpy(dtype=object)))
+
+        writer.write(chunk)
+        if export_csv:
+            chunk.to_csv(CSV_PATH, mode='a', header=(rows == 0), index=False)
+        rows += len(chunk)
+        os.remove(path)
+    duplicated_count += count_duplicated_keys(year_keys)
+
+    writer.close()
+    shutil.rmtree(staging_folder, ignore_errors=True)
+
+    # The incremental mode of clean_data relies on cached parsed files that
+    # this mode does not produce : its next run rebuilds everything
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
 
-# Population: replace NA with 0
-if 'Population' in final_df.columns:
-    final_df['Population'].fillna(0, inplace=True)
+    print(f"🔹 Nombre de doublons par 'COM Insee' et 'Année' : {duplicated_count}")
+    print(" Fusion et nettoyage terminés ! Dimension du DataFrame :", (rows, len(all_columns)))
+    print(" Données sauvegardées dans :", STORE_PATH)
+    if export_csv:
+        print(" Export CSV :", CSV_PATH)
 
-# Check for duplicates by commune and year
-duplicated_count = final_df.duplicated(subset=['COM Insee', 'Année']).sum()
-print(f"🔹 Nombre de doublons par 'COM Insee' et 'Année' : {duplicated_count}")
+    return rows, len(all_columns)
 
-# Save the cleaned file
-output_path = os.path.join(output_folder, "cleaned_air_quality_with_year.csv")
-final_df.to_csv(output_path, index=False)
 
-print(" Fusion et nettoyage terminés ! Dimension du DataFrame :", final_df.shape)
-print(" Fichier sauvegardé dans :", output_path)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fusion et nettoyage des fichiers annuels bruts")
+    parser.add_argument("--from-zip", action="store_true",
+                        help="lire les CSV directement dans l'archive ZIP de data/raw/ sans les extraire")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="nombre de processus de lecture en parallèle (défaut : nombre de CPU)")
+    parser.add_argument("--csv", action="store_true",
+                        help="exporter aussi les données nettoyées en CSV")
+    parser.add_argument("--full", action="store_true",
+                        help="tout relire et tout réécrire, sans tenir compte du manifeste")
+    parser.add_argument("--streaming", action="store_true",
+                        help="traiter les données par blocs, avec une mémoire bornée")
+    parser.add_argument("--chunk-size", type=int, default=100_000,
+                        help="nombre de lignes par bloc en mode --streaming")
+    parser.add_argument("--exact-median", action="store_true",
+                        help="médianes exactes (une passe de plus) au lieu des médianes approchées en mode --streaming")
+    args = parser.parse_args()
+    if args.streaming:
+        clean_data_streaming(from_zip=True if args.from_zip else None, chunk_size=args.chunk_size,
+                             exact_median=args.exact_median, export_csv=args.csv)
+    else:
+        clean_data(from_zip=True if args.from_zip else None, workers=args.workers,
+                   export_csv=args.csv, incremental=not args.full)
@@ -0,0 +1,182 @@
+import os
+import shutil
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+# Folder of the cleaned data (data/cleaned/)
+CLEANED_FOLDER = os.path.join(base_dir, "data", "cleaned")
+
+# Cleaned dataset stored as Parquet files partitioned by year
+# (data/cleaned/air_quality/Année=<year>/*.parquet)
+STORE_PATH = os.path.join(CLEANED_FOLDER, "air_quality")
+
+# Optional CSV export of the cleaned dataset
+CSV_PATH = os.path.join(CLEANED_FOLDER, "cleaned_air_quality_with_year.csv")
+
+YEAR_COLUMN = 'Année'
+
+
+def _prepare(df):
+    """
+    Returns a copy of df with the text columns stored as strings
+    (INSEE codes such as 2A004 are kept) and an integer year.
+    """
+    df = df.copy()
+    for col in ['COM Insee', 'Commune']:
+        if col in df.columns:
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    df[YEAR_COLUMN] = df[YEAR_COLUMN].astype(int)
+    return df
+
+
+def write_cleaned_store(df, store_path=STORE_PATH, compression="zstd", years=None):
+    """
+    Saves the cleaned dataset as compressed Parquet files partitioned by year
+    (one folder 'Année=<year>' per year).
+
+    Args:
+        df (pd.DataFrame): The cleaned dataset (with the 'Année' column)
+        store_path (str): Folder of the Parquet dataset
+        compression (str): Parquet compression codec
+        years (list[int]): Only rewrite the partitions of these years (the
+            partitions of the years absent from df are removed). By default
+            the whole store is replaced once the new one is completely written.
+    """
+    df = _prepare(df)
+
+    # Same schema for every partition, even if a column is empty for one year
+    schema = pa.Schema.from_pandas(df.drop(columns=[YEAR_COLUMN]), preserve_index=False)
+    all_years = sorted(df[YEAR_COLUMN].unique())
+
+    if years is None or not os.path.exists(store_path):
+        target_path = store_path + ".tmp"
+        shutil.rmtree(target_path, ignore_errors=True)
+        years = all_years
+    else:
+        target_path = store_path
+        # Remove the partitions left by an interrupted write, and those of the
+        # years which are no longer in the dataset
+        for name in os.listdir(store_path):
+            if not name.startswith(YEAR_COLUMN + "="):
+                continue
+            if name.endswith(".tmp") or int(name.split("=", 1)[1]) not in all_years:
+                shutil.rmtree(os.path.join(store_path, name))
+
+    for year, df_year in df[df[YEAR_COLUMN].isin(years)].groupby(YEAR_COLUMN, sort=True):
+        table = pa.Table.from_pandas(df_year.drop(columns=[YEAR_COLUMN]), schema=schema, preserve_index=False)
+        partition = os.path.join(target_path, f"{YEAR_COLUMN}={year}")
+        tmp_partition = partition + ".tmp"
+        shutil.rmtree(tmp_partition, ignore_errors=True)
+        os.makedirs(tmp_partition)
+        pq.write_table(table, os.path.join(tmp_partition, "part-0.parquet"), compression=compression)
+        shutil.rmtree(partition, ignore_errors=True)
+        os.replace(tmp_partition, partition)
+
+    if target_path != store_path:
+        shutil.rmtree(store_path, ignore_errors=True)
+        os.replace(target_path, store_path)
+
+
+class CleanedStoreWriter:
+    """
+    Writes the cleaned dataset chunk by chunk, with a bounded memory usage :
+    the chunks of a year are appended as row groups to the Parquet file of
+    its partition. The previous store is replaced when the writer is closed.
+
+    Args:
+        schema (pyarrow.Schema): Schema of the columns (without 'Année')
+        store_path (str): Folder of the Parquet dataset
+        compression (str): Parquet compression codec
+    """
+
+    def __init__(self, schema, store_path=STORE_PATH, compression="zstd"):
+        self.schema = schema
+        self.store_path = store_path
+        self.compression = compression
+        self.tmp_path = store_path + ".tmp"
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+        os.makedirs(self.tmp_path)
+        self._year = None
+        self._writer = None
+        self._parts = {}
+
+    def _close_writer(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def write(self, df):
+        """
+        Appends a chunk of the cleaned dataset.
+        """
+        df = _prepare(df)
+        for year, df_year in df.groupby(YEAR_COLUMN, sort=False):
+            if year != self._year:
+                # Only the file of the current year is kept open
+                self._close_writer()
+                partition = os.path.join(self.tmp_path, f"{YEAR_COLUMN}={year}")
+                os.makedirs(partition, exist_ok=True)
+                part = self._parts.get(year, 0)
+                self._parts[year] = part + 1
+                self._writer = pq.ParquetWriter(os.path.join(partition, f"part-{part}.parquet"),
+                                                self.schema, compression=self.compression)
+                self._year = year
+            table = pa.Table.from_pandas(df_year.drop(columns=[YEAR_COLUMN]), schema=self.schema,
+                                         preserve_index=False)
+            self._writer.write_table(table)
+
+    def close(self):
+        """
+        Closes the current file and replaces the previous store.
+        """
+        self._close_writer()
+        shutil.rmtree(self.store_path, ignore_errors=True)
+        os.replace(self.tmp_path, self.store_path)
+
+
+def load_cleaned_data(columns=None, years=None, store_path=STORE_PATH):
+    """
+    Loads the cleaned dataset from the Parquet store.
+    Only the requested columns and the partitions of the requested years are read.
+
+    Args:
+        columns (list[str]): Columns to load (default: all the columns)
+        years (list[int]): Years to load (default: all the years)
+        store_path (str): Folder of the Parquet dataset
+
+    Returns:
+        pd.DataFrame: The cleaned data, or None if the store does not exist
+    """
+    if not os.path.exists(store_path):
+        print(f"Données nettoyées introuvables : {store_path}")
+        return None
+
+    filters = [(YEAR_COLUMN, 'in', [int(y) for y in years])] if years is not None else None
+    df = pd.read_parquet(store_path, engine="pyarrow", columns=columns, filters=filters)
+
+    # The partition column is read back as a category
+    if YEAR_COLUMN in df.columns:
+        df[YEAR_COLUMN] = df[YEAR_COLUMN].astype(int)
+    return df
+
+
+def available_years(store_path=STORE_PATH):
+    """
+    Returns the sorted list of the years of the Parquet store (from the partition folders).
+    """
+    if not os.path.exists(store_path):
+        return []
+    return sorted(int(name.split("=", 1)[1]) for name in os.listdir(store_path)
+                  if name.startswith(YEAR_COLUMN + "=") and not name.endswith(".tmp"))
+
+
+def available_columns(store_path=STORE_PATH):
+    """
+    Returns the list of the columns of the Parquet store (without reading any data).
+    """
+    dataset = ds.dataset(store_path, format="parquet", partitioning="hive")
+    return dataset.schema.names
@@ -11,20 +11,64 @@ from plotly.offline import plot as write_html
 import sys
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from visualizations.scatter_plots import create_pollution_scatter
-from visualizations.histograms import create_pollution_histogram
+from visualizations.scatter_plots import (create_pollution_scatter, downsample_scatter, scatter_column,
+                                          scatter_fields, scatter_yaxis)
+from visualizations.histograms import (HOVER_TEMPLATE, binned_histogram_fields, create_binned_histogram,
+                                       create_pollution_histogram, histogram_layout, pollutant_bins_key)
+from utils.histogram_bins import POLLUTANT_BINS
+from utils.raw_sources import RawSource, find_raw_source, open_raw_source, source_hash
+from visualizations.render_cache import RenderCache, data_hash, function_version, mapping_hash
+
+# Pollutant columns of the raw yearly files
+POLLUTANT_COLUMNS = [
+    'Moyenne annuelle de concentration de NO2 (ug/m3)',
+    'Moyenne annuelle de concentration de NO2 ponderee par la population (ug/m3)',
+    'Moyenne annuelle de concentration de PM10 (ug/m3)',
+    'Moyenne annuelle de concentration de PM10 ponderee par la population (ug/m3)',
+    'Moyenne annuelle de concentration de PM25 (ug/m3)',
+    'Moyenne annuelle de concentration de PM25 ponderee par la population (ug/m3)',
+    'Moyenne annuelle de concentration de O3 (ug/m3)',
+    'Moyenne annuelle de concentration de O3 ponderee par la population (ug/m3)',
+    "Moyenne annuelle d'AOT 40 (ug/m3.heure)",
+    'Moyenne annuelle de somo 35 (ug/m3.jour)',
+    'Moyenne annuelle de somo 35 pondere par la population (ug/m3.jour)'
+]
+
+# Types applied while parsing the raw yearly files :
+# INSEE codes stay (Arrow-backed) strings to keep the Corsican codes 2A/2B,
+# commune names are categorical, the population is a (nullable) integer
+# and the concentrations are float32
+RAW_DTYPES = {
+    'COM Insee': 'string[pyarrow]',
+    'Commune': 'category',
+    'Population': 'Int32',
+    **{col: 'float32' for col in POLLUTANT_COLUMNS}
+}
+
+# Columns that must be present in a raw yearly file
+REQUIRED_COLUMNS = [
+    'COM Insee',
+    'Commune',
+    'Population',
+    'Moyenne annuelle de concentration de NO2 (ug/m3)',
+    'Moyenne annuelle de concentration de PM10 (ug/m3)',
+    'Moyenne annuelle de concentration de O3 (ug/m3)'
+]
 
 class read_data:
     def __init__(self):
         pass
 
     @staticmethod
-    def load_data(file_path):
+    def load_data(file_path, columns=None):
         """
         Loads data from a CSV file with error handling and formatting.
+        The types of RAW_DTYPES are applied while parsing.
 
 Args:
-file_path (str): Path to the CSV file to load
+file_path (str | RawSource): Path to the CSV file to load, or a raw source
+    (member of the ZIP archive, decoded on the fly)
+columns (list[str]): Columns to read (default: all the columns)
 
 Returns:
 pandas.DataFrame: DataFrame containing the loaded data, or None in case of error
@@ -33,33 +77,55 @@ pandas.DataFrame: DataFrame containing the loaded data, or None in case of error
             if file_path is None:
                 raise ValueError("Le chemin du fichier ne peut pas être None")
             
-            if not os.path.exists(file_path):
+            source = file_path if isinstance(file_path, RawSource) else RawSource(None, file_path, None)
+            if not os.path.exists(source.path):
                 print(f"ERREUR : Le fichier '{file_path}' n'existe pas.")
                 return None
                 
-            data = pd.read_csv(
-                file_path,
-                encoding='cp1252',    
-                skiprows=1,           
-                sep=',',              
-                decimal='.',          
-                thousands=None,       
-                low_memory=False
-            )
+            usecols = None if columns is None else (lambda col: col in columns)
+            try:
+                with open_raw_source(source, encoding='cp1252') as f:
+                    data = pd.read_csv(
+                        f,
+                        skiprows=1,           
+                        sep=',',              
+                        decimal='.',          
+                        thousands=None,       
+                        usecols=usecols,
+                        dtype=RAW_DTYPES,
+                        low_memory=False
+                    )
+            except ValueError as e:
+                # Non numeric values : only the text columns are typed here,
+                # the numeric ones are coerced by process_data
+                print(f"ATTENTION : Schéma non applicable ({e}), conversion après lecture")
+                with open_raw_source(source, encoding='cp1252') as f:
+                    data = pd.read_csv(
+                        f,
+                        skiprows=1,           
+                        sep=',',              
+                        decimal='.',          
+                        thousands=None,       
+                        usecols=usecols,
+                        dtype={'COM Insee': RAW_DTYPES['COM Insee'], 'Commune': 'category'},
+                        low_memory=False
+                    )
             
-            if len(data.columns) not in [12, 14]:
+            if 'Commune' in data.columns and isinstance(data['Commune'].dtype, pd.CategoricalDtype):
+                # Commune names are almost all distinct : store the categories as Arrow strings
+                categories = data['Commune'].cat.categories
+                data['Commune'] = data['Commune'].cat.rename_categories(
+                    pd.Index(categories.astype(RAW_DTYPES['COM Insee']))
+                )
+            
+            if columns is None and len(data.columns) not in [12, 14]:
                 print(f"ATTENTION : Nombre incorrect de colonnes ({len(data.columns)}). Attendu : 12 ou 14")
                 print("Colonnes trouvées :")
                 print(data.columns.tolist())
                 return None
                 
-            required_columns = [
-                'COM Insee',
-                'Commune',
-                'Population',
-                'Moyenne annuelle de concentration de NO2 (ug/m3)',
-                'Moyenne annuelle de concentration de PM10 (ug/m3)',
-                'Moyenne annuelle de concentration de O3 (ug/m3)'
+            required_columns = REQUIRED_COLUMNS if columns is None else [
+                col for col in REQUIRED_COLUMNS if col in columns
             ]
             missing_columns = [col for col in required_columns if col not in data.columns]
             if missing_columns:
@@ -84,14 +150,16 @@ pandas.DataFrame: DataFrame containing the loaded data, or None in case of error
     def process_data(df):
         """    
 Processes the data to ensure that the columns are correctly separated and typed.    
+Columns already typed at parse time are left untouched.
 """
         if df is None:
             return None
         
         try:
-            numeric_columns = df.columns[2:]
+            numeric_columns = [col for col in df.columns if col not in ('COM Insee', 'Commune')]
             for col in numeric_columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
+                if not pd.api.types.is_numeric_dtype(df[col]):
+                    df[col] = pd.to_numeric(df[col], errors='coerce').astype(RAW_DTYPES.get(col, 'float64'))
             
             print("\nVérification de la cohérence des données :")
             print(f"Nombre total de lignes : {len(df)}")
@@ -159,6 +227,30 @@ Processes the data to ensure that the columns are correctly separated and typed.
             return None, None
 
 
+def commune_mappings_source():
+    """
+    Returns the raw file the commune mappings are read from (the 2000 file).
+    """
+    script_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    data_path = os.path.join(script_dir, "data", "raw", "Indicateurs_QualiteAir_France_Commune_2000_Ineris_v.Sep2020.csv")
+    if not os.path.exists(data_path):
+        # Read the member of the ZIP archive if the CSV was not extracted
+        data_path = find_raw_source(2000, os.path.dirname(data_path)) or data_path
+    return data_path
+
+
+def commune_mappings_version():
+    """
+    Returns a content hash of the source of the commune mappings, or None if it cannot be found.
+    """
+    source = commune_mappings_source()
+    if not isinstance(source, RawSource):
+        if not os.path.exists(source):
+            return None
+        source = RawSource(None, source, None)
+    return source_hash(source)
+
+
 def load_commune_mappings():
     """    
     Loads the correspondences between INSEE codes and municipality names.
@@ -171,10 +263,9 @@ def load_commune_mappings():
     """
     try:
         # Upload the CSV file
-        script_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        data_path = os.path.join(script_dir, "data", "raw", "Indicateurs_QualiteAir_France_Commune_2000_Ineris_v.Sep2020.csv")
+        data_path = commune_mappings_source()
         
-        data = read_data.load_data(data_path)
+        data = read_data.load_data(data_path, columns=['COM Insee', 'Commune'])
         if data is None:
             raise ValueError("Impossible de charger les données pour les correspondances communes")
         
@@ -189,12 +280,13 @@ def load_commune_mappings():
         return None, None
 
 
-def load_data_for_year(year):
+def load_data_for_year(year, columns=None):
     """    
     Loads data for a specific year.    
         
     Args:    
         year (int): The year for which to load data.    
+        columns (list[str]): Columns to read (default: all the columns)
         
     Returns:    
         pd.DataFrame: Data for the specified year, or None if an error occurs.    
@@ -204,10 +296,13 @@ def load_data_for_year(year):
             return None
         script_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
         data_path = os.path.join(script_dir, "data", "raw", f"Indicateurs_QualiteAir_France_Commune_{year}_Ineris_v.Sep2020.csv")
+        if not os.path.exists(data_path):
+            # Read the member of the ZIP archive if the CSV was not extracted
+            data_path = find_raw_source(year, os.path.dirname(data_path)) or data_path
         
-        data = read_data.load_data(data_path)
+        data = read_data.load_data(data_path, columns=columns)
         if data is not None:
-            data['Année'] = year
+            data['Année'] = np.int16(year)
             data = read_data.process_data(data)
             print(f"Données pour {year} chargées avec succès.")
             return data
@@ -227,7 +322,9 @@ Processes and visualises air pollution data over several years.
         insee_to_commune (dict): Dictionary mapping INSEE codes to commune names
         
     Returns:
-        dict: Dictionary containing the generated figures
+        dict: Dictionary mapping each figure ('<pollutant>_scatter_<year>',
+            '<pollutant>_histogram_<year>') to the path of its HTML file,
+            whether it was regenerated or reused from the render cache
     """
     
     script_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -235,27 +332,51 @@ Processes and visualises air pollution data over several years.
     os.makedirs(output_dir, exist_ok=True)
     print(f"\nDossier de sortie créé : {output_dir}")
     
+    # A figure is only regenerated when its data slice, its pollutant or
+    # the code of its visualization function changed
+    cache = RenderCache(output_dir)
+    scatter_version = function_version(create_pollution_scatter, scatter_fields, scatter_column,
+                                       scatter_yaxis, downsample_scatter)
+    hist_version = (function_version(create_pollution_histogram, create_binned_histogram, histogram_layout,
+                                     binned_histogram_fields, pollutant_bins_key), HOVER_TEMPLATE)
+    bins_version = repr(sorted(POLLUTANT_BINS.items()))
+    communes_version = mapping_hash(insee_to_commune)
     
     all_figures = {}
+    valid_names = []
     
     for year in sorted(data['Année'].unique()):
         print(f"\nCréation des visualisations pour l'année {year}...")
         year_data = data[data['Année'] == year]
         
         for pollutant in ['NO2', 'PM10', 'O3']:
+            scatter_name = f'{pollutant}_moyenne_annuelle_{year}.html'
+            hist_name = f'{pollutant}_histogram_{year}.html'
+            scatter_file = os.path.join(output_dir, scatter_name)
+            hist_file = os.path.join(output_dir, hist_name)
+            valid_names += [scatter_name, hist_name]
             
-            fig_scatter = create_pollution_scatter(year_data, insee_to_commune, pollutant)
-            
-            fig_hist = create_pollution_histogram(year_data, pollutant)
+            # Only the columns read by the visualization functions
+            column = f'Moyenne annuelle de concentration de {pollutant} (ug/m3)'
+            slice_hash = data_hash(year_data, ['COM Insee', 'Population', column])
             
-            scatter_file = os.path.join(output_dir, f'{pollutant}_moyenne_annuelle_{year}.html')
-            hist_file = os.path.join(output_dir, f'{pollutant}_histogram_{year}.html')
+            scatter_key = cache.key(slice_hash, pollutant, 'scatter', scatter_version, communes_version)
+            if not cache.is_fresh(scatter_name, scatter_key):
+                fig_scatter = create_pollution_scatter(year_data, insee_to_commune, pollutant)
+                write_html(fig_scatter, filename=scatter_file, auto_open=False, include_plotlyjs='cdn')
+                cache.store(scatter_name, scatter_key)
+            all_figures[f'{pollutant}_scatter_{year}'] = scatter_file
             
-            write_html(fig_scatter, scatter_file, auto_open=False, include_plotlyjs='cdn')
-            write_html(fig_hist, hist_file, auto_open=False, include_plotlyjs='cdn')
-            
-            all_figures[f'{pollutant}_scatter_{year}'] = fig_scatter
-            all_figures[f'{pollutant}_histogram_{year}'] = fig_hist
+            hist_key = cache.key(slice_hash, pollutant, 'histogram', hist_version, bins_version)
+            if not cache.is_fresh(hist_name, hist_key):
+                fig_hist = create_pollution_histogram(year_data, pollutant, binned=True)
+                write_html(fig_hist, filename=hist_file, auto_open=False, include_plotlyjs='cdn')
+                cache.store(hist_name, hist_key)
+            all_figures[f'{pollutant}_histogram_{year}'] = hist_file
+    
+    cache.evict(valid_names)
+    cache.save()
+    cache.report()
     
     print("\nToutes les visualisations ont été générées avec succès !")
     return all_figures
\ No newline at end of file
@@ -1,33 +1,211 @@
 import os
+import argparse
+import json
+import hashlib
 import requests
 import zipfile
-from config import DATA_URL, RAW_DATA_PATH
+from config import DATA_URL, DATA_CHECKSUM, RAW_ARCHIVE_PATH, RAW_MANIFEST_PATH
 
-def get_data():
+# Size of the blocks read from the network and from disk (1 MiB)
+CHUNK_SIZE = 1024 * 1024
+
+
+def file_md5(path, chunk_size=CHUNK_SIZE):
+    """
+    Computes the MD5 checksum of a file, block by block (constant memory).
+    """
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(manifest_path):
+    """
+    Loads the checksum manifest of the raw files, or None if it does not exist.
+    """
+    if not os.path.exists(manifest_path):
+        return None
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        print(f" Manifeste illisible, il sera régénéré : {manifest_path}")
+        return None
+
+
+def raw_files_match_manifest(raw_folder, manifest):
+    """
+    Checks that every file listed in the manifest exists in raw_folder
+    with the expected size and MD5 checksum.
+    """
+    files = manifest.get("files") if manifest else None
+    if not files:
+        return False
+
+    for name, entry in files.items():
+        path = os.path.join(raw_folder, name)
+        if not os.path.exists(path) or os.path.getsize(path) != entry["size"]:
+            return False
+        if file_md5(path) != entry["md5"]:
+            return False
+    return True
+
+
+def download_archive(url, archive_path, chunk_size=CHUNK_SIZE, timeout=60):
+    """
+    Streams the archive to disk in chunks of chunk_size bytes.
+
+    The transfer is written to "<archive_path>.part" and resumed with an HTTP
+    Range request if a partial file is already present. The ".part" file is
+    renamed to archive_path once the transfer is complete.
+    """
+    part_path = archive_path + ".part"
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+
+    with requests.get(url, headers=headers, stream=True, timeout=timeout) as response:
+        if offset and response.status_code == 416:
+            # Range not satisfiable : the partial file is already complete
+            print(f" Téléchargement déjà complet : {part_path}")
+            os.replace(part_path, archive_path)
+            return archive_path
+
+        response.raise_for_status()
+
+        if offset and response.status_code == 206:
+            print(f" Reprise du téléchargement à l'octet {offset}")
+            mode = "ab"
+        else:
+            # Server ignored the Range header : start again from scratch
+            mode = "wb"
+
+        with open(part_path, mode) as f:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                if chunk:
+                    f.write(chunk)
+
+    os.replace(part_path, archive_path)
+    return archive_path
+
+
+def verify_checksum(path, expected_checksum):
+    """
+    Compares the MD5 checksum of path with expected_checksum ("md5:<hex>" or "<hex>").
+    Returns the computed checksum, raises ValueError on mismatch.
+    """
+    actual = file_md5(path)
+    if expected_checksum:
+        expected = expected_checksum.split(":", 1)[-1].lower()
+        if actual != expected:
+            raise ValueError(
+                f"Somme de contrôle invalide pour {path} : attendu {expected}, obtenu {actual}"
+            )
+    return actual
+
+
+def extract_archive(archive_path, raw_folder, chunk_size=CHUNK_SIZE):
+    """
+    Extracts the archive into raw_folder and returns {member: {"size", "md5"}}.
+    Members are hashed while they are written, so they are not read twice.
+    Raises ValueError for a member that would be written outside raw_folder
+    (absolute path or "..").
+    """
+    files = {}
+    root = os.path.realpath(raw_folder)
+    with zipfile.ZipFile(archive_path, "r") as zip_ref:
+        for member in zip_ref.infolist():
+            if member.is_dir():
+                continue
+            target = os.path.realpath(os.path.join(root, member.filename))
+            if os.path.commonpath([root, target]) != root:
+                raise ValueError(f"Chemin invalide dans l'archive : {member.filename}")
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+
+            digest = hashlib.md5()
+            with zip_ref.open(member) as src, open(target, "wb") as dst:
+                for chunk in iter(lambda: src.read(chunk_size), b""):
+                    digest.update(chunk)
+                    dst.write(chunk)
+            files[member.filename] = {"size": member.file_size, "md5": digest.hexdigest()}
+    return files
+
+
+def get_data(url=DATA_URL, raw_folder=None, expected_checksum=DATA_CHECKSUM, keep_archive=False, extract=True):
     """
     Download the ZIP file from Zenodo and store it in data/raw/.
-Then unzip its contents into data/raw/.
+    Then unzip its contents into data/raw/.
+
+    The download is streamed to disk (flat memory usage) and resumed if a
+    previous transfer was interrupted. Nothing is downloaded when the files
+    of data/raw/ already match the checksum manifest of a previous run.
+
+    Args:
+        url (str): URL of the archive (a local HTTP server can be used for tests)
+        raw_folder (str): Destination folder (default: folder of RAW_ARCHIVE_PATH)
+        expected_checksum (str): Checksum of the archive ("md5:<hex>"), or None
+        keep_archive (bool): Keep the ZIP file after extraction
+        extract (bool): False to keep only the ZIP file, the yearly CSVs are
+            then read directly from the archive (see raw_sources.py)
+
+    Returns:
+        bool: True if the data was downloaded, False if it was already up to date
     """
-    raw_folder = os.path.dirname(RAW_DATA_PATH)
+    if raw_folder is None:
+        raw_folder = os.path.dirname(RAW_ARCHIVE_PATH)
+        manifest_path = RAW_MANIFEST_PATH
+    else:
+        manifest_path = os.path.join(raw_folder, os.path.basename(RAW_MANIFEST_PATH))
     os.makedirs(raw_folder, exist_ok=True)
 
-    zip_path = os.path.join(raw_folder, "temp.zip")
+    zip_path = os.path.join(raw_folder, os.path.basename(RAW_ARCHIVE_PATH))
+
+    manifest = load_manifest(manifest_path)
+    if manifest and manifest.get("source") == url and raw_files_match_manifest(raw_folder, manifest):
+        print(f" Données déjà présentes et vérifiées dans {raw_folder}, téléchargement ignoré.")
+        return False
+
+    if not os.path.exists(zip_path):
+        print(f" Téléchargement des données depuis : {url}")
+        download_archive(url, zip_path)
+        print(f" Fichier ZIP enregistré dans {zip_path}")
 
-    print(f" Téléchargement des données depuis : {DATA_URL}")
-    response = requests.get(DATA_URL)
-    response.raise_for_status()
+    try:
+        archive_md5 = verify_checksum(zip_path, expected_checksum)
+    except ValueError:
+        # Corrupted archive : remove it so that the next run downloads it again
+        os.remove(zip_path)
+        raise
 
-    with open(zip_path, "wb") as f:
-        f.write(response.content)
-    print(f" Fichier ZIP enregistré dans {zip_path}")
+    if extract:
+        files = extract_archive(zip_path, raw_folder)
+        print(f" Fichiers extraits dans {raw_folder}")
+    else:
+        files = {os.path.basename(zip_path): {"size": os.path.getsize(zip_path), "md5": archive_md5}}
+        keep_archive = True
+        print(f" Archive conservée sans extraction : {zip_path}")
 
-    
-    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-        zip_ref.extractall(raw_folder)
-    print(f" Fichiers extraits dans {raw_folder}")
+    manifest = {
+        "source": url,
+        "archive": {
+            "name": os.path.basename(zip_path),
+            "size": os.path.getsize(zip_path),
+            "md5": archive_md5,
+        },
+        "files": files,
+    }
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
 
-    os.remove(zip_path)
+    if not keep_archive:
+        os.remove(zip_path)
     print(" Téléchargement et extraction terminés.")
+    return True
 
 if __name__ == "__main__":
-    get_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Téléchargement des données de pollution")
+    parser.add_argument("--no-extract", action="store_true",
+                        help="garder l'archive ZIP sans l'extraire (lue ensuite avec clean_data.py --from-zip)")
+    args = parser.parse_args()
+    get_data(extract=not args.no_extract)
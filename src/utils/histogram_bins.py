@@ -0,0 +1,77 @@
+import numpy as np
+
+# Fixed histogram bins of each pollutant (database column name):
+# (first edge, last edge, bin width). The same edges are used for every year,
+# so the histograms of two years can be compared or added bin by bin.
+POLLUTANT_BINS = {
+    'pm25': (0, 60, 2),
+    'pm25_pop': (0, 60, 2),
+    'pm10': (0, 80, 2),
+    'pm10_pop': (0, 80, 2),
+    'no2': (0, 100, 2),
+    'no2_pop': (0, 100, 2),
+    'o3': (0, 120, 2),
+    'o3_pop': (0, 120, 2),
+    'aot40': (0, 40000, 1000),
+    'somo35': (0, 10000, 250),
+    'somo35_pop': (0, 10000, 250),
+}
+
+
+def bin_edges(pollutant):
+    """
+    Returns the bin edges of a pollutant (numpy array of n_bins + 1 values).
+    """
+    start, stop, width = POLLUTANT_BINS[pollutant]
+    return np.linspace(start, stop, int(round((stop - start) / width)) + 1)
+
+
+def bin_counts(values, pollutant):
+    """
+    Counts the values of a pollutant in its fixed bins. NaN values are ignored,
+    values below the first edge or above the last one are counted in the
+    first or last bin.
+
+    Args:
+        values (array-like): The values to count
+        pollutant (str): Database column name of the pollutant
+
+    Returns:
+        numpy.ndarray: Number of values in each bin
+    """
+    edges = bin_edges(pollutant)
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    return np.bincount(bin_index(values, edges), minlength=len(edges) - 1)
+
+
+def bin_index(values, edges):
+    """
+    Returns the bin of each value (values out of the edges go to the first or last bin).
+    """
+    # Bins are closed on the left, the last one also on the right (as np.histogram)
+    return np.clip(np.searchsorted(edges, values, side='right') - 1, 0, len(edges) - 2)
+
+
+def year_bin_counts(years, values, pollutant):
+    """
+    Counts the values of a pollutant in its fixed bins for every year at once
+    (a single bincount on the (year, bin) pairs). NaN values are ignored.
+
+    Args:
+        years (array-like): Year of each value
+        values (array-like): The values to count
+        pollutant (str): Database column name of the pollutant
+
+    Returns:
+        tuple: (sorted years with at least one value, numpy.ndarray of shape
+        (number of years, number of bins) with the counts of each year)
+    """
+    edges = bin_edges(pollutant)
+    n_bins = len(edges) - 1
+    values = np.asarray(values, dtype=float)
+    present = ~np.isnan(values)
+    year_values, year_index = np.unique(np.asarray(years)[present], return_inverse=True)
+    cells = year_index * n_bins + bin_index(values[present], edges)
+    counts = np.bincount(cells, minlength=len(year_values) * n_bins)
+    return year_values, counts.reshape(len(year_values), n_bins)
@@ -0,0 +1,136 @@
+import math
+import numpy as np
+
+# Values whose absolute value is below this threshold are counted as zeros
+MIN_INDEXABLE = 1e-9
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with a relative accuracy guarantee (DDSketch).
+
+    Values are counted in logarithmic buckets : bucket k holds the values in
+    (gamma^(k-1), gamma^k], with gamma = (1 + a) / (1 - a). Any quantile is
+    estimated within a relative error a, the memory only depends on the range
+    of the values (not on their number), and two sketches built on different
+    chunks of data can be merged.
+
+    Args:
+        relative_accuracy (float): Relative error of the estimated quantiles
+    """
+
+    def __init__(self, relative_accuracy=0.005):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.positive = {}
+        self.negative = {}
+        self.zero_count = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _keys(self, values):
+        return np.ceil(np.log(values) / self._log_gamma).astype(np.int64)
+
+    def bucket_of(self, values):
+        """
+        Returns the bucket ("negative", "zero" or "positive", key) of each value.
+        """
+        values = np.asarray(values, dtype=float)
+        signs = np.where(values >= MIN_INDEXABLE, "positive",
+                         np.where(values <= -MIN_INDEXABLE, "negative", "zero"))
+        keys = np.zeros(len(values), dtype=np.int64)
+        nonzero = signs != "zero"
+        keys[nonzero] = self._keys(np.abs(values[nonzero]))
+        return signs, keys
+
+    def add(self, values):
+        """
+        Adds an array of values to the sketch (NaN values are ignored).
+        """
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+
+        self.count += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.zero_count += int(np.count_nonzero(np.abs(values) < MIN_INDEXABLE))
+
+        for store, part in ((self.positive, values[values >= MIN_INDEXABLE]),
+                            (self.negative, -values[values <= -MIN_INDEXABLE])):
+            if len(part):
+                keys, counts = np.unique(self._keys(part), return_counts=True)
+                for key, count in zip(keys.tolist(), counts.tolist()):
+                    store[key] = store.get(key, 0) + count
+
+    def merge(self, other):
+        """
+        Adds the counts of another sketch (built with the same accuracy).
+        """
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Les sketches doivent avoir la même précision relative")
+        for store, other_store in ((self.positive, other.positive), (self.negative, other.negative)):
+            for key, count in other_store.items():
+                store[key] = store.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def _buckets(self):
+        """
+        Yields the non-empty buckets ((sign, key), count) in increasing order of values.
+        """
+        for key in sorted(self.negative, reverse=True):
+            yield ("negative", key), self.negative[key]
+        if self.zero_count:
+            yield ("zero", 0), self.zero_count
+        for key in sorted(self.positive):
+            yield ("positive", key), self.positive[key]
+
+    def locate(self, rank):
+        """
+        Returns the bucket holding the value of a given rank (0-based, in
+        increasing order) and the rank of this value inside the bucket.
+        """
+        seen = 0
+        for bucket, count in self._buckets():
+            if rank < seen + count:
+                return bucket, rank - seen
+            seen += count
+        raise IndexError(f"Rang {rank} hors du sketch ({self.count} valeurs)")
+
+    def _estimate(self, bucket):
+        sign, key = bucket
+        if sign == "zero":
+            return 0.0
+        value = 2 * self.gamma ** key / (self.gamma + 1)
+        value = value if sign == "positive" else -value
+        return min(max(value, self.min), self.max)
+
+    def quantile(self, q):
+        """
+        Estimates the q-quantile (0 <= q <= 1), or NaN if the sketch is empty.
+        """
+        if self.count == 0:
+            return math.nan
+        return self._estimate(self.locate(int(round(q * (self.count - 1))))[0])
+
+    def median_ranks(self):
+        """
+        Returns the ranks whose values are averaged by the median
+        (one rank for an odd count, two for an even count, as pandas does).
+        """
+        return sorted({(self.count - 1) // 2, self.count // 2})
+
+    def median(self):
+        """
+        Estimates the median, or NaN if the sketch is empty.
+        """
+        if self.count == 0:
+            return math.nan
+        return float(np.mean([self._estimate(self.locate(rank)[0]) for rank in self.median_ranks()]))
@@ -0,0 +1,118 @@
+import os
+import io
+import re
+import hashlib
+import glob
+import zipfile
+from collections import namedtuple
+from contextlib import contextmanager
+
+base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+# Folder containing the raw CSV files and/or the ZIP archive (data/raw/)
+RAW_FOLDER = os.path.join(base_dir, "data", "raw")
+
+# A raw yearly file : either a CSV on disk (member is None)
+# or a CSV member read directly from the ZIP archive at path.
+RawSource = namedtuple("RawSource", ["year", "path", "member"])
+
+
+def year_from_name(name):
+    """
+    Extracts the year from a raw file name
+    (Indicateurs_QualiteAir_France_Commune_<year>_...csv), or None.
+    """
+    match = re.search(r'(\d{4})', os.path.basename(name))
+    return int(match.group(1)) if match else None
+
+
+def source_name(source):
+    """
+    Returns the file name of a raw source (CSV file or ZIP member).
+    """
+    return os.path.basename(source.member or source.path)
+
+
+def source_hash(source, chunk_size=1024 * 1024):
+    """
+    Returns a content hash of a raw source : the MD5 checksum of a CSV file,
+    or the CRC-32 and size of a ZIP member (read from the directory of the
+    archive, nothing is decompressed).
+    """
+    if source.member is not None:
+        with zipfile.ZipFile(source.path, "r") as zip_ref:
+            info = zip_ref.getinfo(source.member)
+        return f"crc32:{info.CRC:08x}:{info.file_size}"
+
+    digest = hashlib.md5()
+    with open(source.path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return f"md5:{digest.hexdigest()}"
+
+
+def find_archive(raw_folder=RAW_FOLDER):
+    """
+    Returns the path of the ZIP archive kept in raw_folder, or None.
+    """
+    archives = sorted(glob.glob(os.path.join(raw_folder, "*.zip")))
+    return archives[0] if archives else None
+
+
+def list_raw_sources(raw_folder=RAW_FOLDER, archive_path=None, from_zip=None):
+    """
+    Lists the raw yearly CSV files, sorted by file name.
+
+    Args:
+        raw_folder (str): Folder containing the CSV files and/or the archive
+        archive_path (str): ZIP archive to read (default: first *.zip of raw_folder)
+        from_zip (bool): True to read the CSV members of the archive without
+            extracting them, False to read the extracted CSV files, None to
+            use the extracted files if any and fall back to the archive otherwise
+
+    Returns:
+        list[RawSource]: The raw sources found
+    """
+    if not from_zip:
+        files = sorted(glob.glob(os.path.join(raw_folder, "*.csv")))
+        if files or from_zip is False:
+            return [RawSource(year_from_name(f), f, None) for f in files]
+
+    archive_path = archive_path or find_archive(raw_folder)
+    if archive_path is None or not os.path.exists(archive_path):
+        return []
+
+    with zipfile.ZipFile(archive_path, "r") as zip_ref:
+        members = sorted(
+            (m.filename for m in zip_ref.infolist()
+             if not m.is_dir() and m.filename.lower().endswith(".csv")),
+            key=os.path.basename
+        )
+    return [RawSource(year_from_name(m), archive_path, m) for m in members]
+
+
+def find_raw_source(year, raw_folder=RAW_FOLDER, archive_path=None):
+    """
+    Returns the raw source of a given year (extracted CSV first, then the
+    member of the archive), or None if it cannot be found.
+    """
+    for from_zip in (False, True):
+        for source in list_raw_sources(raw_folder, archive_path, from_zip=from_zip):
+            if source.year == year:
+                return source
+    return None
+
+
+@contextmanager
+def open_raw_source(source, encoding="latin1"):
+    """
+    Opens a raw source as a text stream. ZIP members are decompressed and
+    decoded on the fly, nothing is written to disk.
+    """
+    if source.member is None:
+        with open(source.path, "r", encoding=encoding, newline="") as f:
+            yield f
+    else:
+        with zipfile.ZipFile(source.path, "r") as zip_ref:
+            with zip_ref.open(source.member) as raw:
+                yield io.TextIOWrapper(raw, encoding=encoding, newline="")
@@ -0,0 +1,135 @@
+import os
+import sys
+import numpy as np
+import plotly.graph_objects as go
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from visualizations.histograms import binned_histogram_fields, create_binned_histogram
+from visualizations.scatter_plots import create_large_scatter
+
+
+def year_slider(years, redraw):
+    """
+    Curseur des années d'une figure animée (une étape par image).
+
+    Args:
+        years (list[int]): Années, dans l'ordre des images
+        redraw (bool): Redessiner toute la figure à chaque image (nécessaire en WebGL)
+    """
+    return dict(
+        active=0,
+        currentvalue=dict(prefix='Année : ', font=dict(size=16)),
+        pad=dict(t=50),
+        steps=[dict(
+            method='animate',
+            label=str(year),
+            args=[[str(year)], dict(mode='immediate', frame=dict(duration=0, redraw=redraw),
+                                    transition=dict(duration=0))]
+        ) for year in years]
+    )
+
+
+def play_buttons(redraw):
+    """
+    Boutons lecture / pause d'une figure animée.
+    """
+    return dict(
+        type='buttons',
+        showactive=False,
+        x=0,
+        y=0,
+        xanchor='right',
+        yanchor='top',
+        pad=dict(t=50, r=10),
+        buttons=[
+            dict(label='▶', method='animate',
+                 args=[None, dict(frame=dict(duration=700, redraw=redraw), fromcurrent=True,
+                                  transition=dict(duration=0))]),
+            dict(label='❚❚', method='animate',
+                 args=[[None], dict(mode='immediate', frame=dict(duration=0, redraw=False),
+                                    transition=dict(duration=0))]),
+        ]
+    )
+
+
+def create_animated_histogram(edges, counts_by_year, pollutant_type):
+    """
+    Histogramme d'un polluant pour toutes les années, en une seule figure
+    animée : les classes (centres et largeurs) et la mise en page sont
+    écrites une fois, chaque image ne contient que les effectifs d'une année.
+
+    Args:
+        edges (array-like): Bornes des classes, communes à toutes les années
+        counts_by_year (dict): Année -> effectifs des classes
+        pollutant_type (str): Nom du polluant, comme pour create_pollution_histogram
+
+    Returns:
+        plotly.graph_objects.Figure: La figure créée (première image : première année)
+    """
+    years = sorted(counts_by_year)
+    fig = create_binned_histogram(edges, counts_by_year[years[0]], pollutant_type)
+
+    # Mêmes axes pour toutes les années : les images restent comparables
+    top = max(max(counts_by_year[year], default=0) for year in years)
+    fig.update_layout(
+        xaxis_range=[float(edges[0]), float(edges[-1])],
+        yaxis_range=[0, max(top, 1) * 1.05],
+        sliders=[year_slider(years, redraw=False)],
+        updatemenus=[play_buttons(redraw=False)]
+    )
+    fig.frames = [go.Frame(
+        name=str(year),
+        data=[go.Bar(y=binned_histogram_fields(edges, counts_by_year[year])['y'])],
+        traces=[0]
+    ) for year in years]
+    return fig
+
+
+def create_animated_scatter(fields_by_year, pollutant_type, log_x=True):
+    """
+    Nuage de points (mode large de create_pollution_scatter) d'un polluant
+    pour toutes les années, en une seule figure animée : la mise en page est
+    écrite une fois, chaque image ne contient que les points d'une année.
+
+    Args:
+        fields_by_year (dict): Année -> champs de scatter_fields(..., large=True)
+        pollutant_type (str): Nom du polluant
+        log_x (bool): Axe de population logarithmique
+
+    Returns:
+        plotly.graph_objects.Figure: La figure créée (première image : première année)
+    """
+    years = sorted(fields_by_year)
+    trace_fields, layout_fields = fields_by_year[years[0]]
+    fig = create_large_scatter(trace_fields, layout_fields, pollutant_type, log_x)
+
+    # Mêmes axes et même échelle de couleurs pour toutes les années
+    populations = np.concatenate([np.asarray(fields_by_year[year][0]['x'], dtype=float) for year in years])
+    concentrations = np.concatenate([np.asarray(fields_by_year[year][0]['y'], dtype=float) for year in years])
+    low, high = np.nanmin(concentrations), np.nanmax(concentrations)
+    if log_x:
+        x_range = [np.log10(np.nanmin(populations)) - 0.05, np.log10(np.nanmax(populations)) + 0.05]
+    else:
+        x_range = [0, np.nanmax(populations) * 1.02]
+    fig.update_layout(
+        xaxis_range=[float(value) for value in x_range],
+        yaxis_range=[float(min(low, 0)), float(high * 1.05)],
+        sliders=[year_slider(years, redraw=True)],
+        updatemenus=[play_buttons(redraw=True)],
+        margin=dict(b=120)
+    )
+    fig.update_traces(marker_cmin=float(low), marker_cmax=float(high))
+
+    frames = []
+    for year in years:
+        trace_fields, layout_fields = fields_by_year[year]
+        frames.append(go.Frame(
+            name=str(year),
+            data=[go.Scattergl(x=trace_fields['x'], y=trace_fields['y'],
+                               marker=dict(color=trace_fields['marker.color']),
+                               customdata=trace_fields['customdata'])],
+            layout=dict(xaxis=dict(title=dict(text=layout_fields['xaxis.title.text']))),
+            traces=[0]
+        ))
+    fig.frames = frames
+    return fig
@@ -0,0 +1,101 @@
+# benchmark_figures.py
+import time
+import sqlite3
+import argparse
+import plotly.io as pio
+from src.database.visualize_from_db import POLLUTANTS, SCATTER_OPTIONS, db_path, load_years, read_year
+from src.database.aggregates import load_histogram
+from src.utils.common_functions import load_commune_mappings
+from src.visualizations.figure_templates import FigureTemplates
+from src.visualizations.histograms import binned_histogram_fields, create_binned_histogram
+from src.visualizations.scatter_plots import create_pollution_scatter, scatter_fields
+
+
+def figure_inputs(conn, années, insee_to_commune):
+    """
+    Entrées de toutes les figures des années données : (type, polluant,
+    construction de la figure validée, calcul des champs du gabarit).
+    """
+    inputs = []
+    for année in années:
+        data = read_year(conn, année, list(POLLUTANTS))
+        for polluant, colonne in POLLUTANTS.items():
+            build = (lambda data=data, polluant=polluant:
+                     create_pollution_scatter(data, insee_to_commune, polluant, **SCATTER_OPTIONS))
+            fields = (lambda data=data, polluant=polluant:
+                      scatter_fields(data, insee_to_commune, polluant, **SCATTER_OPTIONS))
+            inputs.append(("scatter", polluant, build, fields))
+
+            bins = load_histogram(conn, colonne, année)
+            edges = list(bins["bin_start"]) + list(bins["bin_end"].tail(1))
+            build = (lambda edges=edges, counts=bins["count"], polluant=polluant:
+                     create_binned_histogram(edges, counts, polluant))
+            fields = (lambda edges=edges, counts=bins["count"]:
+                      (binned_histogram_fields(edges, counts), {}))
+            inputs.append(("histogram", polluant, build, fields))
+    return inputs
+
+
+def benchmark(years=None, repeat=3):
+    """
+    Mesure le coût par figure de la construction avec les objets plotly
+    (validation de chaque propriété) et avec les gabarits (FigureTemplates),
+    sans et avec la sérialisation JSON, et vérifie que les deux donnent le même JSON.
+
+    Args:
+        years (int): Nombre d'années de la base utilisées (par défaut : toutes)
+        repeat (int): Nombre de mesures (la meilleure est gardée)
+
+    Returns:
+        dict: Coût par figure en millisecondes de chaque méthode
+    """
+    conn = sqlite3.connect(db_path)
+    années = load_years(conn)[:years] if years else load_years(conn)
+    _, insee_to_commune = load_commune_mappings()
+    inputs = figure_inputs(conn, années, insee_to_commune)
+    conn.close()
+    print(f"{len(inputs)} figures ({len(années)} années, {len(POLLUTANTS)} polluants, 2 types)")
+
+    def validated(serialize):
+        for kind, polluant, build, fields in inputs:
+            fig = build()
+            if serialize:
+                pio.to_json(fig)
+
+    def templated(serialize):
+        templates = FigureTemplates()
+        for kind, polluant, build, fields in inputs:
+            fig = templates.figure((kind, polluant), build, *fields())
+            if serialize:
+                pio.to_json(fig, validate=False)
+
+    # Les deux méthodes doivent produire exactement le même JSON
+    templates = FigureTemplates()
+    for kind, polluant, build, fields in inputs:
+        fig = templates.figure((kind, polluant), build, *fields())
+        if pio.to_json(fig, validate=False) != pio.to_json(build()):
+            raise RuntimeError(f"Figure différente pour {polluant} ({kind})")
+
+    results = {}
+    for serialize in (False, True):
+        for name, run in (("validée", validated), ("gabarit", templated)):
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                run(serialize)
+                timings.append(time.perf_counter() - start)
+            label = f"{name}{' + JSON' if serialize else ''}"
+            results[label] = min(timings) / len(inputs) * 1000
+            print(f"{label:>16} : {results[label]:.2f} ms par figure")
+
+    print(f"Accélération de la construction : x{results['validée'] / results['gabarit']:.1f}, "
+          f"avec la sérialisation : x{results['validée + JSON'] / results['gabarit + JSON']:.1f}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Coût de construction des figures, avec et sans gabarits")
+    parser.add_argument("--years", type=int, default=None, help="nombre d'années utilisées (défaut : toutes)")
+    parser.add_argument("--repeat", type=int, default=3, help="nombre de mesures par méthode")
+    args = parser.parse_args()
+    benchmark(years=args.years, repeat=args.repeat)
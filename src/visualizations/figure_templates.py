@@ -0,0 +1,70 @@
+import copy
+from plotly.io import write_html
+
+
+def set_path(spec, path, value):
+    """
+    Renvoie une copie de spec (dictionnaire) où la propriété path
+    ('marker.color', 'xaxis.title.text') vaut value. Seuls les
+    dictionnaires sur le chemin sont copiés, le reste est partagé.
+    """
+    key, _, rest = path.partition('.')
+    spec = dict(spec)
+    spec[key] = set_path(spec.get(key, {}), rest, value) if rest else value
+    return spec
+
+
+class FigureTemplates:
+    """
+    Gabarits de figures : la première figure d'un gabarit est construite avec
+    les objets plotly (toutes les propriétés sont validées), puis les suivantes
+    sont des copies de son dictionnaire où seules les données changent. Elles
+    s'écrivent sans nouvelle validation (write_figure).
+
+    Une clé de gabarit doit identifier tout ce qui ne figure pas dans les
+    champs remplacés (type de graphique, polluant, options).
+    """
+
+    def __init__(self):
+        self.specs = {}
+
+    def figure(self, key, build, trace_fields, layout_fields=None):
+        """
+        Renvoie la figure d'un gabarit.
+
+        Args:
+            key (hashable): Clé du gabarit
+            build (callable): Construit la figure validée (appelée seulement
+                à la première utilisation du gabarit)
+            trace_fields (dict ou list[dict]): Champs de la trace (chemin -> valeur),
+                par exemple {'x': ..., 'y': ...}, ou une liste de champs par trace
+            layout_fields (dict): Champs de la mise en page (chemin -> valeur)
+
+        Returns:
+            plotly.graph_objects.Figure ou dict: La figure (validée à la
+            première utilisation, un dictionnaire ensuite)
+        """
+        spec = self.specs.get(key)
+        if spec is None:
+            fig = build()
+            self.specs[key] = copy.deepcopy(fig.to_dict())
+            return fig
+
+        if isinstance(trace_fields, dict):
+            trace_fields = [trace_fields]
+        data = list(spec['data'])
+        for i, fields in enumerate(trace_fields):
+            for path, value in fields.items():
+                data[i] = set_path(data[i], path, value)
+        layout = spec['layout']
+        for path, value in (layout_fields or {}).items():
+            layout = set_path(layout, path, value)
+        return {'data': data, 'layout': layout}
+
+
+def write_figure(fig, file, **kwargs):
+    """
+    Écrit une figure en HTML (write_html), sans valider les figures
+    produites par un gabarit.
+    """
+    write_html(fig, file, validate=not isinstance(fig, dict), **kwargs)
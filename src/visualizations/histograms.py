@@ -1,10 +1,31 @@
+import os
+import sys
 import plotly.graph_objects as go
 from plotly.io import write_html
 
-def create_pollution_histogram(data, pollutant_type):
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.histogram_bins import bin_counts, bin_edges
+
+HOVER_TEMPLATE = ("<b>Concentration</b>: %{x:.1f} µg/m³<br>" +
+                  "Nombre de communes: %{y}<extra></extra>")
+
+
+def pollutant_bins_key(pollutant_type):
+    """
+    Returns the key of a pollutant in POLLUTANT_BINS (database column name),
+    e.g. 'NO2' -> 'no2', 'PM25 ponderee' -> 'pm25_pop', 'AOT 40' -> 'aot40'.
+    """
+    return pollutant_type.lower().replace(' ponderee', '_pop').replace(' ', '')
+
+
+def create_pollution_histogram(data, pollutant_type, binned=False):
     """
     Creates a histogram for NO₂, PM₁₀, O₃, SOMO₃₅, AOT₄₀, or PM₂.₅.
 
+    With binned=True the values are counted here on the fixed bins of the
+    pollutant (see utils/histogram_bins.py) and the figure only holds the
+    counts of the bins instead of every value.
+
     Returns:
     plotly.graph_objects.Figure: The created figure
     """
@@ -18,15 +39,148 @@ def create_pollution_histogram(data, pollutant_type):
         column_name = f'Moyenne annuelle de concentration de {pollutant_type} (ug/m3)'
     values = data[column_name]
 
+    if binned:
+        key = pollutant_bins_key(pollutant_type)
+        return create_binned_histogram(bin_edges(key), bin_counts(values, key), pollutant_type)
+
     trace = go.Histogram(
         x=values,
         name=f'Distribution {pollutant_type}',
         nbinsx=30,
         marker_color='rgb(70, 130, 180)',  # Bleu acier, plus visible
-        hovertemplate="<b>Concentration</b>: %{x:.1f} µg/m³<br>" +
-                     "Nombre de communes: %{y}<extra></extra>"
+        hovertemplate=HOVER_TEMPLATE
+    )
+
+    fig = go.Figure(data=[trace], layout=histogram_layout(pollutant_type))
+    return fig
+
+
+def create_binned_histogram(edges, counts, pollutant_type):
+    """
+    Creates a histogram from counts already computed on fixed bins
+    (one bar per bin, drawn like go.Histogram).
+
+    Args:
+        edges (array-like): Bin edges (len(counts) + 1 values)
+        counts (array-like): Number of communes in each bin
+        pollutant_type (str): Pollutant name, as in create_pollution_histogram
+
+    Returns:
+    plotly.graph_objects.Figure: The created figure
+    """
+    fields = binned_histogram_fields(edges, counts)
+    trace = go.Bar(
+        x=fields['x'],
+        y=fields['y'],
+        width=fields['width'],
+        name=f'Distribution {pollutant_type}',
+        marker_color='rgb(70, 130, 180)',  # Bleu acier, plus visible
+        hovertemplate=HOVER_TEMPLATE
     )
 
+    fig = go.Figure(data=[trace], layout=histogram_layout(pollutant_type))
+    return fig
+
+
+def create_comparison_histogram(edges, counts1, counts2, year1, year2, pollutant_type):
+    """
+    Creates the histograms of two years on the same fixed bins, overlaid.
+
+    Args:
+        edges (array-like): Bin edges shared by the two years
+        counts1 (array-like): Number of communes in each bin for year1
+        counts2 (array-like): Number of communes in each bin for year2
+        year1 (int): First year
+        year2 (int): Second year
+        pollutant_type (str): Pollutant name, as in create_pollution_histogram
+
+    Returns:
+    plotly.graph_objects.Figure: The created figure
+    """
+    fields = comparison_histogram_fields(edges, counts1, counts2, year1, year2, pollutant_type)
+    traces = [go.Bar(
+        x=fields['x'],
+        y=trace['y'],
+        width=fields['width'],
+        name=trace['name'],
+        marker_color=color,
+        opacity=0.6,
+        hovertemplate="<b>%{fullData.name}</b><br>" + HOVER_TEMPLATE
+    ) for trace, color in zip(fields['traces'], ['rgb(70, 130, 180)', 'rgb(220, 90, 60)'])]
+
+    fig = go.Figure(data=traces, layout=histogram_layout(pollutant_type))
+    fig.update_layout(barmode='overlay', title_text=fields['title.text'])
+    return fig
+
+
+def comparison_histogram_fields(edges, counts1, counts2, year1, year2, pollutant_type):
+    """
+    Parts of a comparison histogram which change from one pair of years
+    to another: counts and names of the two traces, and the title.
+    """
+    first = binned_histogram_fields(edges, counts1)
+    return {
+        'x': first['x'],
+        'width': first['width'],
+        'traces': [
+            {'y': first['y'], 'name': str(year1)},
+            {'y': binned_histogram_fields(edges, counts2)['y'], 'name': str(year2)},
+        ],
+        'title.text': f'Distribution des concentrations de {pollutant_type} : {year1} et {year2}',
+    }
+
+
+def create_evolution_histogram(edges, years, counts, pollutant_type):
+    """
+    Creates the evolution of the distribution of a pollutant over the years:
+    a heatmap with one row per year and one column per fixed bin.
+
+    Args:
+        edges (array-like): Bin edges shared by all the years
+        years (list[int]): The years (rows of counts)
+        counts (array-like): Number of communes in each bin, shape (len(years), number of bins)
+        pollutant_type (str): Pollutant name, as in create_pollution_histogram
+
+    Returns:
+    plotly.graph_objects.Figure: The created figure
+    """
+    centres = binned_histogram_fields(edges, counts[0])['x']
+    trace = go.Heatmap(
+        x=centres,
+        y=[str(year) for year in years],
+        z=[[int(count) for count in row] for row in counts],
+        colorscale='Blues',
+        colorbar=dict(title='Communes'),
+        hovertemplate="<b>%{y}</b><br>" +
+                     "<b>Concentration</b>: %{x:.1f} µg/m³<br>" +
+                     "Nombre de communes: %{z}<extra></extra>"
+    )
+
+    fig = go.Figure(data=[trace], layout=histogram_layout(pollutant_type))
+    fig.update_layout(
+        title_text=f'Évolution de la distribution des concentrations de {pollutant_type}',
+        yaxis=dict(title='Année', type='category', showgrid=False)
+    )
+    return fig
+
+
+def binned_histogram_fields(edges, counts):
+    """
+    Data of the bar trace of a binned histogram (bin centres, counts and
+    widths), the only part of the figure which changes from year to year.
+    """
+    edges = [float(edge) for edge in edges]
+    return {
+        'x': [(start + end) / 2 for start, end in zip(edges[:-1], edges[1:])],
+        'y': [int(count) for count in counts],
+        'width': [end - start for start, end in zip(edges[:-1], edges[1:])],
+    }
+
+
+def histogram_layout(pollutant_type):
+    """
+    Layout shared by the histograms of a pollutant.
+    """
     layout = go.Layout(
         title=dict(
             text=f'Distribution des concentrations de {pollutant_type}',
@@ -45,8 +199,7 @@ def create_pollution_histogram(data, pollutant_type):
             showgrid=True,
             gridwidth=1,
             gridcolor='LightGray'
-        )
+        ),
+        bargap=0
     )
-
-    fig = go.Figure(data=[trace], layout=layout)
-    return fig
\ No newline at end of file
+    return layout
@@ -1,109 +1,418 @@
 import pandas as pd
-import folium
-from folium.plugins import HeatMap
+import numpy as np
 import sqlite3
 import json
 import os
+import shutil
+import argparse
 
 output_dir = "assets"
-os.makedirs(output_dir, exist_ok=True)
 
-
-print("🔄 Chargement des données depuis la base de données...")
-
-# --- Load data from the SQLite database ---
+# --- SQLite database ---
 base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
 db_path = os.path.join(base_dir, "data", "air_quality.db")
+communes_path = os.path.join(base_dir, "data", "cleaned", "base-officielle-codes-postaux.csv")
 
-# Connect to the database
-conn = sqlite3.connect(db_path)
-
-# Using DISTINCT to avoid duplicates
-query = """
-SELECT DISTINCT com_insee, commune, population, annee, 
+# One row per (commune, year): the primary key of the measurements table
+# guarantees there are no duplicates. Communes are numbered in the order of
+# their INSEE codes, so this reads the measurements table in the order of
+# its primary key (annee, commune_id) without sorting.
+MAP_QUERY = """
+SELECT com_insee, commune, population, annee, 
        pm25, pm10, no2, o3, aot40, somo35
 FROM air_quality
-ORDER BY annee, com_insee
+ORDER BY annee, commune_id
 """
-df_pollution = pd.read_sql_query(query, conn)
-conn.close()
-
-print(f"✅ Données chargées depuis la base : {len(df_pollution)} lignes")
-
-# Renommer les colonnes pour correspondre au format attendu
-df_pollution = df_pollution.rename(columns={
-    'com_insee': 'COM Insee',
-    'commune': 'Commune',
-    'population': 'Population',
-    'annee': 'Année',
-    'pm25': 'Moyenne annuelle de concentration de PM2.5 (ug/m3)',
-    'pm10': 'Moyenne annuelle de concentration de PM10 (ug/m3)',
-    'no2': 'Moyenne annuelle de concentration de NO2 (ug/m3)',
-    'o3': 'Moyenne annuelle de concentration de O3 (ug/m3)',
-    'aot40': 'Moyenne annuelle de concentration de AOT 40 (ug/m3.h)',
-    'somo35': 'Moyenne annuelle de concentration de somo 35 (ug/m3.j)'
-})
-
-# --- Load the contact details for the municipalities ---
-df_communes = pd.read_csv(os.path.join(base_dir, "data", "cleaned", "base-officielle-codes-postaux.csv"), dtype={"code_commune_insee": str})
-
-# --- Deduplicate municipalities ---
-df_communes = df_communes.drop_duplicates(subset=['code_commune_insee'], keep='first')
-print(f"✅ Communes uniques avec coordonnées: {len(df_communes)}")
-
-# --- Prepare columns for merge ---
-df_pollution['COM Insee'] = df_pollution['COM Insee'].astype(str)
-df_communes['code_commune_insee'] = df_communes['code_commune_insee'].astype(str)
 
-    # --- Merge to add latitude, longitude, and commune name ---
-df_merged = df_pollution.merge(
-    df_communes[['code_commune_insee', 'latitude', 'longitude', 'nom_de_la_commune']],
-    left_on='COM Insee',
-    right_on='code_commune_insee',
-    how='left'
-)
-
-# --- Filter valid data ---
-df_map = df_merged.dropna(subset=['latitude', 'longitude']).copy()
-
-print(f"✅ Données chargées : {len(df_map)} communes avec coordonnées")
-
-# Polluants
-pollutants = {
-    'PM10': 'Moyenne annuelle de concentration de PM10 (ug/m3)',
-    'PM25': 'Moyenne annuelle de concentration de PM2.5 (ug/m3)',
-    'NO2': 'Moyenne annuelle de concentration de NO2 (ug/m3)',
-    'O3': 'Moyenne annuelle de concentration de O3 (ug/m3)',
-    'AOT40': 'Moyenne annuelle de concentration de AOT 40 (ug/m3.h)',
-    'SOMO35': 'Moyenne annuelle de concentration de somo 35 (ug/m3.j)'
+# Polluants : nom affiché -> colonne de la base
+POLLUTANTS = {
+    'PM10': 'pm10',
+    'PM25': 'pm25',
+    'NO2': 'no2',
+    'O3': 'o3',
+    'AOT40': 'aot40',
+    'SOMO35': 'somo35'
 }
 
-# Get available years
-years = sorted([int(y) for y in df_map['Année'].unique()])
-print(f"📅 Années disponibles : {years}")
+# Encodage binaire des données de la carte : des entiers little-endian, lus
+# dans la page par des TypedArray posés directement sur les fichiers.
+# Coordonnées : millionièmes de degré à partir du coin sud-ouest de
+# l'emprise des communes (erreur maximale 0,5e-6 degré, quelques centimètres).
+COORDINATE_STEP = 1e-6
+# Concentrations : pas de VALUE_STEP à partir du minimum du polluant
+# (erreur maximale VALUE_STEP / 2 ; les popups affichent 2 décimales).
+VALUE_STEP = 0.001
+# La plus grande valeur de chaque type entier marque une valeur manquante
+INTEGER_TYPES = {'uint16': np.dtype('<u2'), 'uint32': np.dtype('<u4')}
 
-# Create a data dictionary by year and by municipality
-data_by_year = {}
-for year in years:
-    df_year = df_map[df_map['Année'] == year]
-    data_by_year[year] = {}
-    
-    for _, row in df_year.iterrows():
-        commune_key = f"{row['latitude']:.6f}_{row['longitude']:.6f}"
-        data_by_year[year][commune_key] = {
-            'nom': row['nom_de_la_commune'] if pd.notna(row['nom_de_la_commune']) else row['Commune'],
-            'latitude': row['latitude'],
-            'longitude': row['longitude'],
-            'population': int(row['Population']) if pd.notna(row['Population']) else 0,
+# Données de la carte, dans un dossier à côté de la page : la page ne
+# télécharge que l'année affichée et garde les CACHED_YEARS dernières vues
+MAP_DATA_DIR = "map_data"
+CACHED_YEARS = 3
+
+# Pyramide de grilles pour les zooms éloignés : à chaque zoom de GRID_ZOOMS,
+# les communes sont regroupées en cellules de GRID_CELL_SIZE pixels (en
+# projection Web Mercator, comme les tuiles de la carte). À partir de
+# DETAIL_ZOOM, la page affiche les communes de la zone visible.
+GRID_ZOOMS = range(5, 10)
+DETAIL_ZOOM = 10
+GRID_CELL_SIZE = 64
+# Les cellules d'un zoom sont écrites par blocs de GRID_BLOCK_CELLS x
+# GRID_BLOCK_CELLS (un fichier par année et par bloc) : la page ne charge
+# que les blocs visibles, et garde les CACHED_BLOCKS derniers vus
+GRID_BLOCK_CELLS = 16
+CACHED_BLOCKS = 64
+
+
+def load_map_data(db_path=db_path, communes_path=communes_path):
+    """
+    Charge les mesures de toutes les années et ajoute les coordonnées et le
+    nom officiel des communes. Les communes sans coordonnées sont écartées.
+
+    Returns:
+        pd.DataFrame: Une ligne par (commune, année)
+    """
+    print("🔄 Chargement des données depuis la base de données...")
+    conn = sqlite3.connect(db_path)
+    df_pollution = pd.read_sql_query(MAP_QUERY, conn)
+    conn.close()
+    print(f"✅ Données chargées depuis la base : {len(df_pollution)} lignes")
+
+    # --- Load the contact details for the municipalities (deduplicated) ---
+    df_communes = pd.read_csv(communes_path, dtype={"code_commune_insee": str},
+                              usecols=['code_commune_insee', 'latitude', 'longitude', 'nom_de_la_commune'])
+    df_communes = df_communes.drop_duplicates(subset=['code_commune_insee'], keep='first')
+    print(f"✅ Communes uniques avec coordonnées: {len(df_communes)}")
+
+    # --- Merge to add latitude, longitude, and commune name ---
+    df_pollution['com_insee'] = df_pollution['com_insee'].astype(str)
+    df_merged = df_pollution.merge(df_communes, left_on='com_insee', right_on='code_commune_insee', how='left')
+
+    # --- Filter valid data ---
+    df_map = df_merged.dropna(subset=['latitude', 'longitude'])
+    print(f"✅ Données chargées : {len(df_map)} communes avec coordonnées")
+    return df_map
+
+
+def build_map_columns(df_map, pollutants=POLLUTANTS):
+    """
+    Range les données de la carte en colonnes (struct-of-arrays) : le nom et
+    les coordonnées de chaque commune une seule fois, puis une matrice
+    (années x communes) pour la population et pour chaque polluant, alignée
+    sur la liste des communes, avec NaN quand la commune n'a pas de mesure.
+
+    Args:
+        df_map (pd.DataFrame): Les données de load_map_data
+        pollutants (dict): Nom affiché -> colonne de la base
+
+    Returns:
+        dict: {'years', 'pollutants', 'names', 'lat', 'lon', 'population',
+        'values': {polluant: matrice}}
+    """
+    years = sorted(int(y) for y in df_map['annee'].unique())
+    year_index = np.searchsorted(years, df_map['annee'].to_numpy())
+    codes, commune_index = np.unique(df_map['com_insee'].to_numpy(dtype=str), return_inverse=True)
+
+    # Nom et coordonnées de chaque commune (dans l'ordre de codes) : ceux de sa dernière ligne
+    _, last_reversed = np.unique(commune_index[::-1], return_index=True)
+    last = len(commune_index) - 1 - last_reversed
+    names = df_map['nom_de_la_commune'].where(df_map['nom_de_la_commune'].notna(), df_map['commune'])
+
+    def by_year(column, fill=None):
+        # Matrice (années x communes) d'une colonne, NaN où la commune n'a pas de ligne
+        matrix = np.full((len(years), len(codes)), np.nan)
+        values = pd.to_numeric(df_map[column], errors='coerce').to_numpy(dtype=float)
+        if fill is not None:
+            values = np.where(np.isnan(values), fill, values)
+        matrix[year_index, commune_index] = values
+        return matrix
+
+    return {
+        'years': years,
+        'pollutants': list(pollutants),
+        'names': names.to_numpy()[last].tolist(),
+        'lat': df_map['latitude'].to_numpy(dtype=float)[last],
+        'lon': df_map['longitude'].to_numpy(dtype=float)[last],
+        'population': by_year('population', fill=0),
+        'values': {pollutant_key: by_year(column) for pollutant_key, column in pollutants.items()
+                   if column in df_map.columns},
+    }
+
+
+def json_size(columns):
+    """
+    Taille en octets des mêmes données écrites en JSON (communes, puis un
+    fichier par année, concentrations à 3 décimales), pour comparaison.
+    """
+    def dense(row, decimals):
+        return np.where(np.isnan(row), None, np.round(row, decimals)).tolist()
+
+    communes = {'nom': columns['names'],
+                'lat': np.round(columns['lat'], 6).tolist(),
+                'lon': np.round(columns['lon'], 6).tolist()}
+    size = len(json.dumps(communes, separators=(',', ':')).encode('utf-8'))
+    for i in range(len(columns['years'])):
+        year_data = {'population': dense(columns['population'][i], 0),
+                     'values': {pollutant: dense(matrix[i], 3) for pollutant, matrix in columns['values'].items()
+                                if not np.isnan(matrix[i]).all()}}
+        size += len(json.dumps(year_data, separators=(',', ':')).encode('utf-8'))
+    return size
+
+
+def quantize(values, low, step, type_name):
+    """
+    Encode des valeurs en entiers round((values - low) / step) du type
+    type_name ; les NaN prennent la plus grande valeur du type (manquante).
+
+    Returns:
+        tuple: (codes, erreur maximale du décodage low + code * step)
+    """
+    dtype = INTEGER_TYPES[type_name]
+    codes = np.full(values.shape, np.iinfo(dtype).max, dtype=dtype)
+    present = ~np.isnan(values)
+    codes[present] = np.round((values[present] - low) / step)
+    error = np.abs(low + codes[present] * step - values[present])
+    return codes, float(error.max()) if error.size else 0.0
+
+
+def value_encoding(matrix, step=VALUE_STEP):
+    """
+    Quantification d'un polluant : minimum (multiple du pas), pas et plus petit
+    type entier qui contient toutes ses valeurs (uint16 ou uint32).
+    """
+    low = float(np.floor(np.nanmin(matrix) / step) * step)
+    levels = int(np.round((np.nanmax(matrix) - low) / step))
+    type_name = 'uint16' if levels < np.iinfo(np.uint16).max else 'uint32'
+    return {'min': low, 'step': step, 'type': type_name}
+
+
+def write_binary(path, arrays):
+    """
+    Écrit des tableaux les uns après les autres, chacun aligné sur 4 octets
+    (un TypedArray ne peut commencer qu'à un multiple de sa taille).
+
+    Returns:
+        list[int]: Position de chaque tableau dans le fichier
+    """
+    offsets = []
+    with open(path, 'wb') as f:
+        position = 0
+        for array in arrays:
+            padding = -position % 4
+            f.write(b'\0' * padding)
+            position += padding
+            offsets.append(position)
+            f.write(array.tobytes())
+            position += array.nbytes
+    return offsets
+
+
+def mercator_pixels(lat, lon, zoom):
+    """
+    Coordonnées en pixels Web Mercator (tuiles de 256 pixels) au zoom
+    donné, comme map.project de Leaflet.
+    """
+    scale = 256 * 2 ** zoom
+    lat = np.radians(np.clip(lat, -85.0511287798, 85.0511287798))
+    x = (lon + 180) / 360 * scale
+    y = (1 - np.log(np.tan(lat) + 1 / np.cos(lat)) / np.pi) / 2 * scale
+    return x, y
+
+
+def aggregate_cells(columns, zoom):
+    """
+    Regroupe les communes dans les cellules de la grille d'un zoom et calcule,
+    pour chaque année, le nombre de communes mesurées et leur population, puis
+    pour chaque polluant la moyenne pondérée par la population (moyenne simple
+    si la population est nulle) et le maximum.
+
+    Args:
+        columns (dict): Les données de build_map_columns
+        zoom (int): Zoom de la grille
+
+    Returns:
+        tuple: (colonnes et lignes des cellules, liste par année de
+        {'count', 'population', 'mean': {polluant}, 'max': {polluant}})
+    """
+    x, y = mercator_pixels(columns['lat'], columns['lon'], zoom)
+    cells_per_axis = 256 * 2 ** zoom // GRID_CELL_SIZE
+    keys = (x // GRID_CELL_SIZE).astype(np.int64) * cells_per_axis + (y // GRID_CELL_SIZE).astype(np.int64)
+    keys, cell_index = np.unique(keys, return_inverse=True)
+    n = len(keys)
+
+    stats = []
+    for i in range(len(columns['years'])):
+        population = columns['population'][i]
+        present = ~np.isnan(population)
+        year_stats = {
+            'count': np.bincount(cell_index[present], minlength=n),
+            'population': np.bincount(cell_index[present], population[present], minlength=n),
+            'mean': {},
+            'max': {},
         }
-        
-        # Add pollutant concentrations
-        for pollutant_key, pollutant_col in pollutants.items():
-            if pollutant_col in row and pd.notna(row[pollutant_col]):
-                data_by_year[year][commune_key][pollutant_key] = float(row[pollutant_col])
+        for pollutant, matrix in columns['values'].items():
+            values = matrix[i]
+            has_value = present & ~np.isnan(values)
+            index, values, weights = cell_index[has_value], values[has_value], population[has_value]
+            count = np.bincount(index, minlength=n)
+            total_weight = np.bincount(index, weights, minlength=n)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                year_stats['mean'][pollutant] = np.where(
+                    total_weight > 0,
+                    np.bincount(index, weights * values, minlength=n) / total_weight,
+                    np.bincount(index, values, minlength=n) / count)
+            maximum = np.full(n, -np.inf)
+            np.maximum.at(maximum, index, values)
+            maximum[count == 0] = np.nan
+            year_stats['max'][pollutant] = maximum
+        stats.append(year_stats)
+
+    return np.stack([keys // cells_per_axis, keys % cells_per_axis], axis=1), stats
+
+
+def write_map_grid(columns, data_dir):
+    """
+    Écrit la pyramide de grilles dans data_dir/grid/<année>/<zoom>_<bx>_<by>.bin :
+    un fichier par année et par bloc de cellules. Chaque fichier contient,
+    pour les cellules du bloc (les mêmes toutes les années), la position de
+    la cellule dans le bloc (uint16), le nombre de communes et la population
+    (uint32), puis la moyenne pondérée et le maximum de chaque polluant
+    (float32, NaN si manquant).
+
+    Returns:
+        dict: La description de la grille (intégrée au manifeste de la page)
+    """
+    grid_dir = os.path.join(data_dir, 'grid')
+    shutil.rmtree(grid_dir, ignore_errors=True)
+    pollutants = list(columns['values'])
+    blocks = {}
+    for zoom in GRID_ZOOMS:
+        cells, stats = aggregate_cells(columns, zoom)
+        block = cells // GRID_BLOCK_CELLS
+        local = ((cells[:, 0] % GRID_BLOCK_CELLS) * GRID_BLOCK_CELLS + cells[:, 1] % GRID_BLOCK_CELLS).astype('<u2')
+        order = np.lexsort((local, block[:, 1], block[:, 0]))
+        block, local = block[order], local[order]
+        starts = np.flatnonzero(np.r_[True, (np.diff(block, axis=0) != 0).any(axis=1)])
+        ends = np.r_[starts[1:], len(order)]
+
+        blocks[zoom] = {}
+        for start, end in zip(starts, ends):
+            name = f"{block[start, 0]}_{block[start, 1]}"
+            blocks[zoom][name] = int(end - start)
+            rows = order[start:end]
+            for year, year_stats in zip(columns['years'], stats):
+                arrays = [local[start:end],
+                          year_stats['count'][rows].astype('<u4'),
+                          np.round(year_stats['population'][rows]).astype('<u4')]
+                for pollutant in pollutants:
+                    arrays.append(year_stats['mean'][pollutant][rows].astype('<f4'))
+                    arrays.append(year_stats['max'][pollutant][rows].astype('<f4'))
+                year_dir = os.path.join(grid_dir, str(year))
+                os.makedirs(year_dir, exist_ok=True)
+                write_binary(os.path.join(year_dir, f"{zoom}_{name}.bin"), arrays)
+
+    return {
+        'zooms': list(GRID_ZOOMS),
+        'detailZoom': DETAIL_ZOOM,
+        'cellSize': GRID_CELL_SIZE,
+        'blockCells': GRID_BLOCK_CELLS,
+        'pollutants': pollutants,
+        # Blocs de chaque zoom et leur nombre de cellules
+        'blocks': blocks,
+    }
+
+
+def write_json(path, data):
+    """
+    Écrit data dans un fichier JSON compact.
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(data, separators=(',', ':')))
 
 
-html_content = """
+def write_map_data(columns, output_dir, per_pollutant=False):
+    """
+    Écrit les données de build_map_columns dans output_dir/map_data, en
+    binaire : communes.json (noms), communes.bin (coordonnées), puis
+    <année>.bin (population et concentrations de l'année). Avec
+    per_pollutant, <année>.bin ne contient que la population et chaque
+    polluant a son fichier <année>_<polluant>.bin. La pyramide de grilles
+    des zooms éloignés est écrite dans grid/ (write_map_grid). Les fichiers
+    d'une génération précédente qui ne sont plus produits sont supprimés.
+
+    Args:
+        columns (dict): Les données de build_map_columns
+        output_dir (str): Dossier de la page de la carte
+        per_pollutant (bool): Un fichier par année et par polluant
+
+    Returns:
+        tuple: (manifeste des données, intégré à la page ;
+        erreur maximale de quantification par colonne)
+    """
+    data_dir = os.path.join(output_dir, MAP_DATA_DIR)
+    os.makedirs(data_dir, exist_ok=True)
+    errors = {}
+
+    write_json(os.path.join(data_dir, 'communes.json'), columns['names'])
+    origin = {'lat': float(np.floor(columns['lat'].min())), 'lon': float(np.floor(columns['lon'].min()))}
+    lat, errors['latitude'] = quantize(columns['lat'], origin['lat'], COORDINATE_STEP, 'uint32')
+    lon, errors['longitude'] = quantize(columns['lon'], origin['lon'], COORDINATE_STEP, 'uint32')
+    write_binary(os.path.join(data_dir, 'communes.bin'), [lat, lon])
+    written = {'communes.json', 'communes.bin'}
+
+    encodings = {pollutant: value_encoding(matrix) for pollutant, matrix in columns['values'].items()
+                 if not np.isnan(matrix).all()}
+    files = {}
+    for i, year in enumerate(columns['years']):
+        population, _ = quantize(columns['population'][i], 0, 1, 'uint32')
+        # Les années sans aucune valeur d'un polluant n'ont pas de colonne pour lui
+        values = {}
+        for pollutant, encoding in encodings.items():
+            row = columns['values'][pollutant][i]
+            if np.isnan(row).all():
+                continue
+            values[pollutant], error = quantize(row, encoding['min'], encoding['step'], encoding['type'])
+            errors[pollutant] = max(errors.get(pollutant, 0.0), error)
+
+        if per_pollutant:
+            for pollutant, codes in values.items():
+                write_binary(os.path.join(data_dir, f"{year}_{pollutant}.bin"), [codes])
+                written.add(f"{year}_{pollutant}.bin")
+            offsets = write_binary(os.path.join(data_dir, f"{year}.bin"), [population])
+            files[year] = {'population': offsets[0], 'values': {pollutant: 0 for pollutant in values}}
+        else:
+            offsets = write_binary(os.path.join(data_dir, f"{year}.bin"), [population] + list(values.values()))
+            files[year] = {'population': offsets[0], 'values': dict(zip(values, offsets[1:]))}
+        written.add(f"{year}.bin")
+
+    for name in os.listdir(data_dir):
+        if name.endswith(('.json', '.bin')) and name not in written:
+            os.remove(os.path.join(data_dir, name))
+
+    manifest = {
+        'dir': MAP_DATA_DIR,
+        'grid': write_map_grid(columns, data_dir),
+        'years': columns['years'],
+        'pollutants': columns['pollutants'],
+        'perPollutant': per_pollutant,
+        'communes': len(columns['names']),
+        'origin': origin,
+        'coordinateStep': COORDINATE_STEP,
+        'encodings': encodings,
+        # Position des colonnes dans les fichiers de chaque année (les
+        # polluants absents d'une année n'ont pas de fichier)
+        'files': files,
+    }
+    return manifest, errors
+
+
+def map_html(manifest):
+    """
+    Page HTML de la carte interactive (Leaflet). Les données sont chargées
+    depuis les fichiers décrits par le manifeste de write_map_data.
+    """
+    years = manifest['years']
+    html_content = """
 <!DOCTYPE html>
 <html>
 <head>
@@ -322,15 +631,15 @@ html_content = """
         <h3>🧪 Polluants</h3>
 """
 
-for pollutant_key in pollutants.keys():
-    html_content += f"""
+    for pollutant_key in manifest['pollutants']:
+        html_content += f"""
         <div class="pollutant-checkbox">
             <input type="checkbox" id="{pollutant_key}" value="{pollutant_key}">
             <label for="{pollutant_key}">{pollutant_key}</label>
         </div>
 """
 
-html_content += """
+    html_content += """
     </div>
     
     <div id="map"></div>
@@ -374,9 +683,22 @@ html_content += """
     <script src="https://unpkg.com/leaflet@1.9.4/dist/leaflet.js"></script>
     <script src="https://unpkg.com/leaflet.heat@0.2.0/dist/leaflet-heat.js"></script>
     <script>
-        var years = """ + json.dumps(years) + """;
-        var dataByYear = """ + json.dumps(data_by_year) + """;
-        var pollutants = """ + json.dumps(list(pollutants.keys())) + """;
+        // Données en colonnes, chargées à la demande : communes (nom, lat, lon)
+        // une fois, puis un fichier binaire par année (population et concentrations)
+        var manifest = """ + json.dumps(manifest, separators=(',', ':')) + """;
+        var years = manifest.years;
+        var pollutants = manifest.pollutants;
+        var communes = null;
+        
+        // Années déjà chargées (promesses), de la moins récemment vue à la plus récente
+        var MAX_CACHED_YEARS = """ + str(CACHED_YEARS) + """;
+        var yearCache = new Map();
+        // Blocs de la grille déjà chargés (promesses), par année, zoom et position
+        var grid = manifest.grid;
+        var MAX_CACHED_BLOCKS = """ + str(CACHED_BLOCKS) + """;
+        var blockCache = new Map();
+        // Numéro de la dernière mise à jour demandée (les réponses plus anciennes sont ignorées)
+        var requestId = 0;
         
         var yearSlider = document.getElementById('year-slider');
         var yearDisplay = document.getElementById('year-display');
@@ -384,6 +706,178 @@ html_content += """
         var heatmapLayer = null;
         var markersLayer = null;
         
+        // Entiers little-endian ; la plus grande valeur de chaque type marque une valeur manquante
+        var ARRAY_TYPES = {uint16: Uint16Array, uint32: Uint32Array};
+        var MISSING = {uint16: 0xFFFF, uint32: 0xFFFFFFFF};
+        
+        function fetchData(name, binary) {
+            return fetch(manifest.dir + '/' + name).then(function(response) {
+                if (!response.ok) {
+                    throw new Error(name + ' : ' + response.status);
+                }
+                return binary ? response.arrayBuffer() : response.json();
+            });
+        }
+        
+        // Vue (sans copie) sur une colonne d'un fichier binaire
+        function column(buffer, offset, type) {
+            return new ARRAY_TYPES[type](buffer, offset, manifest.communes);
+        }
+        
+        // Les communes ne sont chargées qu'au premier affichage d'un zoom détaillé
+        var communesLoaded = null;
+        
+        function loadCommunes() {
+            if (!communesLoaded) {
+                communesLoaded = Promise.all([
+                    fetchData('communes.json', false),
+                    fetchData('communes.bin', true)
+                ]).then(function(results) {
+                    communes = {
+                        nom: results[0],
+                        lat: column(results[1], 0, 'uint32'),
+                        lon: column(results[1], 4 * manifest.communes, 'uint32')
+                    };
+                }).catch(function(error) {
+                    communesLoaded = null;
+                    throw error;
+                });
+            }
+            return communesLoaded;
+        }
+        
+        function latitude(i) {
+            return manifest.origin.lat + communes.lat[i] * manifest.coordinateStep;
+        }
+        
+        function longitude(i) {
+            return manifest.origin.lon + communes.lon[i] * manifest.coordinateStep;
+        }
+        
+        // Concentration d'une commune (null si manquante)
+        function valueAt(pollutant, codes, i) {
+            var encoding = manifest.encodings[pollutant];
+            var code = codes[i];
+            if (code === undefined || code === MISSING[encoding.type]) return null;
+            return encoding.min + code * encoding.step;
+        }
+        
+        function decodeYear(year, buffer) {
+            var layout = manifest.files[year];
+            var data = {population: column(buffer, layout.population, 'uint32'), values: {}};
+            if (!manifest.perPollutant) {
+                Object.keys(layout.values).forEach(function(pollutant) {
+                    data.values[pollutant] = column(buffer, layout.values[pollutant], manifest.encodings[pollutant].type);
+                });
+            }
+            return data;
+        }
+        
+        // Renvoie l'entrée key du cache (créée par load si absente) et la marque
+        // comme la plus récente ; les entrées les moins récemment vues au-delà
+        // de maxSize sont oubliées
+        function cached(cache, key, maxSize, load) {
+            var entry = cache.get(key);
+            if (entry) {
+                cache.delete(key);
+            } else {
+                entry = load();
+            }
+            cache.set(key, entry);
+            while (cache.size > maxSize) {
+                cache.delete(cache.keys().next().value);
+            }
+            return entry;
+        }
+        
+        function loadYear(year, selectedPollutants) {
+            var entry = cached(yearCache, year, MAX_CACHED_YEARS, function() {
+                return {
+                    data: fetchData(year + '.bin', true).then(function(buffer) {
+                        return decodeYear(year, buffer);
+                    }),
+                    values: {}
+                };
+            });
+            if (!manifest.perPollutant) {
+                return entry.data;
+            }
+            
+            // Un fichier par polluant : seuls les polluants cochés sont chargés
+            var requests = [entry.data];
+            selectedPollutants.forEach(function(pollutant) {
+                if (!(pollutant in manifest.files[year].values)) return;
+                if (!entry.values[pollutant]) {
+                    entry.values[pollutant] = fetchData(year + '_' + pollutant + '.bin', true).then(function(buffer) {
+                        return column(buffer, 0, manifest.encodings[pollutant].type);
+                    });
+                }
+                requests.push(entry.values[pollutant].then(function(row) {
+                    return [pollutant, row];
+                }));
+            });
+            return Promise.all(requests).then(function(results) {
+                var data = {population: results[0].population, values: {}};
+                results.slice(1).forEach(function(result) {
+                    data.values[result[0]] = result[1];
+                });
+                return data;
+            });
+        }
+        
+        // Grille d'un bloc : position des cellules dans le bloc, nombre de
+        // communes, population, puis moyenne pondérée et maximum de chaque polluant
+        function decodeBlock(buffer, bx, by, size) {
+            var offset = 0;
+            function next(type) {
+                offset = (offset + 3) & ~3;
+                var array = new type(buffer, offset, size);
+                offset += array.byteLength;
+                return array;
+            }
+            var block = {bx: bx, by: by, size: size, local: next(Uint16Array),
+                         count: next(Uint32Array), population: next(Uint32Array), mean: {}, max: {}};
+            grid.pollutants.forEach(function(pollutant) {
+                block.mean[pollutant] = next(Float32Array);
+                block.max[pollutant] = next(Float32Array);
+            });
+            return block;
+        }
+        
+        // Zoom de la grille affichée au zoom de la carte
+        function gridZoom(zoom) {
+            return Math.max(grid.zooms[0], Math.min(grid.zooms[grid.zooms.length - 1], zoom));
+        }
+        
+        // Charge les blocs de la grille qui couvrent la zone visible
+        function loadCells(year, level) {
+            var bounds = map.getPixelBounds();
+            var scale = Math.pow(2, level - map.getZoom()) / (grid.cellSize * grid.blockCells);
+            var available = grid.blocks[level];
+            var requests = [];
+            for (var bx = Math.floor(bounds.min.x * scale); bx <= Math.floor(bounds.max.x * scale); bx++) {
+                for (var by = Math.floor(bounds.min.y * scale); by <= Math.floor(bounds.max.y * scale); by++) {
+                    var name = bx + '_' + by;
+                    if (!(name in available)) continue;
+                    requests.push(loadBlock(year, level, bx, by, available[name]));
+                }
+            }
+            return Promise.all(requests);
+        }
+        
+        function loadBlock(year, level, bx, by, size) {
+            var key = year + '/' + level + '_' + bx + '_' + by;
+            return cached(blockCache, key, MAX_CACHED_BLOCKS, function() {
+                return fetchData('grid/' + key + '.bin', true).then(function(buffer) {
+                    return decodeBlock(buffer, bx, by, size);
+                }).catch(function(error) {
+                    // Réessayer au prochain affichage de ce bloc
+                    blockCache.delete(key);
+                    throw error;
+                });
+            });
+        }
+        
         // Initialiser la carte
         map = L.map('map').setView([46.5, 2.5], 6);
         L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', {
@@ -391,7 +885,98 @@ html_content += """
             maxZoom: 19
         }).addTo(map);
         
-        markersLayer = L.layerGroup().addTo(map);
+        // Marqueurs dessinés sur un seul canvas. Aux zooms éloignés, un
+        // marqueur par cellule de la grille (zone visible seulement) ; à
+        // partir de grid.detailZoom, un marqueur par commune de la zone
+        // visible, créé une fois : un changement d'année, de polluants ou de
+        // zone ne fait que les afficher, les masquer ou changer leur couleur
+        var renderer = L.canvas({padding: 0.5});
+        markersLayer = L.featureGroup();
+        var cellsLayer = L.featureGroup();
+        var markers = null;
+        var markerShown = null;
+        var markerColor = null;
+        
+        // Données affichées (pour construire le popup au clic)
+        var current = null;
+        var popup = L.popup();
+        // Commune ({index}) ou cellule ({key, block, j}) du popup ouvert
+        var popupTarget = null;
+        
+        function createMarkers() {
+            markers = new Array(manifest.communes);
+            markerShown = new Uint8Array(manifest.communes);
+            markerColor = '#3388ff';
+            for (var i = 0; i < manifest.communes; i++) {
+                markers[i] = L.circleMarker([latitude(i), longitude(i)], {
+                    renderer: renderer,
+                    radius: 5,
+                    fillColor: markerColor,
+                    color: '#fff',
+                    weight: 1.5,
+                    opacity: 0.8,
+                    fillOpacity: 0.6
+                });
+                markers[i].communeIndex = i;
+            }
+        }
+        
+        function pollutantLines(valueOf) {
+            if (current.selectedPollutants.length === 0) return '';
+            var content = '<div style="margin-top: 10px; padding-top: 10px; border-top: 1px solid #ddd;">';
+            current.selectedPollutants.forEach(function(pollutant) {
+                content += valueOf(pollutant);
+            });
+            return content + '</div>';
+        }
+        
+        function popupContent(i) {
+            var population = current.yearData.population;
+            var content = '<div style="min-width: 220px;">';
+            content += '<div class="popup-title">' + communes.nom[i] + '</div>';
+            content += '<div class="popup-info"><strong>👥 Population:</strong> ' + population[i].toLocaleString('fr-FR') + '</div>';
+            content += pollutantLines(function(pollutant) {
+                var value = valueAt(pollutant, current.yearData.values[pollutant] || [], i);
+                if (value === null) return '';
+                return '<div class="popup-pollutant"><strong>' + pollutant + ':</strong> ' + value.toFixed(2) + ' µg/m³</div>';
+            });
+            return content + '</div>';
+        }
+        
+        function cellPopupContent(block, j) {
+            var content = '<div style="min-width: 220px;">';
+            content += '<div class="popup-title">' + block.count[j].toLocaleString('fr-FR') + ' communes</div>';
+            content += '<div class="popup-info"><strong>👥 Population:</strong> ' + block.population[j].toLocaleString('fr-FR') + '</div>';
+            content += pollutantLines(function(pollutant) {
+                if (!block.mean[pollutant] || isNaN(block.mean[pollutant][j])) return '';
+                return '<div class="popup-pollutant"><strong>' + pollutant + ':</strong> ' + block.mean[pollutant][j].toFixed(2) +
+                       ' µg/m³ (moyenne pondérée), max ' + block.max[pollutant][j].toFixed(2) + '</div>';
+            });
+            return content + '</div>';
+        }
+        
+        // Le popup n'est construit qu'à l'ouverture
+        markersLayer.on('click', function(event) {
+            popupTarget = {index: event.layer.communeIndex};
+            popup.setLatLng(event.layer.getLatLng()).setContent(popupContent(popupTarget.index)).openOn(map);
+        });
+        
+        cellsLayer.on('click', function(event) {
+            popupTarget = event.layer.cell;
+            popup.setLatLng(event.layer.getLatLng()).setContent(cellPopupContent(popupTarget.block, popupTarget.j)).openOn(map);
+        });
+        
+        // Les mouvements du curseur et de la carte sont regroupés : une mise à jour par image
+        var updateScheduled = false;
+        
+        function scheduleUpdate() {
+            if (updateScheduled) return;
+            updateScheduled = true;
+            requestAnimationFrame(function() {
+                updateScheduled = false;
+                updateMap();
+            });
+        }
         
         // Initialiser la carte avec les données
         updateMap();
@@ -412,117 +997,269 @@ html_content += """
                 }
             });
             
-            // Nettoyer les anciens marqueurs
-            if (markersLayer) {
-                markersLayer.clearLayers();
+            var id = ++requestId;
+            var zoom = map.getZoom();
+            var loading;
+            if (zoom < grid.detailZoom) {
+                var level = gridZoom(zoom);
+                loading = loadCells(year, level).then(function(blocks) {
+                    if (id !== requestId) return;
+                    drawCells(blocks, level, selectedPollutants);
+                });
+            } else {
+                loading = Promise.all([loadCommunes(), loadYear(year, selectedPollutants)]).then(function(results) {
+                    if (id !== requestId) return;
+                    drawCommunes(results[1], selectedPollutants);
+                });
             }
-            
-            // Supprimer l'ancienne heatmap
-            if (heatmapLayer) {
-                map.removeLayer(heatmapLayer);
-                heatmapLayer = null;
+            loading.catch(function(error) {
+                // Réessayer au prochain affichage de cette année
+                yearCache.delete(year);
+                console.error(error);
+                if (id === requestId) {
+                    yearDisplay.textContent = year + ' (données indisponibles)';
+                }
+            });
+        }
+        
+        // Affiche un seul des deux calques de marqueurs
+        function showLayer(layer, hidden) {
+            if (map.hasLayer(hidden)) {
+                map.removeLayer(hidden);
+            }
+            if (!map.hasLayer(layer)) {
+                layer.addTo(map);
             }
+        }
+        
+        function drawCells(blocks, level, selectedPollutants) {
+            showLayer(cellsLayer, markersLayer);
+            current = {selectedPollutants: selectedPollutants};
+            var color = selectedPollutants.length > 0 ? '#ff7800' : '#3388ff';
+            // Taille d'une cellule à l'écran, et cellules de la zone visible (au zoom de la grille)
+            var scale = Math.pow(2, level - map.getZoom());
+            var cellPixels = grid.cellSize / scale;
+            var bounds = map.getPixelBounds();
+            var minX = Math.floor(bounds.min.x * scale / grid.cellSize) - 1;
+            var maxX = Math.floor(bounds.max.x * scale / grid.cellSize) + 1;
+            var minY = Math.floor(bounds.min.y * scale / grid.cellSize) - 1;
+            var maxY = Math.floor(bounds.max.y * scale / grid.cellSize) + 1;
             
-            // Préparer les données pour la heatmap et les marqueurs
+            // Les cellules visibles sont peu nombreuses : elles sont recréées
+            cellsLayer.clearLayers();
             var heatData = [];
-            var yearData = dataByYear[year];
-            
-            if (yearData) {
-                Object.keys(yearData).forEach(function(communeKey) {
-                    var commune = yearData[communeKey];
-                    var lat = commune.latitude;
-                    var lon = commune.longitude;
+            var popupCell = null;
+            blocks.forEach(function(block) {
+                for (var j = 0; j < block.size; j++) {
+                    if (block.count[j] === 0) continue;
+                    var cx = block.bx * grid.blockCells + Math.floor(block.local[j] / grid.blockCells);
+                    var cy = block.by * grid.blockCells + block.local[j] % grid.blockCells;
+                    if (cx < minX || cx > maxX || cy < minY || cy > maxY) continue;
+                    var center = map.unproject([(cx + 0.5) * grid.cellSize, (cy + 0.5) * grid.cellSize], level);
+                    var cell = {key: level + '_' + cx + '_' + cy, block: block, j: j};
+                    var marker = L.circleMarker(center, {
+                        renderer: renderer,
+                        radius: Math.min(cellPixels / 2 - 1, 4 + 2 * Math.log2(block.count[j])),
+                        fillColor: color,
+                        color: '#fff',
+                        weight: 1.5,
+                        opacity: 0.8,
+                        fillOpacity: 0.6
+                    });
+                    marker.cell = cell;
+                    cellsLayer.addLayer(marker);
+                    if (popupTarget && popupTarget.key === cell.key) {
+                        popupCell = cell;
+                    }
                     
-                    // Calculer la valeur moyenne des polluants sélectionnés pour la heatmap
+                    // Moyenne pondérée des polluants sélectionnés pour la heatmap
                     var totalValue = 0;
                     var count = 0;
-                    
                     selectedPollutants.forEach(function(pollutant) {
-                        if (commune[pollutant] !== undefined && commune[pollutant] !== null) {
-                            totalValue += commune[pollutant];
+                        var value = block.mean[pollutant] ? block.mean[pollutant][j] : NaN;
+                        if (!isNaN(value)) {
+                            totalValue += value;
                             count++;
                         }
                     });
-                    
-                    var avgValue = count > 0 ? totalValue / count : 0;
-                    
-                    // Ajouter à la heatmap si des polluants sont sélectionnés
-                    if (selectedPollutants.length > 0 && avgValue > 0) {
-                        heatData.push([lat, lon, avgValue / 100]); // Normaliser pour la heatmap
+                    if (count > 0 && totalValue > 0) {
+                        heatData.push([center.lat, center.lng, totalValue / count / 100]); // Normaliser pour la heatmap
                     }
-                    
-                    // Créer le popup
-                    var popupContent = '<div style="min-width: 220px;">';
-                    popupContent += '<div class="popup-title">' + commune.nom + '</div>';
-                    popupContent += '<div class="popup-info"><strong>👥 Population:</strong> ' + commune.population.toLocaleString('fr-FR') + '</div>';
-                    
-                    if (selectedPollutants.length > 0) {
-                        popupContent += '<div style="margin-top: 10px; padding-top: 10px; border-top: 1px solid #ddd;">';
-                        selectedPollutants.forEach(function(pollutant) {
-                            if (commune[pollutant] !== undefined && commune[pollutant] !== null) {
-                                popupContent += '<div class="popup-pollutant"><strong>' + pollutant + ':</strong> ' + commune[pollutant].toFixed(2) + ' µg/m³</div>';
-                            }
-                        });
-                        popupContent += '</div>';
+                }
+            });
+            
+            // Popup ouvert : il montre les valeurs de la nouvelle année (ou se ferme)
+            if (map.hasLayer(popup)) {
+                if (popupCell) {
+                    popupTarget = popupCell;
+                    popup.setContent(cellPopupContent(popupCell.block, popupCell.j));
+                } else {
+                    map.closePopup(popup);
+                }
+            }
+            updateHeatmap(heatData);
+        }
+        
+        function drawCommunes(yearData, selectedPollutants) {
+            if (!markers) {
+                createMarkers();
+            }
+            showLayer(markersLayer, cellsLayer);
+            current = {yearData: yearData, selectedPollutants: selectedPollutants};
+            
+            // Couleur des marqueurs : ne change que si des polluants sont cochés ou décochés
+            var color = selectedPollutants.length > 0 ? '#ff7800' : '#3388ff';
+            var restyle = color !== markerColor;
+            markerColor = color;
+            
+            // Préparer les données pour la heatmap
+            var heatData = [];
+            var population = yearData.population;
+            var values = {};
+            selectedPollutants.forEach(function(pollutant) {
+                values[pollutant] = yearData.values[pollutant] || [];
+            });
+            var bounds = map.getBounds().pad(0.2);
+            
+            for (var i = 0; i < population.length; i++) {
+                // Commune sans mesure cette année ou hors de la zone visible : son marqueur est masqué
+                var lat = latitude(i);
+                var lon = longitude(i);
+                var shown = population[i] !== MISSING.uint32 && bounds.contains([lat, lon]);
+                if (shown !== (markerShown[i] === 1)) {
+                    if (shown) {
+                        markersLayer.addLayer(markers[i]);
+                    } else {
+                        markersLayer.removeLayer(markers[i]);
+                    }
+                    markerShown[i] = shown ? 1 : 0;
+                }
+                if (restyle) {
+                    markers[i].setStyle({fillColor: color});
+                }
+                if (!shown || selectedPollutants.length === 0) continue;
+                
+                // Calculer la valeur moyenne des polluants sélectionnés pour la heatmap
+                var totalValue = 0;
+                var count = 0;
+                
+                selectedPollutants.forEach(function(pollutant) {
+                    var value = valueAt(pollutant, values[pollutant], i);
+                    if (value !== null) {
+                        totalValue += value;
+                        count++;
                     }
-                    
-                    popupContent += '</div>';
-                    
-                    // Ajouter un marqueur
-                    var markerColor = selectedPollutants.length > 0 ? '#ff7800' : '#3388ff';
-                    var marker = L.circleMarker([lat, lon], {
-                        radius: 5,
-                        fillColor: markerColor,
-                        color: '#fff',
-                        weight: 1.5,
-                        opacity: 0.8,
-                        fillOpacity: 0.6
-                    }).bindPopup(popupContent);
-                    
-                    markersLayer.addLayer(marker);
                 });
+                
+                var avgValue = count > 0 ? totalValue / count : 0;
+                
+                // Ajouter à la heatmap si des polluants sont sélectionnés
+                if (avgValue > 0) {
+                    heatData.push([lat, lon, avgValue / 100]); // Normaliser pour la heatmap
+                }
             }
             
-            // Ajouter la nouvelle heatmap si des polluants sont sélectionnés
+            // Popup ouvert : il montre les valeurs de la nouvelle année (ou se ferme)
+            if (map.hasLayer(popup)) {
+                if (popupTarget && popupTarget.index !== undefined && markerShown[popupTarget.index]) {
+                    popup.setContent(popupContent(popupTarget.index));
+                } else {
+                    map.closePopup(popup);
+                }
+            }
+            updateHeatmap(heatData);
+        }
+        
+        // Mettre à jour la heatmap (créée une fois, ses points sont remplacés)
+        function updateHeatmap(heatData) {
             if (heatData.length > 0) {
-                heatmapLayer = L.heatLayer(heatData, {
-                    radius: 25,
-                    blur: 35,
-                    maxZoom: 13,
-                    max: 1.0,
-                    gradient: {
-                        0.0: 'blue',
-                        0.3: 'cyan',
-                        0.5: 'lime',
-                        0.7: 'yellow',
-                        0.9: 'orange',
-                        1.0: 'red'
-                    }
-                }).addTo(map);
+                if (!heatmapLayer) {
+                    heatmapLayer = L.heatLayer(heatData, {
+                        radius: 25,
+                        blur: 35,
+                        maxZoom: 13,
+                        max: 1.0,
+                        gradient: {
+                            0.0: 'blue',
+                            0.3: 'cyan',
+                            0.5: 'lime',
+                            0.7: 'yellow',
+                            0.9: 'orange',
+                            1.0: 'red'
+                        }
+                    });
+                } else {
+                    heatmapLayer.setLatLngs(heatData);
+                }
+                if (!map.hasLayer(heatmapLayer)) {
+                    heatmapLayer.addTo(map);
+                }
+            } else if (heatmapLayer && map.hasLayer(heatmapLayer)) {
+                map.removeLayer(heatmapLayer);
             }
         }
         
         // Event listeners
-        yearSlider.addEventListener('input', updateMap);
+        yearSlider.addEventListener('input', scheduleUpdate);
+        map.on('moveend', scheduleUpdate);
         
         pollutants.forEach(function(pollutant) {
             var checkbox = document.getElementById(pollutant);
             if (checkbox) {
-                checkbox.addEventListener('change', updateMap);
+                checkbox.addEventListener('change', scheduleUpdate);
             }
         });
     </script>
 </body>
 </html>
 """
+    return html_content
+
+
+def create_map(output_dir=output_dir, per_pollutant=False):
+    """
+    Crée la carte interactive de la pollution (assets/interactive_pollution_map.html)
+    et ses données (assets/map_data/).
+
+    Args:
+        output_dir (str): Dossier de la carte
+        per_pollutant (bool): Un fichier de données par année et par polluant
+    """
+    df_map = load_map_data()
+    columns = build_map_columns(df_map)
+    print(f"📅 Années disponibles : {columns['years']}")
+
+    # --- Save the map ---
+    os.makedirs(output_dir, exist_ok=True)
+    manifest, errors = write_map_data(columns, output_dir, per_pollutant=per_pollutant)
+    output_path = os.path.join(output_dir, 'interactive_pollution_map.html')
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(map_html(manifest))
 
-# --- Save the map ---
-output_path = os.path.join(output_dir, 'interactive_pollution_map.html')
+    data_dir = os.path.join(output_dir, MAP_DATA_DIR)
+    binary_size = sum(os.path.getsize(os.path.join(data_dir, name)) for name in os.listdir(data_dir)
+                      if os.path.isfile(os.path.join(data_dir, name)))
+    grid_dir = os.path.join(data_dir, 'grid')
+    grid_size = sum(os.path.getsize(os.path.join(folder, name))
+                    for folder, _, names in os.walk(grid_dir) for name in names)
+    text_size = json_size(columns)
+    print(f"✅ Carte interactive créée : {output_path}")
+    print(f"📁 Données de la carte : {data_dir}")
+    print(f"📦 {binary_size / 1e6:.1f} Mo en binaire, contre {text_size / 1e6:.1f} Mo en JSON "
+          f"({100 * (1 - binary_size / text_size):.0f} % de moins)")
+    print(f"🔲 Grilles des zooms {GRID_ZOOMS.start} à {GRID_ZOOMS.stop - 1} : {grid_size / 1e6:.1f} Mo")
+    print("🎯 Erreur maximale de quantification : "
+          + ", ".join(f"{name} {error:.2g}" for name, error in errors.items()))
+    print(f"📊 {len(columns['years'])} années disponibles")
+    print(f"🗺️ {len(df_map)} communes avec coordonnées")
+    print(f"🧪 {len(columns['pollutants'])} polluants disponibles")
+    return output_path
 
-with open(output_path, 'w', encoding='utf-8') as f:
-    f.write(html_content)
 
-print(f"✅ Carte interactive créée : {output_path}")
-print(f"📊 {len(years)} années disponibles")
-print(f"🗺️ {len(df_map)} communes avec coordonnées")
-print(f"🧪 {len(pollutants)} polluants disponibles")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Carte interactive de la pollution")
+    parser.add_argument("--output-dir", default=output_dir, help="dossier de la carte (défaut : assets)")
+    parser.add_argument("--per-pollutant", action="store_true",
+                        help="un fichier de données par année et par polluant")
+    args = parser.parse_args()
+    create_map(args.output_dir, per_pollutant=args.per_pollutant)
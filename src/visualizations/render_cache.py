@@ -0,0 +1,133 @@
+import os
+import json
+import hashlib
+import inspect
+import pandas as pd
+import plotly
+
+# Manifeste du cache, dans le dossier des graphiques : fichier -> clé
+CACHE_FILE = ".render_cache.json"
+
+
+def function_version(*funcs):
+    """
+    Empreinte d'une ou plusieurs fonctions de visualisation : leur code source
+    et la version de plotly. Modifier une fonction invalide les graphiques
+    qu'elle a produits.
+    """
+    source = "\n".join(inspect.getsource(func) for func in funcs)
+    return hashlib.sha256(f"{plotly.__version__}\n{source}".encode("utf-8")).hexdigest()[:16]
+
+
+def data_hash(df, columns=None):
+    """
+    Empreinte des valeurs d'un DataFrame (ou de certaines de ses colonnes).
+    """
+    if columns is not None:
+        df = df[[col for col in columns if col in df.columns]]
+    digest = hashlib.md5(",".join(map(str, df.columns)).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df.reset_index(drop=True), index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def mapping_hash(mapping):
+    """
+    Empreinte d'un dictionnaire de correspondances (codes INSEE -> noms).
+    """
+    digest = hashlib.md5()
+    for code, name in sorted(mapping.items(), key=lambda item: str(item[0])):
+        digest.update(f"{code}\t{name}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class RenderCache:
+    """
+    Cache des graphiques HTML d'un dossier, adressé par le contenu : chaque
+    fichier est enregistré avec la clé des entrées qui l'ont produit (données,
+    polluant, type de graphique, version de la fonction de visualisation).
+    Un graphique n'est regénéré que si sa clé a changé.
+
+    Args:
+        output_dir (str): Dossier des graphiques (le manifeste y est enregistré)
+    """
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, CACHE_FILE)
+        self.entries = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                # Manifeste illisible : tous les graphiques seront regénérés
+                self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(*parts):
+        """
+        Calcule la clé d'un graphique à partir de ses entrées.
+        """
+        return hashlib.sha256("\x1f".join(map(str, parts)).encode("utf-8")).hexdigest()
+
+    def is_fresh(self, name, key):
+        """
+        Indique si le fichier name existe et a été produit avec la clé key
+        (compté comme succès ou échec du cache).
+        """
+        fresh = self.entries.get(name) == key and os.path.exists(os.path.join(self.output_dir, name))
+        if fresh:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return fresh
+
+    def store(self, name, key):
+        """
+        Enregistre la clé d'un fichier qui vient d'être écrit.
+        """
+        self.entries[name] = key
+
+    def discard(self, name):
+        """
+        Supprime un fichier et son entrée du cache.
+        """
+        self.entries.pop(name, None)
+        file_path = os.path.join(self.output_dir, name)
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+    def evict(self, valid_names, owns=None):
+        """
+        Supprime les fichiers du cache dont la clé a disparu (année, polluant
+        ou type de graphique qui n'existe plus).
+
+        Args:
+            valid_names (iterable): Noms de tous les fichiers qui peuvent encore être produits
+            owns (callable): Limite la suppression aux fichiers dont le nom vérifie
+                owns(name) (les fichiers d'un autre générateur du même dossier sont gardés)
+        """
+        valid_names = set(valid_names)
+        for name in [name for name in self.entries
+                     if name not in valid_names and (owns is None or owns(name))]:
+            self.discard(name)
+            self.evictions += 1
+
+    def save(self):
+        """
+        Enregistre le manifeste du cache.
+        """
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def report(self):
+        """
+        Affiche les compteurs du cache pour ce lancement.
+        """
+        print(f"Cache de rendu : {self.hits} graphiques réutilisés, {self.misses} regénérés, "
+              f"{self.evictions} supprimés")
@@ -1,51 +1,118 @@
+import numpy as np
 import plotly.graph_objects as go
 from plotly.io import write_html
 
-def create_pollution_scatter(data, insee_to_commune, pollutant_type):
+
+def downsample_scatter(x, y, max_points, grid_size=16, outlier_share=0.02, log_x=True, seed=0):
+    """
+    Choisit au plus max_points points d'un nuage en conservant sa forme :
+    les valeurs extrêmes de y (et les deux extrémités de x) sont toujours
+    gardées, le reste est tiré dans une grille grid_size x grid_size
+    proportionnellement au nombre de points de chaque case, avec au moins
+    un point par case non vide (les zones peu denses restent visibles).
+
+    Args:
+        x (array-like): Abscisses (population)
+        y (array-like): Ordonnées (concentration)
+        max_points (int): Nombre maximal de points gardés
+        grid_size (int): Nombre de classes de la grille sur chaque axe
+        outlier_share (float): Part maximale de max_points réservée aux valeurs extrêmes
+        log_x (bool): Grille en échelle logarithmique sur x
+        seed (int): Graine du tirage (le même nuage donne toujours les mêmes points)
+
+    Returns:
+        numpy.ndarray: Indices triés des points gardés
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n <= max_points:
+        return np.arange(n)
+    rng = np.random.default_rng(seed)
+
+    # Valeurs extrêmes : hors de [0.5 %, 99.5 %], les plus éloignées de la médiane d'abord
+    valid = ~np.isnan(y)
+    low, median, high = np.nanquantile(y, [0.005, 0.5, 0.995])
+    outliers = np.flatnonzero(valid & ((y < low) | (y > high)))
+    outliers = outliers[np.argsort(-np.abs(y[outliers] - median), kind='stable')]
+    outliers = outliers[:int(max_points * outlier_share)]
+    ends = [np.nanargmin(x), np.nanargmax(x)] if not np.isnan(x).all() else []
+    kept = np.unique(np.concatenate([outliers, np.asarray(ends, dtype=int)]))
+
+    rest = np.setdiff1d(np.arange(n), kept)
+    budget = max_points - len(kept)
+    if budget <= 0 or len(rest) == 0:
+        return kept[:max_points]
+
+    # Case de la grille de chaque point restant
+    gx = np.log10(np.clip(x[rest], 1, None)) if log_x else x[rest]
+    cells = np.zeros(len(rest), dtype=np.int64)
+    for values in (gx, y[rest]):
+        finite = np.nan_to_num(values, nan=np.nanmin(values) if not np.isnan(values).all() else 0)
+        edges = np.linspace(finite.min(), finite.max(), grid_size + 1)[1:-1]
+        cells = cells * grid_size + np.searchsorted(edges, finite, side='right')
+    cell_ids, cell_of, counts = np.unique(cells, return_inverse=True, return_counts=True)
+
+    # Quota de chaque case : 1 point, plus une part proportionnelle du reste du budget
+    if len(cell_ids) >= budget:
+        quotas = np.zeros(len(cell_ids), dtype=np.int64)
+        quotas[rng.choice(len(cell_ids), budget, replace=False)] = 1
+    else:
+        ratio = (budget - len(cell_ids)) / (len(rest) - len(cell_ids))
+        quotas = np.minimum(counts, 1 + np.floor((counts - 1) * ratio).astype(np.int64))
+
+    # Rang aléatoire de chaque point dans sa case : on garde les quota premiers
+    order = np.lexsort((rng.random(len(rest)), cell_of))
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    rank = np.empty(len(rest), dtype=np.int64)
+    rank[order] = np.arange(len(rest)) - starts[cell_of[order]]
+    sampled = rest[rank < quotas[cell_of]]
+
+    return np.sort(np.concatenate([kept, sampled]))
+
+
+def create_pollution_scatter(data, insee_to_commune, pollutant_type, large=False, max_points=None, log_x=True):
     """
     Crée un graphique de dispersion pour NO2, PM10 ou O3.
+
+    En mode large (large=True), les points sont dessinés en WebGL (Scattergl)
+    sur un axe numérique de population au lieu d'un axe d'une catégorie par
+    commune ; le nom de la commune reste dans l'infobulle. Avec max_points,
+    le nuage est sous-échantillonné (voir downsample_scatter) : la taille du
+    fichier ne dépend plus du nombre de communes.
     
     Args:
         data (pd.DataFrame): Le DataFrame contenant les données
         insee_to_commune (dict): Dictionnaire de correspondance codes INSEE vers noms de communes
         pollutant_type (str): Type de polluant ("NO2", "PM10" ou "O3")
+        large (bool): Mode WebGL sur un axe numérique de population
+        max_points (int): Nombre maximal de points en mode large (par défaut : tous)
+        log_x (bool): Axe de population logarithmique en mode large
     
     Returns:
         plotly.graph_objects.Figure: La figure créée
     """
-    # Filter municipalities with more than 1,500 inhabitants and sort by population
-    data_filtered = data[data['Population'] > 1500]
-    data_sorted = data_filtered.sort_values('Population', ascending=True)
-    
-    # Prepare data
-    communes = [insee_to_commune[code] for code in data_sorted['COM Insee']]
-    if pollutant_type == 'Somo 35':
-        column_name = 'Moyenne annuelle de somo 35 (ug/m3.jour)'
-    elif pollutant_type == 'AOT 40':
-        column_name = "Moyenne annuelle d'AOT 40 (ug/m3.heure)"
-    elif pollutant_type == 'PM25':
-        column_name = 'Moyenne annuelle de concentration de PM25 (ug/m3)'
-    else:
-        column_name = f'Moyenne annuelle de concentration de {pollutant_type} (ug/m3)'
-    concentrations = data_sorted[column_name]
-    populations = data_sorted['Population']
+    trace_fields, layout_fields = scatter_fields(data, insee_to_commune, pollutant_type, large,
+                                                 max_points, log_x)
+    if large:
+        return create_large_scatter(trace_fields, layout_fields, pollutant_type, log_x)
     
     # Create the plot
     trace = go.Scatter(
-        x=communes,
-        y=concentrations,
+        x=trace_fields['x'],
+        y=trace_fields['y'],
         mode='markers',
         name=f'Mesures {pollutant_type}',
         marker=dict(
             size=2,
-            color=concentrations,
+            color=trace_fields['marker.color'],
             colorscale=[[0, 'rgb(0,0,255)'], [1, 'rgb(255,0,0)']],  # Bleu à Rouge
             showscale=True
         ),
         hovertemplate="<b>%{x}</b><br>" +
                      f"{pollutant_type}: %{{y:.1f}} µg/m³<br>" +
                      "Population: %{customdata:,.0f} hab.<extra></extra>",
-        customdata=populations
+        customdata=trace_fields['customdata']
     )
 
     layout = go.Layout(
@@ -61,14 +128,7 @@ def create_pollution_scatter(data, insee_to_commune, pollutant_type):
             gridwidth=1,
             gridcolor='LightGray'
         ),
-        yaxis=dict(
-            title='Concentration de SOMO 35 (µg/m³)' if pollutant_type == 'SOMO 35'
-            else 'Concentration de AOT 40 (µg/m³)' if pollutant_type == 'AOT 40'
-            else f'Concentration de {pollutant_type} (µg/m³)', 
-            showgrid=True,
-            gridwidth=1,
-            gridcolor='LightGray'
-        ),
+        yaxis=scatter_yaxis(pollutant_type),
         annotations=[dict(
             x=0.5,
             y=-0.3,
@@ -83,4 +143,109 @@ def create_pollution_scatter(data, insee_to_commune, pollutant_type):
     )
 
     fig = go.Figure(data=[trace], layout=layout)
-    return fig
\ No newline at end of file
+    return fig
+
+
+def scatter_fields(data, insee_to_commune, pollutant_type, large=False, max_points=None, log_x=True):
+    """
+    Données d'un nuage de points, seule partie de la figure qui change d'une
+    année à l'autre (mêmes arguments que create_pollution_scatter).
+
+    Returns:
+        tuple: (champs de la trace, champs de la mise en page), les clés étant
+        les chemins des propriétés plotly ('marker.color', 'xaxis.title.text')
+    """
+    # Filter municipalities with more than 1,500 inhabitants and sort by population
+    data_filtered = data[data['Population'] > 1500]
+    data_sorted = data_filtered.sort_values('Population', ascending=True)
+    column_name = scatter_column(pollutant_type)
+
+    if not large:
+        communes = [insee_to_commune[code] for code in data_sorted['COM Insee']]
+        concentrations = data_sorted[column_name]
+        return {'x': communes, 'y': concentrations, 'marker.color': concentrations,
+                'customdata': data_sorted['Population']}, {}
+
+    concentrations = data_sorted[column_name].to_numpy(dtype=float)
+    populations = data_sorted['Population'].to_numpy(dtype=float)
+    codes = data_sorted['COM Insee'].to_numpy()
+    total = len(codes)
+
+    if max_points is not None and total > max_points:
+        kept = downsample_scatter(populations, concentrations, max_points, log_x=log_x)
+        concentrations, populations, codes = concentrations[kept], populations[kept], codes[kept]
+    communes = [insee_to_commune[code] for code in codes]
+
+    subtitle = f" ({len(codes)} communes sur {total})" if len(codes) < total else ""
+    return ({'x': populations, 'y': concentrations, 'marker.color': concentrations, 'customdata': communes},
+            {'xaxis.title.text': f'Population des communes > 1500 Hab.{subtitle}'})
+
+
+def create_large_scatter(trace_fields, layout_fields, pollutant_type, log_x=True):
+    """
+    Nuage de points WebGL de create_pollution_scatter (mode large) :
+    concentration en fonction de la population, nom de la commune en infobulle.
+    """
+    trace = go.Scattergl(
+        x=trace_fields['x'],
+        y=trace_fields['y'],
+        mode='markers',
+        name=f'Mesures {pollutant_type}',
+        marker=dict(
+            size=3,
+            color=trace_fields['marker.color'],
+            colorscale=[[0, 'rgb(0,0,255)'], [1, 'rgb(255,0,0)']],  # Bleu à Rouge
+            showscale=True
+        ),
+        hovertemplate="<b>%{customdata}</b><br>" +
+                     f"{pollutant_type}: %{{y:.1f}} µg/m³<br>" +
+                     "Population: %{x:,.0f} hab.<extra></extra>",
+        customdata=trace_fields['customdata']
+    )
+
+    layout = go.Layout(
+        title=dict(
+            text=f'Concentration moyenne annuelle de {pollutant_type} par population de commune',
+            font=dict(size=24)
+        ),
+        xaxis=dict(
+            title=layout_fields['xaxis.title.text'],
+            type='log' if log_x else 'linear',
+            showgrid=True,
+            gridwidth=1,
+            gridcolor='LightGray'
+        ),
+        yaxis=scatter_yaxis(pollutant_type)
+    )
+
+    fig = go.Figure(data=[trace], layout=layout)
+    return fig
+
+
+def scatter_column(pollutant_type):
+    """
+    Nom de la colonne des concentrations d'un polluant.
+    """
+    if pollutant_type == 'Somo 35':
+        column_name = 'Moyenne annuelle de somo 35 (ug/m3.jour)'
+    elif pollutant_type == 'AOT 40':
+        column_name = "Moyenne annuelle d'AOT 40 (ug/m3.heure)"
+    elif pollutant_type == 'PM25':
+        column_name = 'Moyenne annuelle de concentration de PM25 (ug/m3)'
+    else:
+        column_name = f'Moyenne annuelle de concentration de {pollutant_type} (ug/m3)'
+    return column_name
+
+
+def scatter_yaxis(pollutant_type):
+    """
+    Axe des concentrations des nuages de points.
+    """
+    return dict(
+        title='Concentration de SOMO 35 (µg/m³)' if pollutant_type == 'SOMO 35'
+        else 'Concentration de AOT 40 (µg/m³)' if pollutant_type == 'AOT 40'
+        else f'Concentration de {pollutant_type} (µg/m³)', 
+        showgrid=True,
+        gridwidth=1,
+        gridcolor='LightGray'
+    )
@@ -1,13 +1,30 @@
 import os
+import argparse
 
-def create_histograms_viewer():
+# Dossier de sortie par défaut de visualize_from_db.py (depuis la racine du projet)
+HTML_SOURCE_DIR = os.path.join("src", "database", "output")
+
+def create_histograms_viewer(html_source_dir=HTML_SOURCE_DIR):
     """
     Create an HTML viewer for superposed histograms of air pollutants.
+
+    The year view loads the animated figure of a pollutant when it exists in
+    html_source_dir at creation time, and its per-year files otherwise: run it
+    again after switching visualize_from_db.py to or from --animated.
+
+    Args:
+        html_source_dir (str): Directory containing the histogram HTML files
+            (the --output-dir of visualize_from_db.py)
     """
     output_dir = "output/FINAL_superposed_graphs_map"
-    html_source_dir = "../output_csv"  # directory containing the histogram HTML files
+    # Chemin des graphiques vu depuis la visionneuse
+    base_path = os.path.relpath(html_source_dir, output_dir).replace("\\", "/")
 
-    pollutants = ["NO2", "PM10", "O3", "somo 35", "PM25", "AOT 40"]
+    # Noms des fichiers écrits par visualize_from_db.py
+    pollutants = ["NO2", "PM10", "O3", "SOMO35", "PM25", "AOT40"]
+    # Polluants dont le graphique animé (--animated) a été écrit
+    animated = [p for p in pollutants
+                if os.path.exists(os.path.join(html_source_dir, f"{p}_histogram_animation.html"))]
     years = list(range(2000, 2016))
     years.remove(2006)
     
@@ -126,29 +143,77 @@ def create_histograms_viewer():
         const years = ["""
     html_content += ', '.join([str(year) for year in years])
     html_content += """];
+        const animated = ["""
+    html_content += ', '.join([f'"{p}"' for p in animated])
+    html_content += """];
+        const basePath = '"""
+    html_content += base_path  # <-- chemin vers les HTML générés
+    html_content += """';
         
         let currentView = 'single';
+        let loadedSrc = '';
+        let frameYear = null;  // année à afficher dans le graphique animé une fois chargé
+        
+        function loadGraph(src) {
+            // Ne recharge l'iframe que si le fichier change
+            if (loadedSrc === src) return false;
+            loadedSrc = src;
+            graphFrame.src = src;
+            return true;
+        }
+        
+        function showYear(year) {
+            // Graphique animé : on passe à l'image de l'année sans recharger la page
+            try {
+                const win = graphFrame.contentWindow;
+                const gd = win.document.querySelector('.plotly-graph-div');
+                if (win.Plotly && gd) {
+                    win.Plotly.animate(gd, [String(year)], {
+                        mode: 'immediate', frame: {duration: 0, redraw: false}, transition: {duration: 0}
+                    });
+                }
+            } catch (e) {
+                // Page ouverte sans serveur (file://) : le curseur de la figure reste utilisable
+            }
+        }
+        
+        function loadYear(pollutant, year) {
+            if (animated.includes(pollutant)) {
+                // Un seul fichier par polluant, toutes les années en images
+                frameYear = year;
+                if (!loadGraph(`${basePath}/${pollutant}_histogram_animation.html`)) showYear(year);
+            } else {
+                // Sans --animated : un fichier par année
+                frameYear = null;
+                loadGraph(`${basePath}/${pollutant}_${year}_histogram.html`);
+            }
+        }
         
         function updateGraph() {
             const pollutant = pollutantSelect.value;
-            const basePath = "../../output_csv";  // <-- chemin vers les HTML générés
 
             if (currentView === 'single') {
                 const yearIndex = parseInt(yearSlider.value);
                 const year = years[yearIndex];
                 yearDisplay.textContent = year;
-                const filename = `${pollutant}_histogram_${year}.html`;
-                graphFrame.src = `${basePath}/${filename}`;
+                loadYear(pollutant, year);
                 
             } else if (currentView === 'comparison') {
-                const year1 = year1Select.value;
-                const year2 = year2Select.value;
-                const filename = `${pollutant}_histogram_comparison_${year1}_${year2}.html`;
-                graphFrame.src = `${basePath}/${filename}`;
+                // Les comparaisons sont écrites pour année 1 < année 2
+                const year1 = Math.min(parseInt(year1Select.value), parseInt(year2Select.value));
+                const year2 = Math.max(parseInt(year1Select.value), parseInt(year2Select.value));
+                if (year1 === year2) {
+                    // Même année : histogramme de cette année
+                    loadYear(pollutant, year1);
+                } else {
+                    frameYear = null;
+                    loadGraph(`${basePath}/${pollutant}_histogram_comparison_${year1}_${year2}.html`);
+                }
                 
             } else if (currentView === 'evolution') {
                 const filename = `${pollutant}_histogram_evolution.html`;
-                graphFrame.src = `${basePath}/${filename}`;
+                frameYear = null;
+                loadGraph(`${basePath}/${filename}`);
             }
         }
         
@@ -188,6 +253,8 @@ def create_histograms_viewer():
                         <p>Utilisez le script Python pour créer les histogrammes d'abord.</p>
                     </div>
                 `;
+            } else if (frameYear !== null) {
+                showYear(frameYear);
             }
         });
     </script>
@@ -203,4 +270,7 @@ def create_histograms_viewer():
     print(f" Fichier {output_path} créé avec succès")
 
 if __name__ == "__main__":
-    create_histograms_viewer()
+    parser = argparse.ArgumentParser(description="Visionneuse des histogrammes écrits par visualize_from_db.py")
+    parser.add_argument("--source-dir", default=HTML_SOURCE_DIR,
+                        help="dossier des graphiques (--output-dir de visualize_from_db.py)")
+    create_histograms_viewer(parser.parse_args().source_dir)
@@ -1,18 +1,32 @@
 import os
+import argparse
 import webbrowser
 
-def create_scatter_viewer():
+# Dossier de sortie par défaut de visualize_from_db.py (depuis la racine du projet)
+HTML_SOURCE_DIR = os.path.join("src", "database", "output")
+
+def create_scatter_viewer(html_source_dir=HTML_SOURCE_DIR):
     """
     Create an HTML viewer for superposed scatter plots of air pollutants.
+
+    A pollutant is shown from its animated figure when it exists in
+    html_source_dir at creation time, and from its per-year files otherwise.
+
+    Args:
+        html_source_dir (str): Directory containing the SCATTER HTML files
+            (the --output-dir of visualize_from_db.py)
     """
-    # Directory containing the SCATTER HTML files
-    html_source_dir = os.path.abspath("output_csv").replace("\\", "/")
+    html_source_dir = os.path.abspath(html_source_dir).replace("\\", "/")
 
     # Directory where the viewer will be created
     output_path = "output/FINAL_superposed_graphs_map/FINAL_scatter_viewer.html"
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
 
-    pollutants = ["NO2", "PM10", "O3", "SOMO35", "PM25"]
+    # Noms des fichiers écrits par visualize_from_db.py
+    pollutants = ["NO2", "PM10", "O3", "SOMO35", "PM25", "AOT40"]
+    # Polluants dont le graphique animé (--animated) a été écrit
+    animated = [p for p in pollutants
+                if os.path.exists(os.path.join(html_source_dir, f"{p}_scatter_animation.html"))]
     years = [y for y in range(2000, 2016) if y != 2006]
 
     # ----------------------------------------------
@@ -84,18 +98,47 @@ def create_scatter_viewer():
         const yearSlider = document.getElementById('year-slider');
         const yearDisplay = document.getElementById('year-display');
         const graphFrame = document.getElementById('graph-frame');
+        const animated = {animated};
         const basePath = "{html_source_dir}";
+        let loadedSrc = '';
+
+        function showYear(year) {{
+            // Graphique animé : on passe à l'image de l'année sans recharger la page
+            try {{
+                const win = graphFrame.contentWindow;
+                const gd = win.document.querySelector('.plotly-graph-div');
+                if (win.Plotly && gd) {{
+                    win.Plotly.animate(gd, [String(year)], {{
+                        mode: 'immediate', frame: {{duration: 0, redraw: true}}, transition: {{duration: 0}}
+                    }});
+                }}
+            }} catch (e) {{
+                // Page ouverte sans serveur (file://) : le curseur de la figure reste utilisable
+            }}
+        }}
 
         function updateGraph() {{
             const pollutant = pollutantSelect.value;
             const year = years[parseInt(yearSlider.value)];
             yearDisplay.textContent = year;
-            const filename = `${{pollutant}}_moyenne_annuelle_${{year}}.html`;
-            graphFrame.src = `${{basePath}}/${{filename}}`;
+            // Un seul fichier par polluant, toutes les années en images ;
+            // sans --animated, un fichier par année
+            const src = animated.includes(pollutant)
+                ? `${{basePath}}/${{pollutant}}_scatter_animation.html`
+                : `${{basePath}}/${{pollutant}}_${{year}}_scatter.html`;
+            if (loadedSrc !== src) {{
+                loadedSrc = src;
+                graphFrame.src = src;
+            }} else {{
+                showYear(year);
+            }}
         }}
 
         pollutantSelect.addEventListener('change', updateGraph);
         yearSlider.addEventListener('input', updateGraph);
+        graphFrame.addEventListener('load', () => {{
+            if (animated.includes(pollutantSelect.value)) showYear(years[parseInt(yearSlider.value)]);
+        }});
 
         updateGraph();
     </script>
@@ -112,4 +155,7 @@ def create_scatter_viewer():
 
 
 if __name__ == "__main__":
-    create_scatter_viewer()
+    parser = argparse.ArgumentParser(description="Visionneuse des nuages de points écrits par visualize_from_db.py")
+    parser.add_argument("--source-dir", default=HTML_SOURCE_DIR,
+                        help="dossier des graphiques (--output-dir de visualize_from_db.py)")
+    create_scatter_viewer(parser.parse_args().source_dir)
@@ -1,8 +1,13 @@
-import pandas as pd
+import os
+import sys
 from histograms import create_pollution_histogram
 from plotly.io import show
 
-data = pd.read_csv("data/cleaned/cleaned_air_quality_with_year.csv")
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.cleaned_store import load_cleaned_data
+
+# Only the NO2 column is read from the cleaned Parquet store
+data = load_cleaned_data(columns=["Moyenne annuelle de concentration de NO2 (ug/m3)"])
 
 # Create the histogram for a pollutant
 fig = create_pollution_histogram(data, "NO2")
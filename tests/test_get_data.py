@@ -0,0 +1,121 @@
+import os
+import sys
+import json
+import shutil
+import hashlib
+import zipfile
+import tempfile
+import threading
+import unittest
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+import requests
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import RAW_ARCHIVE_PATH, RAW_MANIFEST_PATH
+from src.utils.get_data import CHUNK_SIZE, extract_archive, get_data
+
+
+class ArchiveHandler(BaseHTTPRequestHandler):
+    """
+    Local stand-in for Zenodo: serves the bytes of the fixture archive,
+    honours "Range: bytes=<start>-" and can cut the first transfer short.
+    """
+    archive = b""
+    # Number of bytes sent before the connection is closed (None: no failure)
+    fail_after = None
+    requests_seen = []
+
+    def do_GET(self):
+        range_header = self.headers.get("Range")
+        type(self).requests_seen.append(range_header)
+        start = int(range_header.split("=", 1)[1].rstrip("-")) if range_header else 0
+        body = self.archive[start:]
+
+        self.send_response(206 if range_header else 200)
+        if range_header:
+            self.send_header("Content-Range", f"bytes {start}-{len(self.archive) - 1}/{len(self.archive)}")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+
+        if self.fail_after is not None:
+            # Interrupted transfer: part of the body, then the connection is closed
+            self.wfile.write(body[:self.fail_after])
+            type(self).fail_after = None
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_archive(members):
+    """
+    Returns the bytes of a ZIP file containing members ({name: content}).
+    """
+    path = os.path.join(tempfile.mkdtemp(), "fixture.zip")
+    with zipfile.ZipFile(path, "w") as zip_ref:
+        for name, content in members.items():
+            zip_ref.writestr(name, content)
+    with open(path, "rb") as f:
+        data = f.read()
+    shutil.rmtree(os.path.dirname(path))
+    return data
+
+
+class GetDataTest(unittest.TestCase):
+
+    def setUp(self):
+        # Incompressible content spanning several download chunks
+        self.content = os.urandom(3 * CHUNK_SIZE // 2).hex()
+        ArchiveHandler.archive = make_archive({"data/2003.csv": self.content})
+        ArchiveHandler.fail_after = None
+        ArchiveHandler.requests_seen = []
+
+        self.server = HTTPServer(("127.0.0.1", 0), ArchiveHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/archive.zip"
+        self.checksum = "md5:" + hashlib.md5(ArchiveHandler.archive).hexdigest()
+        self.raw_folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.raw_folder)
+
+    def test_interrupted_download_is_resumed(self):
+        ArchiveHandler.fail_after = 2 * CHUNK_SIZE + 1000
+        with self.assertRaises(requests.exceptions.RequestException):
+            get_data(url=self.url, raw_folder=self.raw_folder, expected_checksum=self.checksum)
+
+        # The complete chunks received are kept and the transfer resumes after them
+        part_path = os.path.join(self.raw_folder, os.path.basename(RAW_ARCHIVE_PATH) + ".part")
+        received = os.path.getsize(part_path)
+        self.assertEqual(received, 2 * CHUNK_SIZE)
+
+        self.assertTrue(get_data(url=self.url, raw_folder=self.raw_folder, expected_checksum=self.checksum))
+        self.assertEqual(ArchiveHandler.requests_seen, [None, f"bytes={received}-"])
+        self.assertFalse(os.path.exists(part_path))
+        with open(os.path.join(self.raw_folder, "data", "2003.csv"), encoding="utf-8") as f:
+            self.assertEqual(f.read(), self.content)
+
+    def test_rerun_skips_download(self):
+        self.assertTrue(get_data(url=self.url, raw_folder=self.raw_folder, expected_checksum=self.checksum))
+        with open(os.path.join(self.raw_folder, os.path.basename(RAW_MANIFEST_PATH)), encoding="utf-8") as f:
+            self.assertEqual(json.load(f)["source"], self.url)
+
+        self.assertFalse(get_data(url=self.url, raw_folder=self.raw_folder, expected_checksum=self.checksum))
+        self.assertEqual(ArchiveHandler.requests_seen, [None])
+
+    def test_member_outside_raw_folder_is_rejected(self):
+        archive_path = os.path.join(self.raw_folder, "evil.zip")
+        with open(archive_path, "wb") as f:
+            f.write(make_archive({"../evil.txt": "x"}))
+        with self.assertRaises(ValueError):
+            extract_archive(archive_path, os.path.join(self.raw_folder, "raw"))
+        self.assertFalse(os.path.exists(os.path.join(self.raw_folder, "evil.txt")))
+
+
+if __name__ == "__main__":
+    unittest.main()